@@ -15,7 +15,10 @@ setup(
     author='Oktay Sancak',
     author_email='oktaysancak@gmail.com',
     url='http://github.com/os/slacker/',
-    install_requires=['requests >= 2.2.1'],
+    install_requires=[
+        'requests >= 2.2.1',
+        'futures; python_version < "3.0"',
+    ],
     license='http://www.apache.org/licenses/LICENSE-2.0',
     test_suite='tests',
     classifiers=[
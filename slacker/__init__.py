@@ -12,24 +12,48 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import contextlib
+import datetime
+import itertools
 import json
+import logging
 
 import requests
 
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
+from slacker.dm import DMCache, is_user_id
+from slacker.models import RESPONSE_MODELS
+from slacker.ratelimit import BACKGROUND, RateLimiter
+from slacker.transport import RequestsTransport
 from slacker.utilities import (
+    DEFAULT_WORKERS,
+    chunks,
+    encode_payload,
     get_api_url,
     get_item_id_by_name,
+    iter_items,
+    iter_pages,
+    map_concurrently,
 )
 
 
 __version__ = '0.14.0'
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_TIMEOUT = 10
 DEFAULT_RETRIES = 0
 # seconds to wait after a 429 error if Slack's API doesn't provide one
 DEFAULT_WAIT = 20
+# maximum number of users conversations.invite accepts per call
+INVITE_BATCH_SIZE = 1000
+# deepest page search.messages will return
+MAX_SEARCH_PAGES = 100
 
 __all__ = ['Error', 'Response', 'BaseAPI', 'API', 'Auth', 'Users', 'Groups',
            'Channels', 'Chat', 'IM', 'IncomingWebhook', 'Search', 'Files',
@@ -37,13 +61,129 @@ __all__ = ['Error', 'Response', 'BaseAPI', 'API', 'Auth', 'Users', 'Groups',
            'UserGroups', 'UserGroupsUsers', 'MPIM', 'OAuth', 'DND', 'Bots',
            'FilesComments', 'Reminders', 'TeamProfile', 'UsersProfile',
            'IDPGroups', 'Apps', 'AppsPermissions', 'Slacker', 'Dialog',
-           'Conversations', 'Migration']
+           'Conversations', 'Migration', 'Cancelled', 'DeadlineExceeded',
+           'CancelToken', 'call_options', 'CircuitOpen']
 
 
 class Error(Exception):
     pass
 
 
+class Cancelled(Error):
+    pass
+
+
+class DeadlineExceeded(Error):
+    """
+    Raised before or instead of sending a call that could not complete
+    within its deadline. Unlike Slack errors, retrying later may succeed.
+    """
+
+
+class CircuitOpen(Error):
+    """
+    Raised without sending a call while the circuit of its method is open.
+    Unlike Slack errors, retrying later may succeed.
+    """
+
+
+class CancelToken(object):
+    """
+    Flag shared with pagination iterators and batch operations: once
+    cancelled, calls that have not been sent yet fail with
+    :class:`Cancelled` and pending backoff sleeps are interrupted.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled('cancelled')
+
+    def sleep(self, seconds):
+        if self._event.wait(seconds):
+            raise Cancelled('cancelled')
+
+
+_local = threading.local()
+
+
+def _get_call_options():
+    return getattr(_local, 'options', None) or {}
+
+
+@contextlib.contextmanager
+def call_options(timeout=None, deadline=None, cancel=None, priority=None):
+    """
+    Applies options to every call made by the current thread in the block,
+    including the ones made on its behalf by batch operations::
+
+        with call_options(deadline=3):
+            slack.users.info(user)
+            slack.chat.post_message(channel, text)
+
+    :param timeout: Seconds to wait for each HTTP request, instead of the
+        API's ``timeout``
+    :type timeout: float
+    :param deadline: Seconds from now after which calls fail with
+        :class:`DeadlineExceeded`, 429 retries and backoff included. Nested
+        deadlines can only shorten the outer one.
+    :type deadline: float
+    :param cancel: Token stopping calls once cancelled
+    :type cancel: CancelToken
+    :param priority: Rate limiter priority of the calls, see
+        :class:`slacker.ratelimit.RateLimiter`
+    :type priority: int
+    """
+    options = dict(_get_call_options())
+    if timeout is not None:
+        options['timeout'] = timeout
+    if deadline is not None:
+        at = time.time() + deadline
+        options['deadline'] = min(at, options.get('deadline', at))
+    if cancel is not None:
+        options['cancel'] = cancel
+    if priority is not None:
+        options['priority'] = priority
+
+    previous = getattr(_local, 'options', None)
+    _local.options = options
+    try:
+        yield
+    finally:
+        _local.options = previous
+
+
+def _bind_call_options(func, cancel=None):
+    """
+    Returns ``func`` bound to the call options of the current thread, so
+    that they also apply when it runs in a worker thread. Unless set, the
+    priority of the calls is ``BACKGROUND``.
+    """
+    options = dict(_get_call_options())
+    options.setdefault('priority', BACKGROUND)
+    if cancel is not None:
+        options['cancel'] = cancel
+
+    def bound(*args, **kwargs):
+        previous = getattr(_local, 'options', None)
+        _local.options = options
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.options = previous
+
+    return bound
+
+
 class Response(object):
     def __init__(self, body):
         self.raw = body
@@ -54,28 +194,130 @@ class Response(object):
     def __str__(self):
         return json.dumps(self.body)
 
+    def models(self, key, model=None, keep_extra=False):
+        """
+        Returns ``body[key]`` as compact model objects (see
+        :mod:`slacker.models`) instead of nested dicts.
+
+        :param key: Top-level key of the response body, e.g. ``messages``
+        :type key: str
+        :param model: Model class to use, guessed from ``key`` if omitted
+        :param keep_extra: Keep fields the model does not declare
+        :type keep_extra: bool
+        """
+        model = model or RESPONSE_MODELS[key]
+        value = self.body.get(key)
+        if isinstance(value, dict):
+            return model(value, keep_extra=keep_extra)
+        if isinstance(value, list):
+            return [model(v, keep_extra=keep_extra)
+                    if isinstance(v, dict) else v for v in value]
+        return value
+
 
 class BaseAPI(object):
     def __init__(self, token=None, timeout=DEFAULT_TIMEOUT, proxies=None,
-                 session=None, rate_limit_retries=DEFAULT_RETRIES):
+                 session=None, rate_limit_retries=DEFAULT_RETRIES,
+                 transport=None, rate_limiter=None, concurrency=None,
+                 circuit_breaker=None):
         self.token = token
         self.timeout = timeout
         self.proxies = proxies
         self.session = session
         self.rate_limit_retries = rate_limit_retries
+        self.transport = transport or RequestsTransport(session=session)
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.circuit_breaker = circuit_breaker
+
+    def _send(self, request_method, method, url, options, **kwargs):
+        cancel = options.get('cancel')
+        deadline = options.get('deadline')
+        timeout = options.get('timeout', self.timeout)
+
+        if cancel:
+            cancel.check()
+        breaker = self.circuit_breaker
+        if breaker and not breaker.check(method):
+            raise CircuitOpen(method)
+        if self.rate_limiter and not self.rate_limiter.acquire(
+                method, deadline=deadline,
+                priority=options.get('priority'), cancel=cancel):
+            raise DeadlineExceeded(method)
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded(method)
+            timeout = remaining if timeout is None else min(timeout,
+                                                            remaining)
+
+        # admitted before taking a concurrency slot, so that rejections
+        # never count as calls
+        if breaker and not breaker.allow(method):
+            raise CircuitOpen(method)
+        started = None
+        throttled = False
+        failed = None
+        try:
+            if self.concurrency:
+                started = self.concurrency.acquire(method, deadline=deadline)
+                if started is None:
+                    raise DeadlineExceeded(method)
+            try:
+                response = self.transport.send(
+                    request_method, url, timeout=timeout,
+                    proxies=self.proxies, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                failed = True
+                raise
+            throttled = response.status_code == requests.codes.too_many
+            failed = response.status_code >= 500
+            return response
+        except requests.Timeout:
+            if deadline is not None and time.time() >= deadline:
+                raise DeadlineExceeded(method)
+            raise
+        finally:
+            if started is not None:
+                self.concurrency.release(method, started, throttled,
+                                         failed=failed is not False)
+            if breaker:
+                if failed is None:
+                    breaker.release(method)
+                elif failed:
+                    breaker.failure(method)
+                else:
+                    breaker.success(method)
+
+    def _sleep(self, method, seconds, options):
+        deadline = options.get('deadline')
+        if deadline is not None and time.time() + seconds > deadline:
+            # no point in waiting for a retry we cannot afford
+            raise DeadlineExceeded(method)
+
+        cancel = options.get('cancel')
+        if cancel:
+            cancel.sleep(seconds)
+        else:
+            time.sleep(seconds)
 
     def _request(self, request_method, method, **kwargs):
         if self.token:
             kwargs.setdefault('params', {})['token'] = self.token
 
+        for key in ('params', 'data'):
+            if kwargs.get(key):
+                kwargs[key] = encode_payload(kwargs[key])
+
         url = get_api_url(method)
+        options = _get_call_options()
 
         # while we have rate limit retries left, fetch the resource and back
         # off as Slack's HTTP response suggests
         for retry_num in range(self.rate_limit_retries):
-            response = request_method(
-                url, timeout=self.timeout, proxies=self.proxies, **kwargs
-            )
+            response = self._send(request_method, method, url, options,
+                                  **kwargs)
 
             if response.status_code == requests.codes.ok:
                 break
@@ -83,18 +325,20 @@ class BaseAPI(object):
             # handle HTTP 429 as documented at
             # https://api.slack.com/docs/rate-limits
             if response.status_code == requests.codes.too_many:
-                time.sleep(int(
-                    response.headers.get('retry-after', DEFAULT_WAIT)
-                ))
+                wait = int(response.headers.get('retry-after', DEFAULT_WAIT))
+                if self.rate_limiter:
+                    # let other callers sharing the limiter back off as well
+                    self.rate_limiter.pause(method, wait)
+                else:
+                    self._sleep(method, wait, options)
                 continue
 
             response.raise_for_status()
         else:
             # with no retries left, make one final attempt to fetch the
             # resource, but do not handle too_many status differently
-            response = request_method(
-                url, timeout=self.timeout, proxies=self.proxies, **kwargs
-            )
+            response = self._send(request_method, method, url, options,
+                                  **kwargs)
             response.raise_for_status()
 
         response = Response(response.text)
@@ -103,28 +347,48 @@ class BaseAPI(object):
 
         return response
 
-    def _session_get(self, url, params=None, **kwargs):
-        kwargs.setdefault('allow_redirects', True)
-        return self.session.request(
-            method='get', url=url, params=params, **kwargs
-        )
+    def _max_workers(self, max_workers):
+        # with a concurrency limiter, pools only cap what the limiter allows
+        if max_workers is None:
+            return self.concurrency.maximum if self.concurrency else \
+                DEFAULT_WORKERS
+        return max_workers
 
-    def _session_post(self, url, data=None, **kwargs):
-        return self.session.request(
-            method='post', url=url, data=data, **kwargs
+    def _batch_limiter(self):
+        # calls are already throttled by _request when the API has a limiter
+        return None if self.rate_limiter else RateLimiter()
+
+    def _bulk(self, method, func, items, max_workers=None,
+              success=None, cancel=None):
+        """
+        Runs ``func`` for every item concurrently and returns a dict mapping
+        each item to ``success`` or to the error message of its failure.
+
+        Calls are throttled per ``method`` by the API's rate limiter, or by a
+        private one for the duration of the batch if the API has none. The
+        call options of the current thread apply to every call.
+        """
+        limiter = self._batch_limiter()
+
+        def call(item):
+            if limiter and not limiter.acquire(
+                    method, deadline=_get_call_options().get('deadline')):
+                raise DeadlineExceeded(method)
+            return func(item)
+
+        return dict(
+            (item, success if error is None else str(error))
+            for item, _, error in map_concurrently(
+                _bind_call_options(call, cancel), items,
+                self._max_workers(max_workers), cancel
+            )
         )
 
     def get(self, api, **kwargs):
-        return self._request(
-            self._session_get if self.session else requests.get,
-            api, **kwargs
-        )
+        return self._request('GET', api, **kwargs)
 
     def post(self, api, **kwargs):
-        return self._request(
-            self._session_post if self.session else requests.post,
-            api, **kwargs
-        )
+        return self._request('POST', api, **kwargs)
 
 
 class API(BaseAPI):
@@ -151,16 +415,13 @@ class Conversations(BaseAPI):
         return self.post('conversations.close', data={'channel': channel})
 
     def create(self, name, user_ids=None, is_private=None):
-        if isinstance(user_ids, (list, tuple)):
-            user_ids = ','.join(user_ids)
-
         return self.post(
             'conversations.create',
             data={'name': name, 'user_ids': user_ids, 'is_private': is_private}
         )
 
     def history(self, channel, cursor=None, inclusive=None, latest=None,
-                oldest=None, limit=None):
+                oldest=None, limit=None, include_all_metadata=None):
         return self.get(
             'conversations.history',
             params={
@@ -169,10 +430,76 @@ class Conversations(BaseAPI):
                 'inclusive': inclusive,
                 'latest': latest,
                 'oldest': oldest,
-                'limit': limit
+                'limit': limit,
+                'include_all_metadata': include_all_metadata,
             }
         )
 
+    def history_with_replies(self, channel, inclusive=None, latest=None,
+                             oldest=None, limit=None, known_threads=None,
+                             max_workers=None, cancel=None):
+        """
+        Streams the whole history of a conversation like paging through
+        ``conversations.history``, with the replies of every thread attached
+        to its parent message as ``replies`` (oldest first, parent
+        excluded).
+
+        Threads of a page are fetched concurrently while the previous page
+        is being consumed. When ``known_threads`` maps thread ``ts`` to the
+        ``latest_reply`` seen on a previous run, unchanged threads are
+        skipped and get no ``replies`` key; the mapping is updated in place
+        for the next run.
+
+        :param cancel: Token stopping the stream once cancelled
+        :type cancel: CancelToken
+
+        :returns: Generator of messages
+        """
+        limiter = self._batch_limiter()
+
+        def replies_page(*args, **kwargs):
+            if limiter and not limiter.acquire(
+                    'conversations.replies',
+                    deadline=_get_call_options().get('deadline')):
+                raise DeadlineExceeded('conversations.replies')
+            return self.replies(*args, **kwargs)
+
+        def fetch_replies(ts):
+            return [m for m in iter_items(replies_page, 'messages', channel,
+                                          ts, limit=200, cancel=cancel)
+                    if m['ts'] != ts]
+
+        fetch_replies = _bind_call_options(fetch_replies, cancel)
+        pages = iter_pages(self.history, channel, inclusive=inclusive,
+                           latest=latest, oldest=oldest, limit=limit,
+                           cancel=cancel)
+        with ThreadPoolExecutor(
+                max_workers=self._max_workers(max_workers)) as executor:
+            pending = None
+            for response in itertools.chain(pages, [None]):
+                submitted = None
+                if response is not None:
+                    submitted = []
+                    for message in response.body['messages']:
+                        future = None
+                        if message.get('reply_count'):
+                            latest_reply = message.get('latest_reply')
+                            if known_threads is None or \
+                                    known_threads.get(message['ts']) != \
+                                    latest_reply:
+                                future = executor.submit(fetch_replies,
+                                                         message['ts'])
+                        submitted.append((message, future))
+
+                for message, future in pending or ():
+                    if future is not None:
+                        message['replies'] = future.result()
+                        if known_threads is not None:
+                            known_threads[message['ts']] = \
+                                message.get('latest_reply')
+                    yield message
+                pending = submitted
+
     def info(self, channel, include_locale=None, include_num_members=None):
         return self.get(
             'conversations.info',
@@ -184,9 +511,6 @@ class Conversations(BaseAPI):
         )
 
     def invite(self, channel, users):
-        if isinstance(users, (list, tuple)):
-            users = ','.join(users)
-
         return self.post(
             'conversations.invite',
             data={'channel': channel, 'users': users}
@@ -204,10 +528,68 @@ class Conversations(BaseAPI):
     def leave(self, channel):
         return self.post('conversations.leave', data={'channel': channel})
 
-    def list(self, cursor=None, exclude_archived=None, types=None, limit=None):
-        if isinstance(types, (list, tuple)):
-            types = ','.join(types)
+    def invite_many(self, channel, users, batch_size=INVITE_BATCH_SIZE,
+                    max_workers=None, cancel=None):
+        """
+        Invites users in batches of ``batch_size``. When a batch is rejected
+        its users are invited one by one to find out which ones failed.
+
+        :returns: Dict mapping user IDs to ``invited`` or an error message
+        """
+        results = {}
+        for batch in chunks(sorted(users), batch_size):
+            if cancel:
+                cancel.check()
+            try:
+                self.invite(channel, batch)
+            except (Cancelled, DeadlineExceeded, CircuitOpen):
+                raise
+            except Error:
+                results.update(self._bulk(
+                    'conversations.invite',
+                    lambda user: self.invite(channel, user), batch,
+                    max_workers, 'invited', cancel
+                ))
+            else:
+                results.update(dict.fromkeys(batch, 'invited'))
+        return results
+
+    def kick_many(self, channel, users, max_workers=None, cancel=None):
+        """
+        Removes users concurrently.
+
+        :returns: Dict mapping user IDs to ``kicked`` or an error message
+        """
+        return self._bulk('conversations.kick',
+                          lambda user: self.kick(channel, user), users,
+                          max_workers, 'kicked', cancel)
+
+    def sync_members(self, channel, users, kick=True,
+                     batch_size=INVITE_BATCH_SIZE,
+                     max_workers=None, cancel=None):
+        """
+        Makes the members of a conversation match ``users``, only inviting
+        and kicking the difference with its current members.
 
+        :param kick: Remove members not in ``users``
+        :type kick: bool
+
+        :returns: Dict mapping user IDs to ``unchanged``, ``invited``,
+            ``kicked`` or an error message
+        """
+        users = set(users)
+        current = set(iter_items(self.members, 'members', channel,
+                                 limit=INVITE_BATCH_SIZE, cancel=cancel))
+
+        results = dict.fromkeys(users & current, 'unchanged')
+        results.update(self.invite_many(channel, users - current, batch_size,
+                                        max_workers, cancel))
+        if kick:
+            results.update(self.kick_many(channel, current - users,
+                                          max_workers, cancel))
+        return results
+
+    def list(self, cursor=None, exclude_archived=None, types=None, limit=None):
         return self.get(
             'conversations.list',
             params={
@@ -225,9 +607,6 @@ class Conversations(BaseAPI):
         )
 
     def open(self, channel=None, users=None, return_im=None):
-        if isinstance(users, (list, tuple)):
-            users = ','.join(users)
-
         return self.post(
             'conversations.open',
             data={'channel': channel, 'users': users, 'return_im': return_im}
@@ -274,7 +653,7 @@ class Dialog(BaseAPI):
     def open(self, dialog, trigger_id):
         return self.post('dialog.open',
                          data={
-                             'dialog': json.dumps(dialog),
+                             'dialog': dialog,
                              'trigger_id': trigger_id,
                          })
 
@@ -327,8 +706,13 @@ class Users(BaseAPI):
         return self.get('users.info',
                         params={'user': user, 'include_locale': include_locale})
 
-    def list(self, presence=False):
-        return self.get('users.list', params={'presence': int(presence)})
+    def list(self, presence=False, cursor=None, limit=None):
+        return self.get('users.list',
+                        params={
+                            'presence': int(presence),
+                            'cursor': cursor,
+                            'limit': limit
+                        })
 
     def identity(self):
         return self.get('users.identity')
@@ -380,6 +764,16 @@ class Groups(BaseAPI):
         return self.post('groups.kick',
                          data={'channel': channel, 'user': user})
 
+    def invite_many(self, channel, users, max_workers=None, cancel=None):
+        """
+        Invites users concurrently.
+
+        :returns: Dict mapping user IDs to ``invited`` or an error message
+        """
+        return self._bulk('groups.invite',
+                          lambda user: self.invite(channel, user), users,
+                          max_workers, 'invited', cancel)
+
     def leave(self, channel):
         return self.post('groups.leave', data={'channel': channel})
 
@@ -485,17 +879,42 @@ class Channels(BaseAPI):
 
 
 class Chat(BaseAPI):
+    # slacker.dm.DMCache resolving users passed as channel
+    dm_cache = None
+
+    @staticmethod
+    def _fill_template(template, text, blocks, attachments):
+        """
+        Takes whatever content was not passed explicitly from a rendered
+        :class:`slacker.templates.MessageTemplate`.
+        """
+        if not template:
+            return text, blocks, attachments
+        return (
+            template.get('text') if text is None else text,
+            template.get('blocks') if blocks is None else blocks,
+            template.get('attachments') if attachments is None
+            else attachments,
+        )
+
     def post_message(self, channel, text=None, username=None, as_user=None,
                      parse=None, link_names=None, attachments=None,
                      unfurl_links=None, unfurl_media=None, icon_url=None,
                      icon_emoji=None, thread_ts=None, reply_broadcast=None,
-                     blocks=None, mrkdwn=True):
-
-        # Ensure attachments are json encoded
-        if attachments:
-            if isinstance(attachments, list):
-                attachments = json.dumps(attachments)
-
+                     blocks=None, mrkdwn=True, template=None, metadata=None):
+        """
+        :param channel: Channel ID or name. With a ``dm_cache``, also a user
+            ID or a list of user IDs, resolved to their DM channel.
+        :param metadata: Message metadata, a dict with ``event_type`` and
+            ``event_payload``
+        """
+        text, blocks, attachments = self._fill_template(
+            template, text, blocks, attachments
+        )
+        if self.dm_cache is not None and (
+                isinstance(channel, (list, tuple, set, frozenset)) or
+                is_user_id(channel)):
+            channel = self.dm_cache.get(channel)
         return self.post('chat.postMessage',
                          data={
                              'channel': channel,
@@ -513,6 +932,7 @@ class Chat(BaseAPI):
                              'reply_broadcast': reply_broadcast,
                              'blocks': blocks,
                              'mrkdwn': mrkdwn,
+                             'metadata': metadata,
                          })
 
     def me_message(self, channel, text):
@@ -527,11 +947,11 @@ class Chat(BaseAPI):
                              'text': text
                          })
 
-    def update(self, channel, ts, text, attachments=None, parse=None,
-               link_names=False, as_user=None, blocks=None):
-        # Ensure attachments are json encoded
-        if attachments is not None and isinstance(attachments, list):
-            attachments = json.dumps(attachments)
+    def update(self, channel, ts, text=None, attachments=None, parse=None,
+               link_names=False, as_user=None, blocks=None, template=None):
+        text, blocks, attachments = self._fill_template(
+            template, text, blocks, attachments
+        )
         return self.post('chat.update',
                          data={
                              'channel': channel,
@@ -554,10 +974,10 @@ class Chat(BaseAPI):
 
     def post_ephemeral(self, channel, text, user, as_user=None,
                        attachments=None, link_names=None, parse=None,
-                       blocks=None):
-        # Ensure attachments are json encoded
-        if attachments is not None and isinstance(attachments, list):
-            attachments = json.dumps(attachments)
+                       blocks=None, template=None):
+        text, blocks, attachments = self._fill_template(
+            template, text, blocks, attachments
+        )
         return self.post('chat.postEphemeral',
                          data={
                              'channel': channel,
@@ -622,9 +1042,6 @@ class IM(BaseAPI):
 
 class MPIM(BaseAPI):
     def open(self, users):
-        if isinstance(users, (tuple, list)):
-            users = ','.join(users)
-
         return self.post('mpim.open', data={'users': users})
 
     def close(self, channel):
@@ -690,6 +1107,105 @@ class Search(BaseAPI):
                             'page': page
                         })
 
+    def _scan_window(self, query, start, end, sort_dir, count, max_pages,
+                     strict):
+        window_query = '{} after:{} before:{}'.format(
+            query, (start - datetime.timedelta(days=1)).isoformat(),
+            end.isoformat()
+        )
+
+        def fetch(page):
+            return self.messages(window_query, sort='timestamp',
+                                 sort_dir=sort_dir, count=count,
+                                 page=page).body['messages']
+
+        first = fetch(1)
+        pages = first['paging']['pages']
+        if pages > max_pages and (end - start).days > 1:
+            # too deep to page through, split the window in two
+            middle = start + datetime.timedelta(days=(end - start).days // 2)
+            halves = [(start, middle), (middle, end)]
+            if sort_dir == 'desc':
+                halves.reverse()
+            return [match for a, b in halves
+                    for match in self._scan_window(query, a, b, sort_dir,
+                                                   count, max_pages, strict)]
+        if pages > max_pages:
+            if strict:
+                raise Error('search_truncated')
+            logger.warning('Search for %r on %s has %d pages, only the '
+                           'first %d are scanned', query, start.isoformat(),
+                           pages, max_pages)
+
+        matches = list(first['matches'])
+        for page in range(2, min(pages, max_pages) + 1):
+            matches.extend(fetch(page)['matches'])
+        matches.sort(key=lambda m: float(m['ts']), reverse=sort_dir == 'desc')
+        return matches
+
+    def scan_messages(self, query, start, end, window=7, sort_dir='asc',
+                      count=100, max_pages=MAX_SEARCH_PAGES,
+                      max_workers=None, cancel=None, strict=False):
+        """
+        Streams every message matching ``query`` posted from ``start`` up to,
+        but not including, ``end``, in timestamp order.
+
+        The date range is split into windows of ``window`` days which are
+        searched concurrently with ``after:``/``before:`` modifiers. Windows
+        with more than ``max_pages`` pages of results are split further, down
+        to single days; days still deeper than that are cut off with a
+        warning, or raise :class:`Error` with ``strict``. Only as many
+        windows as there are workers are searched ahead of the consumer.
+        Messages are deduplicated by channel and ``ts``.
+
+        :param start: First day to search
+        :type start: datetime.date
+        :param end: Day after the last day to search
+        :type end: datetime.date
+        :param sort_dir: ``asc`` or ``desc``
+        :type sort_dir: str
+        :param cancel: Token stopping the scan once cancelled
+        :type cancel: CancelToken
+
+        :returns: Generator of search matches
+        """
+        windows = []
+        day = start
+        while day < end:
+            windows.append((day, min(day + datetime.timedelta(days=window),
+                                     end)))
+            day = windows[-1][1]
+        if sort_dir == 'desc':
+            windows.reverse()
+
+        seen = set()
+        max_workers = self._max_workers(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            scan_window = _bind_call_options(self._scan_window, cancel)
+            windows = iter(windows)
+            futures = collections.deque()
+            try:
+                while True:
+                    # keep few windows in flight so that matches are not
+                    # held in memory long before they are consumed
+                    for a, b in itertools.islice(
+                            windows, max_workers - len(futures)):
+                        futures.append(executor.submit(
+                            scan_window, query, a, b, sort_dir, count,
+                            max_pages, strict
+                        ))
+                    if not futures:
+                        break
+                    for match in futures.popleft().result():
+                        key = ((match.get('channel') or {}).get('id'),
+                               match['ts'])
+                        if key not in seen:
+                            seen.add(key)
+                            yield match
+            finally:
+                for future in futures:
+                    future.cancel()
+
 
 class FilesComments(BaseAPI):
     def add(self, file_, comment):
@@ -733,9 +1249,6 @@ class Files(BaseAPI):
 
     def upload(self, file_=None, content=None, filetype=None, filename=None,
                title=None, initial_comment=None, channels=None, thread_ts=None):
-        if isinstance(channels, (tuple, list)):
-            channels = ','.join(channels)
-
         data = {
             'content': content,
             'filetype': filetype,
@@ -953,27 +1466,41 @@ class Pins(BaseAPI):
 
 class UserGroupsUsers(BaseAPI):
     def list(self, usergroup, include_disabled=None):
-        if isinstance(include_disabled, bool):
-            include_disabled = int(include_disabled)
-
         return self.get('usergroups.users.list', params={
             'usergroup': usergroup,
             'include_disabled': include_disabled,
         })
 
     def update(self, usergroup, users, include_count=None):
-        if isinstance(users, (tuple, list)):
-            users = ','.join(users)
-
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
         return self.post('usergroups.users.update', data={
             'usergroup': usergroup,
             'users': users,
             'include_count': include_count,
         })
 
+    def sync(self, usergroup, users):
+        """
+        Sets the users of a usergroup, skipping the update when nothing
+        changed. Slack rejects empty usergroups: disable the usergroup with
+        ``usergroups.disable`` instead.
+
+        :returns: Dict mapping user IDs to ``unchanged``, ``added`` or
+            ``removed``
+        """
+        users = set(users)
+        if not users:
+            raise ValueError('A usergroup needs at least one user')
+        current = set(
+            self.list(usergroup, include_disabled=True).body['users']
+        )
+        if users != current:
+            self.update(usergroup, sorted(users))
+
+        results = dict.fromkeys(users & current, 'unchanged')
+        results.update(dict.fromkeys(users - current, 'added'))
+        results.update(dict.fromkeys(current - users, 'removed'))
+        return results
+
 
 class UserGroups(BaseAPI):
     def __init__(self, *args, **kwargs):
@@ -986,15 +1513,6 @@ class UserGroups(BaseAPI):
 
     def list(self, include_disabled=None, include_count=None,
              include_users=None):
-        if isinstance(include_disabled, bool):
-            include_disabled = int(include_disabled)
-
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
-        if isinstance(include_users, bool):
-            include_users = int(include_users)
-
         return self.get('usergroups.list', params={
             'include_disabled': include_disabled,
             'include_count': include_count,
@@ -1003,12 +1521,6 @@ class UserGroups(BaseAPI):
 
     def create(self, name, handle=None, description=None, channels=None,
                include_count=None):
-        if isinstance(channels, (tuple, list)):
-            channels = ','.join(channels)
-
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
         return self.post('usergroups.create', data={
             'name': name,
             'handle': handle,
@@ -1019,12 +1531,6 @@ class UserGroups(BaseAPI):
 
     def update(self, usergroup, name=None, handle=None, description=None,
                channels=None, include_count=None):
-        if isinstance(channels, (tuple, list)):
-            channels = ','.join(channels)
-
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
         return self.post('usergroups.update', data={
             'usergroup': usergroup,
             'name': name,
@@ -1035,18 +1541,12 @@ class UserGroups(BaseAPI):
         })
 
     def disable(self, usergroup, include_count=None):
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
         return self.post('usergroups.disable', data={
             'usergroup': usergroup,
             'include_count': include_count,
         })
 
     def enable(self, usergroup, include_count=None):
-        if isinstance(include_count, bool):
-            include_count = int(include_count)
-
         return self.post('usergroups.enable', data={
             'usergroup': usergroup,
             'include_count': include_count,
@@ -1055,9 +1555,6 @@ class UserGroups(BaseAPI):
 
 class DND(BaseAPI):
     def team_info(self, users=None):
-        if isinstance(users, (tuple, list)):
-            users = ','.join(users)
-
         return self.get('dnd.teamInfo', params={'users': users})
 
     def set_snooze(self, num_minutes):
@@ -1075,9 +1572,6 @@ class DND(BaseAPI):
 
 class Migration(BaseAPI):
     def exchange(self, users, to_old=False):
-        if isinstance(users, (list, tuple)):
-            users = ','.join(users)
-
         return self.get(
             'migration.exchange', params={'users': users, 'to_old': to_old}
         )
@@ -1166,10 +1660,18 @@ class Apps(BaseAPI):
 
 
 class IncomingWebhook(object):
-    def __init__(self, url=None, timeout=DEFAULT_TIMEOUT, proxies=None):
+    def __init__(self, url=None, timeout=DEFAULT_TIMEOUT, proxies=None,
+                 session=None, rate_limit_retries=DEFAULT_RETRIES):
         self.url = url
         self.timeout = timeout
         self.proxies = proxies
+        self.session = session
+        self.rate_limit_retries = rate_limit_retries
+
+    def _send(self, body):
+        request_method = self.session.post if self.session else requests.post
+        return request_method(self.url, data=body, timeout=self.timeout,
+                              proxies=self.proxies)
 
     def post(self, data):
         """
@@ -1179,8 +1681,14 @@ class IncomingWebhook(object):
         if not self.url:
             raise Error('URL for incoming webhook is undefined')
 
-        return requests.post(self.url, data=json.dumps(data),
-                             timeout=self.timeout, proxies=self.proxies)
+        body = json.dumps(data)
+        for retry_num in range(self.rate_limit_retries):
+            response = self._send(body)
+            if response.status_code != requests.codes.too_many:
+                return response
+            time.sleep(int(response.headers.get('retry-after', DEFAULT_WAIT)))
+
+        return self._send(body)
 
 
 class Slacker(object):
@@ -1188,7 +1696,9 @@ class Slacker(object):
 
     def __init__(self, token, incoming_webhook_url=None,
                  timeout=DEFAULT_TIMEOUT, http_proxy=None, https_proxy=None,
-                 session=None, rate_limit_retries=DEFAULT_RETRIES):
+                 session=None, rate_limit_retries=DEFAULT_RETRIES,
+                 transport=None, rate_limiter=None, concurrency=None,
+                 circuit_breaker=None, dm_cache_path=None, dm_cache=False):
 
         proxies = self.__create_proxies(http_proxy, https_proxy)
         api_args = {
@@ -1197,6 +1707,10 @@ class Slacker(object):
             'proxies': proxies,
             'session': session,
             'rate_limit_retries': rate_limit_retries,
+            'transport': transport,
+            'rate_limiter': rate_limiter,
+            'concurrency': concurrency,
+            'circuit_breaker': circuit_breaker,
         }
         self.im = IM(**api_args)
         self.api = API(**api_args)
@@ -1224,8 +1738,77 @@ class Slacker(object):
         self.idpgroups = IDPGroups(**api_args)
         self.usergroups = UserGroups(**api_args)
         self.conversations = Conversations(**api_args)
-        self.incomingwebhook = IncomingWebhook(url=incoming_webhook_url,
-                                               timeout=timeout, proxies=proxies)
+        self.dms = DMCache(self.conversations, dm_cache_path)
+        # resolving user IDs in chat.post_message needs the im:write scope,
+        # without it Slack delivers to user IDs directly
+        if dm_cache or dm_cache_path:
+            self.chat.dm_cache = self.dms
+        self.incomingwebhook = IncomingWebhook(
+            url=incoming_webhook_url, timeout=timeout, proxies=proxies,
+            session=session, rate_limit_retries=rate_limit_retries
+        )
+        self._refresh_stop = None
+
+    def warmup(self, connections=2, validate=False, refresh_interval=None):
+        """
+        Opens pooled connections to Slack ahead of the first call, which
+        would otherwise pay for DNS resolution and the TCP and TLS
+        handshakes. Connections are only pooled when the client was created
+        with a ``session`` or with a pooling ``transport``.
+
+        :param connections: Number of connections to open, at most the
+            session's pool size
+        :type connections: int
+        :param validate: Also check the token with ``auth.test``
+        :type validate: bool
+        :param refresh_interval: Seconds after which connections are
+            reopened in the background, before Slack closes them as idle
+        :type refresh_interval: float
+
+        :returns: The ``auth.test`` response when ``validate`` is true
+        """
+        self.stop_refresh()
+        self._open_connections(connections)
+        if refresh_interval:
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self._refresh,
+                args=(stop, refresh_interval, connections)
+            )
+            thread.daemon = True
+            thread.start()
+            self._refresh_stop = stop
+        if validate:
+            return self.auth.test()
+
+    def warmup_async(self, *args, **kwargs):
+        """
+        Runs :meth:`warmup` in a background thread so that startup can go on
+        meanwhile.
+
+        :returns: :class:`concurrent.futures.Future` of the result
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self.warmup, *args, **kwargs)
+        executor.shutdown(wait=False)
+        return future
+
+    def stop_refresh(self):
+        if self._refresh_stop is not None:
+            self._refresh_stop.set()
+            self._refresh_stop = None
+
+    def _open_connections(self, connections):
+        self.api.transport.warmup(get_api_url('api.test'), connections,
+                                  timeout=self.api.timeout,
+                                  proxies=self.api.proxies)
+
+    def _refresh(self, stop, interval, connections):
+        while not stop.wait(interval):
+            try:
+                self._open_connections(connections)
+            except requests.RequestException as e:
+                logger.warning('Refreshing connections failed: %s', e)
 
     def __create_proxies(self, http_proxy=None, https_proxy=None):
         proxies = dict()
@@ -0,0 +1,49 @@
+def asgi_app(receiver):
+    """
+    Wraps ``receiver`` in an ASGI 3 application (Python 3.5+), e.g. for
+    uvicorn::
+
+        app = asgi_app(EventReceiver(signing_secret))
+
+    Requests are acked from the event loop without blocking it; handlers
+    still run on the receiver's worker threads.
+
+    :param receiver: :class:`slacker.events.EventReceiver` instance
+    """
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    receiver.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            more = message.get('more_body', False)
+        headers = dict((k.decode('latin-1').lower(), v.decode('latin-1'))
+                       for k, v in scope.get('headers', ()))
+
+        status, content_type, content = receiver.handle(
+            scope['method'], headers, b''.join(chunks)
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode('latin-1')),
+                        (b'content-length', str(len(content)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    return app
@@ -0,0 +1,149 @@
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class _Circuit(object):
+    __slots__ = ('state', 'failures', 'opened_at', 'probes', 'calls',
+                 'rejected')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.calls = 0
+        self.rejected = 0
+
+
+class CircuitBreaker(object):
+    """
+    Per-method circuit breaker, so that calls to a method Slack is failing
+    for fail immediately while other methods keep working.
+
+    After ``failure_threshold`` consecutive failures (network errors,
+    timeouts and HTTP 5xx) the circuit of a method opens and calls raise
+    :class:`slacker.CircuitOpen` without being sent. ``reset_timeout``
+    seconds later up to ``probes`` calls are let through: a success closes
+    the circuit, a failure opens it again. Rate limiting (HTTP 429) and
+    Slack errors are not failures.
+
+    Pass it as ``circuit_breaker`` to :class:`slacker.Slacker` or any API
+    class; :meth:`status` reports the state of every method.
+
+    :param failure_threshold: Consecutive failures opening a circuit
+    :type failure_threshold: int
+    :param reset_timeout: Seconds before an open circuit is probed
+    :type reset_timeout: float
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30., probes=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, method):
+        circuit = self._circuits.get(method)
+        if circuit is None:
+            circuit = self._circuits[method] = _Circuit()
+        return circuit
+
+    def _half_open(self, circuit, now):
+        if circuit.state == OPEN and \
+                now - circuit.opened_at >= self.reset_timeout:
+            circuit.state = HALF_OPEN
+            circuit.probes = 0
+
+    def check(self, method):
+        """
+        :returns: False if calls to ``method`` would currently be rejected
+        :rtype: bool
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            self._half_open(circuit, time.time())
+            if circuit.state == OPEN or (circuit.state == HALF_OPEN and
+                                         circuit.probes >= self.probes):
+                circuit.rejected += 1
+                return False
+            return True
+
+    def allow(self, method):
+        """
+        Admits a call to ``method``, which must then be reported with
+        :meth:`success`, :meth:`failure` or :meth:`release`.
+
+        :rtype: bool
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            self._half_open(circuit, time.time())
+            if circuit.state == OPEN:
+                circuit.rejected += 1
+                return False
+            if circuit.state == HALF_OPEN:
+                if circuit.probes >= self.probes:
+                    circuit.rejected += 1
+                    return False
+                circuit.probes += 1
+            circuit.calls += 1
+            return True
+
+    def success(self, method):
+        with self._lock:
+            circuit = self._circuit(method)
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.opened_at = None
+
+    def failure(self, method):
+        with self._lock:
+            circuit = self._circuit(method)
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or \
+                    circuit.failures >= self.failure_threshold:
+                circuit.state = OPEN
+                circuit.opened_at = time.time()
+
+    def release(self, method):
+        """
+        Reports that an admitted call was not sent after all.
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            if circuit.state == HALF_OPEN and circuit.probes:
+                circuit.probes -= 1
+
+    def reset(self, method=None):
+        with self._lock:
+            if method is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(method, None)
+
+    def status(self):
+        """
+        :returns: Dict mapping every method called so far to a dict of its
+            ``state``, consecutive ``failures``, admitted ``calls``,
+            ``rejected`` calls and, when open, ``retry_at`` (epoch time)
+        """
+        now = time.time()
+        with self._lock:
+            status = {}
+            for method, circuit in self._circuits.items():
+                self._half_open(circuit, now)
+                status[method] = {
+                    'state': circuit.state,
+                    'failures': circuit.failures,
+                    'calls': circuit.calls,
+                    'rejected': circuit.rejected,
+                    'retry_at': None if circuit.state != OPEN else
+                    circuit.opened_at + self.reset_timeout,
+                }
+            return status
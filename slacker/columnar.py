@@ -0,0 +1,177 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# optional parts of pyarrow, each checked where it is used
+try:
+    import pyarrow.ipc as pyarrow_ipc
+except ImportError:
+    pyarrow_ipc = None
+
+try:
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:
+    pyarrow_parquet = None
+
+from slacker.utilities import iter_pages
+
+
+def _reaction_count(message):
+    return sum(r.get('count', 0) for r in message.get('reactions') or ())
+
+
+def _field(name):
+    return lambda item: item.get(name)
+
+
+def _profile_field(name):
+    return lambda item: (item.get('profile') or {}).get(name)
+
+
+# column kind -> (numpy dtype, value used for missing numpy values)
+_NUMPY_TYPES = {
+    'str': (object, None),
+    'int': ('i8', 0),
+    'float': ('f8', float('nan')),
+    'bool': ('?', False),
+}
+
+_ARROW_TYPES = {
+    'str': lambda: pyarrow.string(),
+    'int': lambda: pyarrow.int64(),
+    'float': lambda: pyarrow.float64(),
+    'bool': lambda: pyarrow.bool_(),
+}
+
+
+class ColumnCollector(object):
+    """
+    Collects list results of paginated API methods straight into columns,
+    one Python list per column, without keeping the per-row dicts or the
+    page responses around.
+
+    ``columns`` is a sequence of ``(name, kind, extractor)`` tuples where
+    ``kind`` is one of ``str``, ``int``, ``float`` or ``bool`` and
+    ``extractor`` maps an item dict to the column value.
+    """
+
+    key = None
+    columns = ()
+
+    def __init__(self, columns=None, key=None):
+        if columns is not None:
+            self.columns = tuple(columns)
+        if key is not None:
+            self.key = key
+        self._data = dict((name, []) for name, _, _ in self.columns)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def add(self, items):
+        for item in items:
+            for name, _, extractor in self.columns:
+                self._data[name].append(extractor(item))
+            self._length += 1
+        return self
+
+    def collect(self, method, *args, **kwargs):
+        """
+        Drains every page of ``method`` into the collector.
+
+        :param method: Cursor-paginated bound API method, e.g.
+            ``slack.conversations.history``
+        :type method: callable
+        """
+        for response in iter_pages(method, *args, **kwargs):
+            self.add(response.body.get(self.key) or ())
+        return self
+
+    def to_columns(self):
+        return dict((name, list(values))
+                    for name, values in self._data.items())
+
+    def to_numpy(self):
+        """
+        Returns the collected data as a NumPy record array.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for to_numpy()')
+
+        dtype = [(name, _NUMPY_TYPES[kind][0]) for name, kind, _ in
+                 self.columns]
+        array = numpy.empty(self._length, dtype=dtype)
+        for name, kind, _ in self.columns:
+            missing = _NUMPY_TYPES[kind][1]
+            array[name] = [missing if v is None else v
+                           for v in self._data[name]]
+        return array.view(numpy.recarray)
+
+    def to_arrow(self):
+        """
+        Returns the collected data as a ``pyarrow.Table``.
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for to_arrow()')
+
+        arrays = [pyarrow.array(self._data[name], type=_ARROW_TYPES[kind]())
+                  for name, kind, _ in self.columns]
+        names = [name for name, _, _ in self.columns]
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    def write_parquet(self, path, **kwargs):
+        if pyarrow_parquet is None:
+            raise ImportError('pyarrow with parquet support is required for '
+                              'write_parquet()')
+        pyarrow_parquet.write_table(self.to_arrow(), path, **kwargs)
+
+    def write_ipc(self, path):
+        if pyarrow_ipc is None:
+            raise ImportError('pyarrow is required for write_ipc()')
+        table = self.to_arrow()
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+class HistoryCollector(ColumnCollector):
+    """
+    Columns for ``conversations.history`` and ``conversations.replies``.
+    """
+
+    key = 'messages'
+    columns = (
+        ('ts', 'str', _field('ts')),
+        ('user', 'str', _field('user')),
+        ('text', 'str', _field('text')),
+        ('thread_ts', 'str', _field('thread_ts')),
+        ('subtype', 'str', _field('subtype')),
+        ('reply_count', 'int', _field('reply_count')),
+        ('reaction_count', 'int', _reaction_count),
+    )
+
+
+class UserCollector(ColumnCollector):
+    """
+    Columns for ``users.list``.
+    """
+
+    key = 'members'
+    columns = (
+        ('id', 'str', _field('id')),
+        ('name', 'str', _field('name')),
+        ('real_name', 'str', _field('real_name')),
+        ('email', 'str', _profile_field('email')),
+        ('tz', 'str', _field('tz')),
+        ('deleted', 'bool', _field('deleted')),
+        ('is_bot', 'bool', _field('is_bot')),
+        ('is_admin', 'bool', _field('is_admin')),
+        ('updated', 'int', _field('updated')),
+    )
@@ -0,0 +1,264 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from slacker.utilities import iter_items
+
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('users', 'channels', 'usergroups')
+
+_SCHEMA = ''.join("""
+CREATE TABLE IF NOT EXISTS {0} (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    updated REAL NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {0}_name ON {0} (name);
+""".format(kind) for kind in KINDS) + """
+CREATE TABLE IF NOT EXISTS refreshes (
+    kind TEXT PRIMARY KEY,
+    time REAL NOT NULL
+);
+"""
+
+# fields carrying the last modification time of each kind of record
+_UPDATED = {
+    'users': ('updated',),
+    'channels': ('updated', 'created'),
+    'usergroups': ('date_update', 'date_create'),
+}
+
+
+def _updated(kind, record):
+    for field in _UPDATED[kind]:
+        if record.get(field):
+            # conversations report milliseconds
+            value = float(record[field])
+            return value / 1000. if value > 1e11 else value
+    return 0.
+
+
+class DirectorySnapshot(object):
+    """
+    SQLite snapshot of the users, channels and user groups of a workspace,
+    readable in milliseconds at startup instead of paging through
+    ``users.list``, ``conversations.list`` and ``usergroups.list``.
+
+    :meth:`refresh` pages through the lists and only rewrites the records
+    whose modification time changed, deleting the ones that disappeared.
+    :meth:`apply_event` applies Events API changes (``user_change``,
+    ``channel_rename``, ``subteam_updated``...) as they happen, so that full
+    refreshes can be rare; :meth:`start` runs them in the background.
+
+    :param path: SQLite database path
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._stop = None
+
+    def close(self):
+        self.stop()
+        self._db.close()
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def _get(self, kind, column, value):
+        rows = self._query(
+            'SELECT raw FROM {} WHERE {} = ?'.format(kind, column), (value,)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def _all(self, kind):
+        return [json.loads(raw) for (raw,) in
+                self._query('SELECT raw FROM {} ORDER BY id'.format(kind))]
+
+    def users(self):
+        return self._all('users')
+
+    def user(self, user_id):
+        return self._get('users', 'id', user_id)
+
+    def user_by_name(self, name):
+        return self._get('users', 'name', name)
+
+    def channels(self):
+        return self._all('channels')
+
+    def channel(self, channel_id):
+        return self._get('channels', 'id', channel_id)
+
+    def channel_by_name(self, name):
+        return self._get('channels', 'name', name.lstrip('#'))
+
+    def usergroups(self):
+        return self._all('usergroups')
+
+    def usergroup(self, usergroup_id):
+        return self._get('usergroups', 'id', usergroup_id)
+
+    def refreshed(self, kind):
+        """
+        :returns: Time of the last refresh of ``kind``, or None
+        """
+        rows = self._query('SELECT time FROM refreshes WHERE kind = ?',
+                           (kind,))
+        return rows[0][0] if rows else None
+
+    def _upsert(self, kind, records):
+        self._db.executemany(
+            'INSERT OR REPLACE INTO {} (id, name, updated, raw) '
+            'VALUES (?, ?, ?, ?)'.format(kind),
+            [(r['id'], r.get('handle') if kind == 'usergroups' else
+              r.get('name'), _updated(kind, r), json.dumps(r, sort_keys=True))
+             for r in records]
+        )
+
+    def _fetch(self, slack, kind):
+        if kind == 'users':
+            return iter_items(slack.users.list, 'members', limit=200)
+        if kind == 'channels':
+            return iter_items(slack.conversations.list, 'channels',
+                              types='public_channel,private_channel',
+                              limit=200)
+        return slack.usergroups.list(include_disabled=True,
+                                     include_users=True).body['usergroups']
+
+    def refresh(self, slack, kinds=KINDS):
+        """
+        Brings the snapshot up to date.
+
+        :param slack: :class:`slacker.Slacker` instance
+        :returns: Dict mapping each kind to the number of records written
+            or deleted
+        """
+        changes = {}
+        for kind in kinds:
+            started = time.time()
+            records = dict((r['id'], r) for r in self._fetch(slack, kind))
+            known = dict((record_id, (updated, raw)) for
+                         record_id, updated, raw in self._query(
+                             'SELECT id, updated, raw FROM {}'.format(kind)
+                         ))
+            changed = []
+            for record_id, record in records.items():
+                updated, raw = known.get(record_id, (None, None))
+                # membership changes do not always bump date_update, and
+                # there are few user groups, so compare them whole
+                if updated != _updated(kind, record) or \
+                        kind == 'usergroups' and \
+                        raw != json.dumps(record, sort_keys=True):
+                    changed.append(record)
+            gone = set(known).difference(records)
+
+            with self._lock:
+                with self._db:
+                    self._upsert(kind, changed)
+                    self._db.executemany(
+                        'DELETE FROM {} WHERE id = ?'.format(kind),
+                        [(record_id,) for record_id in gone]
+                    )
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO refreshes VALUES (?, ?)',
+                        (kind, started)
+                    )
+            changes[kind] = len(changed) + len(gone)
+        return changes
+
+    def _patch(self, kind, record_id, **fields):
+        record = self._get(kind, 'id', record_id) or {'id': record_id}
+        record.update(fields)
+        return record
+
+    def apply_event(self, event):
+        """
+        Applies an Events API event to the snapshot. Events of other types
+        are ignored, so it can be fed with every event received.
+
+        :returns: True if the snapshot changed
+        :rtype: bool
+        """
+        kind, upsert, delete = None, None, None
+        event_type = event.get('type')
+        if event_type in ('user_change', 'team_join'):
+            kind, upsert = 'users', event['user']
+        elif event_type in ('channel_created', 'group_created'):
+            kind, upsert = 'channels', event['channel']
+        elif event_type in ('channel_rename', 'group_rename'):
+            channel = event['channel']
+            kind, upsert = 'channels', self._patch(
+                'channels', channel['id'], name=channel['name']
+            )
+        elif event_type in ('channel_archive', 'group_archive',
+                            'channel_unarchive', 'group_unarchive'):
+            kind, upsert = 'channels', self._patch(
+                'channels', event['channel'],
+                is_archived=event_type.endswith('_archive')
+            )
+        elif event_type in ('channel_deleted', 'group_deleted'):
+            kind, delete = 'channels', event['channel']
+        elif event_type in ('subteam_created', 'subteam_updated'):
+            kind, upsert = 'usergroups', event['subteam']
+        elif event_type == 'subteam_members_changed':
+            usergroup = self.usergroup(event['subteam_id'])
+            if usergroup is None:
+                return False
+            users = set(usergroup.get('users') or ())
+            users.difference_update(event.get('removed_users') or ())
+            users.update(event.get('added_users') or ())
+            usergroup['users'] = sorted(users)
+            usergroup['user_count'] = len(users)
+            kind, upsert = 'usergroups', usergroup
+        else:
+            return False
+
+        with self._lock:
+            with self._db:
+                if upsert is not None:
+                    self._upsert(kind, [upsert])
+                else:
+                    self._db.execute(
+                        'DELETE FROM {} WHERE id = ?'.format(kind), (delete,)
+                    )
+        return True
+
+    def start(self, slack, interval=3600., kinds=KINDS):
+        """
+        Refreshes the snapshot every ``interval`` seconds from a background
+        thread, starting right away unless it was refreshed less than
+        ``interval`` seconds ago.
+        """
+        self.stop()
+        stop = self._stop = threading.Event()
+
+        def run():
+            while True:
+                last = min(self.refreshed(kind) or 0 for kind in kinds)
+                if stop.wait(max(0, last + interval - time.time())):
+                    return
+                try:
+                    self.refresh(slack, kinds)
+                except Exception as e:
+                    logger.warning('Refreshing the directory failed: %s', e)
+                    if stop.wait(interval):
+                        return
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
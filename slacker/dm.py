@@ -0,0 +1,112 @@
+import json
+import os
+import re
+import threading
+
+from slacker.utilities import dump_json_atomic, string_types
+
+
+_USER_ID = re.compile(r'^[UW][A-Z0-9]+$')
+
+
+def is_user_id(value):
+    return isinstance(value, string_types) and bool(_USER_ID.match(value))
+
+
+def _key(users):
+    """
+    Cache key of a user ID or of a group of user IDs, in any order.
+    """
+    if isinstance(users, string_types):
+        users = users.split(',')
+    return ','.join(sorted(set(users)))
+
+
+class DMCache(object):
+    """
+    Maps users, or groups of users, to the ID of their direct message
+    channel, so that DMs do not need a ``conversations.open`` call each.
+
+    :meth:`get` opens missing channels one at a time, :meth:`open_many`
+    concurrently. When ``path`` is given, the mapping is loaded from and
+    saved to that JSON file, so that it survives restarts.
+
+    :param conversations: :class:`slacker.Conversations` instance
+    :param path: JSON file to persist the cache to
+    :type path: str
+    """
+
+    def __init__(self, conversations, path=None):
+        self.conversations = conversations
+        self.path = path
+        self._channels = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._channels = json.load(f)
+
+    def __contains__(self, users):
+        return _key(users) in self._channels
+
+    def __len__(self):
+        return len(self._channels)
+
+    def _save(self):
+        if not self.path:
+            return
+        dump_json_atomic(self._channels, self.path)
+
+    def _store(self, channels):
+        with self._lock:
+            self._channels.update(channels)
+            self._save()
+
+    def _open(self, key):
+        return self.conversations.open(users=key).body['channel']['id']
+
+    def get(self, users):
+        """
+        :param users: User ID, or list of user IDs for a group DM
+        :returns: Channel ID
+        :rtype: str
+        """
+        key = _key(users)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._open(key)
+            self._store({key: channel})
+        return channel
+
+    def open_many(self, user_sets, max_workers=None):
+        """
+        Resolves many users or groups of users at once, opening the
+        missing channels concurrently.
+
+        :returns: Dict mapping every item of ``user_sets`` (lists as tuples)
+            to its channel ID or an error message
+        """
+        items = dict((tuple(users) if isinstance(users, list) else users,
+                      _key(users)) for users in user_sets)
+        missing = set(items.values()).difference(self._channels)
+        opened = {}
+
+        def open_channel(key):
+            opened[key] = self._open(key)
+
+        errors = self.conversations._bulk('conversations.open',
+                                          open_channel, missing,
+                                          max_workers)
+        self._store(opened)
+        return dict((item, self._channels.get(key) or errors[key])
+                    for item, key in items.items())
+
+    def invalidate(self, users=None):
+        """
+        Forgets the channel of ``users``, or every channel.
+        """
+        with self._lock:
+            if users is None:
+                self._channels.clear()
+            else:
+                self._channels.pop(_key(users), None)
+            self._save()
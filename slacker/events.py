@@ -0,0 +1,245 @@
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+
+from slacker import DEFAULT_TIMEOUT
+from slacker.utilities import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+# Slack rejects requests older than this, see
+# https://api.slack.com/authentication/verifying-requests-from-slack
+MAX_REQUEST_AGE = 300
+
+_STATUS = {
+    200: '200 OK',
+    400: '400 Bad Request',
+    401: '401 Unauthorized',
+    405: '405 Method Not Allowed',
+    503: '503 Service Unavailable',
+}
+
+
+def _to_bytes(value):
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def verify_signature(signing_secret, timestamp, body, signature,
+                     max_age=MAX_REQUEST_AGE, now=None):
+    """
+    Checks the ``X-Slack-Signature`` of a request signed with the app's
+    signing secret, and that its ``X-Slack-Request-Timestamp`` is less than
+    ``max_age`` seconds old.
+
+    :param body: Raw request body
+    :type body: bytes
+
+    :rtype: bool
+    """
+    try:
+        age = abs((time.time() if now is None else now) - int(timestamp))
+    except (TypeError, ValueError):
+        return False
+    if age > max_age or not signature:
+        return False
+
+    digest = hmac.new(_to_bytes(signing_secret),
+                      b'v0:' + _to_bytes(timestamp) + b':' + _to_bytes(body),
+                      hashlib.sha256).hexdigest()
+    return hmac.compare_digest(_to_bytes('v0=' + digest),
+                               _to_bytes(signature))
+
+
+class EventReceiver(object):
+    """
+    WSGI application receiving Events API callbacks, interactive payloads
+    and slash commands from Slack.
+
+    Requests are verified with the app's ``signing_secret`` and acked
+    right away; handlers then run on a pool of ``max_workers`` threads, so
+    they can take longer than the three seconds Slack waits for an answer.
+    When ``max_queue`` payloads are already waiting, requests are answered
+    with HTTP 503 and Slack retries them later. Events retried by Slack are
+    recognized by their ``event_id`` and handled only once::
+
+        receiver = EventReceiver(signing_secret)
+
+        @receiver.on('app_mention')
+        def mention(event):
+            slack.chat.post_message(event['channel'], 'Hi!')
+
+        @receiver.on('/deploy')
+        def deploy(command):
+            receiver.respond(command['response_url'], 'Deploying...')
+
+    Handlers are registered with the ``type`` of an event or interactive
+    payload (``block_actions``, ``view_submission``...), or with the name
+    of a slash command. ``*`` catches everything else. See
+    ``slacker.asgi.asgi_app`` to serve the receiver over ASGI.
+
+    :param signing_secret: Signing secret of the Slack app
+    :type signing_secret: str
+    :param session: ``requests.Session`` used by :meth:`respond`
+    :type session: requests.Session
+    """
+
+    def __init__(self, signing_secret, max_workers=DEFAULT_WORKERS,
+                 max_queue=1000, dedup_window=3600, session=None,
+                 timeout=DEFAULT_TIMEOUT, max_age=MAX_REQUEST_AGE):
+        self.signing_secret = signing_secret
+        self.dedup_window = dedup_window
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_age = max_age
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def on(self, kind, func=None):
+        """
+        Registers ``func`` as the handler of ``kind``. Can be used as a
+        decorator.
+        """
+        if func is None:
+            return lambda f: self.on(kind, f)
+        self._handlers[kind] = func
+        return func
+
+    def __call__(self, environ, start_response):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+        headers = dict(
+            (k[5:].replace('_', '-').lower(), v)
+            for k, v in environ.items() if k.startswith('HTTP_')
+        )
+        if environ.get('CONTENT_TYPE'):
+            headers['content-type'] = environ['CONTENT_TYPE']
+
+        status, content_type, content = self.handle(
+            environ.get('REQUEST_METHOD', 'GET'), headers, body
+        )
+        start_response(_STATUS[status], [
+            ('Content-Type', content_type),
+            ('Content-Length', str(len(content))),
+        ])
+        return [content]
+
+    def handle(self, method, headers, body):
+        """
+        Verifies and acks a request, queuing its payload for the handlers.
+
+        :param headers: Request headers with lower case names
+        :type headers: dict
+        :param body: Raw request body
+        :type body: bytes
+
+        :returns: ``(status, content_type, content)`` of the response
+        """
+        if method != 'POST':
+            return 405, 'text/plain', b''
+        if not verify_signature(self.signing_secret,
+                                headers.get('x-slack-request-timestamp'),
+                                body, headers.get('x-slack-signature'),
+                                self.max_age):
+            return 401, 'text/plain', b'invalid signature'
+
+        try:
+            kind, payload, event_id = self._parse(
+                headers.get('content-type', ''), body
+            )
+        except (KeyError, ValueError):
+            return 400, 'text/plain', b'malformed payload'
+
+        if kind == 'url_verification':
+            return 200, 'application/json', _to_bytes(json.dumps({
+                'challenge': payload.get('challenge')
+            }))
+        if event_id is not None and self._is_duplicate(event_id):
+            return 200, 'text/plain', b''
+        if not self._slots.acquire(False):
+            self._forget(event_id)
+            return 503, 'text/plain', b'busy'
+
+        future = self._executor.submit(self._dispatch, kind, payload)
+        future.add_done_callback(lambda _: self._slots.release())
+        return 200, 'text/plain', b''
+
+    def _parse(self, content_type, body):
+        body = body.decode('utf-8')
+        if content_type.startswith('application/json'):
+            envelope = json.loads(body)
+            if envelope['type'] == 'event_callback':
+                return (envelope['event']['type'], envelope['event'],
+                        envelope.get('event_id'))
+            return envelope['type'], envelope, None
+
+        form = dict((k, v[0]) for k, v in parse_qs(body).items())
+        if 'payload' in form:
+            payload = json.loads(form['payload'])
+            return payload['type'], payload, None
+        return form['command'], form, None
+
+    def _is_duplicate(self, event_id):
+        now = time.time()
+        with self._lock:
+            while self._seen:
+                oldest, seen = next(iter(self._seen.items()))
+                if now - seen < self.dedup_window:
+                    break
+                del self._seen[oldest]
+            if event_id in self._seen:
+                return True
+            self._seen[event_id] = now
+            return False
+
+    def _forget(self, event_id):
+        # let Slack's retry of a rejected event through
+        with self._lock:
+            self._seen.pop(event_id, None)
+
+    def _dispatch(self, kind, payload):
+        handler = self._handlers.get(kind) or self._handlers.get('*')
+        if handler is None:
+            return
+        try:
+            handler(payload)
+        except Exception:
+            logger.exception('Handler of %s failed', kind)
+
+    def respond(self, response_url, text=None, **kwargs):
+        """
+        Posts a message to the ``response_url`` of an interactive payload
+        or slash command, e.g. with ``response_type='in_channel'``.
+        """
+        if text is not None:
+            kwargs['text'] = text
+        response = self.session.post(response_url, json=kwargs,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self, wait=True):
+        """
+        Stops the workers, by default after the queued payloads have been
+        handled.
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,477 @@
+import datetime
+import itertools
+import json
+import threading
+
+from requests.structures import CaseInsensitiveDict
+
+from slacker.transport import Transport, TransportResponse
+
+
+class FakeSlackError(Exception):
+    """
+    Raised by handlers to answer with ``{"ok": false, "error": ...}``.
+    """
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true')
+
+
+def _day(ts):
+    return (datetime.datetime(1970, 1, 1) +
+            datetime.timedelta(seconds=float(ts))).date()
+
+
+def _parse_day(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _split(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return str(value).split(',')
+
+
+class FakeSlack(Transport):
+    """
+    In-memory, stateful stand-in for the Slack Web API implementing the most
+    common methods. Use it as the ``transport`` of :class:`slacker.Slacker`
+    to run code against Slack without any network access::
+
+        fake = FakeSlack()
+        general = fake.add_conversation('general')
+        slack = Slacker('xoxb-fake', transport=fake)
+        slack.chat.post_message(general, 'hello')
+
+    Every call is appended to ``calls`` as ``(api_method, args)``. Use
+    :meth:`inject` to make the next calls of a method fail with an HTTP
+    status such as 429 or 503.
+    """
+
+    def __init__(self, team_id='T0000001', user_id='U0000001',
+                 page_size=100):
+        self.team_id = team_id
+        self.user_id = user_id
+        self.page_size = page_size
+        self.users = {}
+        self.conversations = {}
+        self.messages = {}
+        self.usergroups = {}
+        self.files = {}
+        self.calls = []
+        self._failures = {}
+        self._ids = itertools.count(1)
+        self._ts = itertools.count(1)
+        self._lock = threading.RLock()
+        self.add_user('fakebot', id=user_id, is_bot=True)
+
+    def _next_id(self, prefix):
+        while True:
+            new_id = '{}{:07d}'.format(prefix, next(self._ids))
+            if new_id not in self.users and \
+                    new_id not in self.conversations and \
+                    new_id not in self.files:
+                return new_id
+
+    def _next_ts(self):
+        return '{}.{:06d}'.format(1500000000, next(self._ts))
+
+    def add_user(self, name, **fields):
+        user = {'id': fields.pop('id', None) or self._next_id('U'),
+                'team_id': self.team_id, 'name': name, 'deleted': False,
+                'presence': 'active', 'updated': 1500000000}
+        user.update(fields)
+        self.users[user['id']] = user
+        return user['id']
+
+    def add_conversation(self, name, members=(), is_private=False, **fields):
+        channel = {'id': fields.pop('id', None) or self._next_id(
+                       'G' if is_private else 'C'),
+                   'name': name, 'is_channel': not is_private,
+                   'is_group': is_private, 'is_private': is_private,
+                   'is_im': False, 'is_mpim': False, 'is_archived': False,
+                   'created': 1500000000, 'topic': {'value': ''},
+                   'purpose': {'value': ''}, 'members': list(members)}
+        channel.update(fields)
+        self.conversations[channel['id']] = channel
+        self.messages[channel['id']] = []
+        return channel['id']
+
+    def add_message(self, channel, text, user=None, thread_ts=None, **fields):
+        ts = fields.pop('ts', None) or self._next_ts()
+        message = {'type': 'message', 'ts': ts, 'text': text,
+                   'user': user or self.user_id}
+        message.update(fields)
+        if thread_ts:
+            message['thread_ts'] = thread_ts
+            parent = self._find_message(channel, thread_ts)
+            parent['thread_ts'] = thread_ts
+            parent['reply_count'] = parent.get('reply_count', 0) + 1
+            parent['latest_reply'] = ts
+        self.messages[channel].append(message)
+        return ts
+
+    def add_file(self, name, user=None, channels=(), filetype='text',
+                 **fields):
+        file_ = {'id': fields.pop('id', None) or self._next_id('F'),
+                 'name': name, 'title': name, 'filetype': filetype,
+                 'user': user or self.user_id, 'channels': list(channels),
+                 'created': 1500000000}
+        file_.update(fields)
+        self.files[file_['id']] = file_
+        return file_['id']
+
+    def inject(self, api, status=429, headers=None, times=1):
+        """
+        Makes the next ``times`` calls to ``api`` fail with ``status``.
+        """
+        self._failures[api] = [(status, headers or {})] * times
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        api = url.rstrip('/').rsplit('/', 1)[-1]
+        args = dict(params or {})
+        args.update(data or {})
+        args = dict((k, v) for k, v in args.items() if v is not None)
+        args.pop('token', None)
+
+        with self._lock:
+            self.calls.append((api, args))
+            failures = self._failures.get(api)
+            if failures:
+                status, headers = failures.pop(0)
+                return TransportResponse(status, CaseInsensitiveDict(headers),
+                                         '', url=url)
+
+            handler = getattr(self, 'api_' + api.replace('.', '_'), None)
+            try:
+                if handler is None:
+                    raise FakeSlackError('unknown_method')
+                body = handler(args)
+                body['ok'] = True
+            except FakeSlackError as e:
+                body = {'ok': False, 'error': str(e)}
+
+        return TransportResponse(
+            200, CaseInsensitiveDict({'content-type': 'application/json'}),
+            json.dumps(body), url=url
+        )
+
+    def _page(self, items, args, key):
+        limit = int(args.get('limit') or self.page_size)
+        start = int(args.get('cursor') or 0)
+        end = start + limit
+        return {
+            key: items[start:end],
+            'response_metadata': {
+                'next_cursor': str(end) if end < len(items) else ''
+            },
+        }
+
+    def _conversation(self, args, key='channel'):
+        channel = self.conversations.get(args.get(key))
+        if channel is None:
+            raise FakeSlackError('channel_not_found')
+        return channel
+
+    def _user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            raise FakeSlackError('user_not_found')
+        return user
+
+    def _find_message(self, channel, ts):
+        for message in self.messages.get(channel, ()):
+            if message['ts'] == ts:
+                return message
+        raise FakeSlackError('message_not_found')
+
+    @staticmethod
+    def _public(channel):
+        return dict((k, v) for k, v in channel.items() if k != 'members')
+
+    # api
+
+    def api_api_test(self, args):
+        if 'error' in args:
+            raise FakeSlackError(args['error'])
+        return {'args': args}
+
+    def api_auth_test(self, args):
+        return {'team_id': self.team_id, 'user_id': self.user_id,
+                'user': self.users[self.user_id]['name']}
+
+    # users
+
+    def api_users_list(self, args):
+        return self._page(list(self.users.values()), args, 'members')
+
+    def api_users_info(self, args):
+        return {'user': self._user(args.get('user'))}
+
+    def api_users_getPresence(self, args):
+        return {'presence': self._user(args.get('user'))['presence']}
+
+    # dnd
+
+    def api_dnd_teamInfo(self, args):
+        users = _split(args.get('users')) or list(self.users)
+        return {'users': dict(
+            (user, {'dnd_enabled': self._user(user).get('dnd_enabled',
+                                                        False)})
+            for user in users
+        )}
+
+    # conversations
+
+    def api_conversations_create(self, args):
+        name = args.get('name')
+        if any(c['name'] == name for c in self.conversations.values()):
+            raise FakeSlackError('name_taken')
+        channel_id = self.add_conversation(
+            name, members=[self.user_id] + _split(args.get('user_ids')),
+            is_private=_flag(args.get('is_private'))
+        )
+        return {'channel': self._public(self.conversations[channel_id])}
+
+    def api_conversations_info(self, args):
+        return {'channel': self._public(self._conversation(args))}
+
+    def api_conversations_list(self, args):
+        types = _split(args.get('types')) or ['public_channel']
+        channels = []
+        for channel in self.conversations.values():
+            if _flag(args.get('exclude_archived')) and channel['is_archived']:
+                continue
+            kind = 'private_channel' if channel['is_private'] else \
+                'public_channel'
+            if channel['is_im']:
+                kind = 'im'
+            elif channel['is_mpim']:
+                kind = 'mpim'
+            if kind in types:
+                channels.append(self._public(channel))
+        return self._page(channels, args, 'channels')
+
+    def api_conversations_members(self, args):
+        return self._page(self._conversation(args)['members'], args,
+                          'members')
+
+    def api_conversations_invite(self, args):
+        channel = self._conversation(args)
+        users = _split(args.get('users'))
+        for user in users:
+            self._user(user)
+            if user in channel['members']:
+                raise FakeSlackError('already_in_channel')
+        channel['members'].extend(users)
+        return {'channel': self._public(channel)}
+
+    def api_conversations_kick(self, args):
+        channel = self._conversation(args)
+        user = args.get('user')
+        if user not in channel['members']:
+            raise FakeSlackError('not_in_channel')
+        channel['members'].remove(user)
+        return {}
+
+    def api_conversations_join(self, args):
+        channel = self._conversation(args)
+        if self.user_id not in channel['members']:
+            channel['members'].append(self.user_id)
+        return {'channel': self._public(channel)}
+
+    def api_conversations_leave(self, args):
+        channel = self._conversation(args)
+        if self.user_id in channel['members']:
+            channel['members'].remove(self.user_id)
+        return {}
+
+    def api_conversations_archive(self, args):
+        self._conversation(args)['is_archived'] = True
+        return {}
+
+    def api_conversations_unarchive(self, args):
+        self._conversation(args)['is_archived'] = False
+        return {}
+
+    def api_conversations_rename(self, args):
+        channel = self._conversation(args)
+        channel['name'] = args.get('name')
+        return {'channel': self._public(channel)}
+
+    def api_conversations_setTopic(self, args):
+        self._conversation(args)['topic'] = {'value': args.get('topic')}
+        return {}
+
+    def api_conversations_setPurpose(self, args):
+        self._conversation(args)['purpose'] = {'value': args.get('purpose')}
+        return {}
+
+    def api_conversations_open(self, args):
+        users = sorted(_split(args.get('users')))
+        for user in users:
+            self._user(user)
+        is_im = len(users) == 1
+        for channel in self.conversations.values():
+            if (channel['is_im'] or channel['is_mpim']) and \
+                    sorted(channel['members']) == users:
+                return {'channel': {'id': channel['id']}}
+        channel_id = self.add_conversation(
+            '', members=users, is_private=True, is_im=is_im,
+            is_mpim=not is_im,
+            id=self._next_id('D' if is_im else 'G')
+        )
+        return {'channel': {'id': channel_id}}
+
+    def api_conversations_history(self, args):
+        self._conversation(args)
+        latest = float(args.get('latest') or 'inf')
+        oldest = float(args.get('oldest') or 0)
+        messages = [
+            m for m in reversed(self.messages[args['channel']])
+            if oldest < float(m['ts']) < latest and
+            m.get('thread_ts', m['ts']) == m['ts']
+        ]
+        if not _flag(args.get('include_all_metadata')):
+            messages = [dict((k, v) for k, v in m.items() if k != 'metadata')
+                        for m in messages]
+        return self._page(messages, args, 'messages')
+
+    def api_conversations_replies(self, args):
+        self._conversation(args)
+        ts = args.get('ts')
+        self._find_message(args['channel'], ts)
+        messages = [m for m in self.messages[args['channel']]
+                    if m['ts'] == ts or m.get('thread_ts') == ts]
+        return self._page(messages, args, 'messages')
+
+    # chat
+
+    def api_chat_postMessage(self, args):
+        channel = args.get('channel')
+        if channel in self.users:
+            channel = self.api_conversations_open({'users': channel})[
+                'channel']['id']
+        self._conversation({'channel': channel})
+        fields = dict((k, args[k]) for k in ('blocks', 'attachments')
+                      if k in args)
+        if 'metadata' in args:
+            fields['metadata'] = json.loads(args['metadata'])
+        ts = self.add_message(channel, args.get('text'),
+                              thread_ts=args.get('thread_ts'), **fields)
+        return {'channel': channel, 'ts': ts,
+                'message': self._find_message(channel, ts)}
+
+    def api_chat_postEphemeral(self, args):
+        self._conversation(args)
+        return {'message_ts': self._next_ts()}
+
+    def api_chat_update(self, args):
+        self._conversation(args)
+        message = self._find_message(args['channel'], args.get('ts'))
+        for key in ('text', 'blocks', 'attachments'):
+            if key in args:
+                message[key] = args[key]
+        return {'channel': args['channel'], 'ts': message['ts'],
+                'text': message.get('text')}
+
+    def api_chat_delete(self, args):
+        self._conversation(args)
+        message = self._find_message(args['channel'], args.get('ts'))
+        self.messages[args['channel']].remove(message)
+        return {'channel': args['channel'], 'ts': message['ts']}
+
+    # files
+
+    def api_files_list(self, args):
+        ts_from = float(args.get('ts_from') or 0)
+        ts_to = float(args.get('ts_to') or 'inf')
+        files = sorted(
+            (f for f in self.files.values()
+             if ts_from <= f['created'] <= ts_to and
+             args.get('user') in (None, f['user']) and
+             args.get('channel') in [None] + f['channels']),
+            key=lambda f: f['created'], reverse=True
+        )
+        count = int(args.get('count') or self.page_size)
+        page = int(args.get('page') or 1)
+        return {
+            'files': files[(page - 1) * count:page * count],
+            'paging': {'count': count, 'total': len(files), 'page': page,
+                       'pages': max(1, -(-len(files) // count))},
+        }
+
+    def api_files_delete(self, args):
+        if self.files.pop(args.get('file'), None) is None:
+            raise FakeSlackError('file_not_found')
+        return {}
+
+    # search
+
+    def api_search_messages(self, args):
+        words, after, before = [], None, None
+        for term in args.get('query', '').split():
+            if term.startswith('after:'):
+                after = _parse_day(term[6:])
+            elif term.startswith('before:'):
+                before = _parse_day(term[7:])
+            else:
+                words.append(term.lower())
+
+        matches = []
+        for channel_id, messages in self.messages.items():
+            channel = {'id': channel_id,
+                       'name': self.conversations[channel_id]['name']}
+            for message in messages:
+                day = _day(message['ts'])
+                text = (message.get('text') or '').lower()
+                if (after and day <= after) or (before and day >= before) or \
+                        not all(word in text for word in words):
+                    continue
+                matches.append(dict(message, channel=channel))
+        matches.sort(key=lambda m: float(m['ts']),
+                     reverse=args.get('sort_dir') != 'asc')
+
+        count = int(args.get('count') or 20)
+        page = int(args.get('page') or 1)
+        pages = max(1, -(-len(matches) // count))
+        return {
+            'query': args.get('query'),
+            'messages': {
+                'matches': matches[(page - 1) * count:page * count],
+                'total': len(matches),
+                'paging': {'count': count, 'total': len(matches),
+                           'page': page, 'pages': pages},
+            },
+        }
+
+    # usergroups
+
+    def api_usergroups_list(self, args):
+        usergroups = []
+        for usergroup_id, users in sorted(self.usergroups.items()):
+            usergroup = {'id': usergroup_id, 'team_id': self.team_id,
+                         'handle': usergroup_id.lower(),
+                         'date_update': 1500000000,
+                         'user_count': len(users)}
+            if _flag(args.get('include_users')):
+                usergroup['users'] = list(users)
+            usergroups.append(usergroup)
+        return {'usergroups': usergroups}
+
+    def api_usergroups_users_list(self, args):
+        usergroup = self.usergroups.get(args.get('usergroup'))
+        if usergroup is None:
+            raise FakeSlackError('no_such_subteam')
+        return {'users': list(usergroup)}
+
+    def api_usergroups_users_update(self, args):
+        if args.get('usergroup') not in self.usergroups:
+            raise FakeSlackError('no_such_subteam')
+        users = _split(args.get('users'))
+        self.usergroups[args['usergroup']] = users
+        return {'usergroup': {'id': args['usergroup'], 'users': users}}
@@ -0,0 +1,209 @@
+import collections
+import logging
+import threading
+import time
+
+import requests
+
+from slacker import DEFAULT_WAIT
+
+
+class SlackHandler(logging.Handler):
+    """
+    Logging handler posting records to Slack without ever blocking the
+    logging thread.
+
+    Records are formatted and put on a bounded queue which a worker thread
+    drains in batches, posting each batch as a single message, split when
+    longer than ``max_length`` characters, either with
+    ``chat.post_message(channel, ...)`` or through an incoming ``webhook``.
+    Identical messages seen again within ``dedup_window`` seconds are
+    counted instead of sent; the count is reported once the window is over,
+    or on :meth:`close`. Posts are spaced at least ``min_interval`` seconds
+    apart and HTTP 429 responses pause the worker for ``Retry-After``.
+
+    When the queue is full, ``drop`` decides whether the ``oldest`` queued
+    record or the ``newest`` one is discarded; ``dropped`` counts them.
+
+    :param chat: :class:`slacker.Chat` instance, used with ``channel``
+    :param webhook: :class:`slacker.IncomingWebhook` instance
+    """
+
+    def __init__(self, chat=None, channel=None, webhook=None,
+                 level=logging.NOTSET, max_queue=1000, drop='oldest',
+                 batch_size=20, flush_interval=1., dedup_window=60.,
+                 min_interval=1., max_length=3000):
+        if (chat is None) == (webhook is None):
+            raise ValueError('Pass exactly one of chat or webhook')
+        if chat is not None and not channel:
+            raise ValueError('channel is required with chat')
+        if drop not in ('oldest', 'newest'):
+            raise ValueError('drop must be oldest or newest')
+
+        super(SlackHandler, self).__init__(level)
+        self.chat = chat
+        self.channel = channel
+        self.webhook = webhook
+        self.drop = drop
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedup_window = dedup_window
+        self.min_interval = min_interval
+        self.max_length = max_length
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._max_queue = max_queue
+        self._cond = threading.Condition()
+        self._seen = {}
+        self._busy = False
+        self._closed = False
+        self._last_sent = 0
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, record):
+        # never feed the handler with what its own requests log
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._cond:
+            if len(self._queue) >= self._max_queue:
+                self.dropped += 1
+                if self.drop == 'newest':
+                    return
+                self._queue.popleft()
+            self._queue.append(message)
+            # wake the worker up to start a batch, then when it is full
+            if len(self._queue) in (1, self.batch_size):
+                self._cond.notify_all()
+
+    def flush(self, timeout=5.):
+        deadline = time.time() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while (self._queue or self._busy) and time.time() < deadline:
+                self._cond.wait(deadline - time.time())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(5.)
+        super(SlackHandler, self).close()
+
+    def _dedup(self, messages, now, final=False):
+        unique = []
+        for message in messages:
+            seen = self._seen.get(message)
+            if seen and now - seen[0] < self.dedup_window:
+                seen[1] += 1
+                continue
+            unique.append(message)
+            self._seen[message] = [now, 0]
+
+        # report and forget repeats whose window is over, or all of them
+        # when closing
+        for message, seen in list(self._seen.items()):
+            if final or now - seen[0] >= self.dedup_window:
+                if seen[1]:
+                    unique.append('{} (repeated {} more times)'.format(
+                        message, seen[1]
+                    ))
+                del self._seen[message]
+        return unique
+
+    def _next_report(self, now):
+        """
+        :returns: Seconds until the window of a repeated message is over,
+            or None
+        """
+        ends = [seen[0] + self.dedup_window for seen in self._seen.values()
+                if seen[1]]
+        return min(ends) - now if ends else None
+
+    def _split(self, messages):
+        """
+        Joins messages into texts of at most ``max_length`` characters,
+        truncating the messages that are longer on their own.
+        """
+        texts = []
+        lines, length = [], -1
+        for message in messages:
+            message = message[:self.max_length]
+            if lines and length + 1 + len(message) > self.max_length:
+                texts.append('\n'.join(lines))
+                lines, length = [], -1
+            lines.append(message)
+            length += 1 + len(message)
+        if lines:
+            texts.append('\n'.join(lines))
+        return texts
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                # wake up to report repeats even when nothing is logged
+                timeout = self._next_report(time.time())
+                if timeout is not None and timeout <= 0:
+                    break
+                self._cond.wait(timeout)
+            deadline = time.time() + self.flush_interval
+            while self._queue and len(self._queue) < self.batch_size and \
+                    not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft()
+                     for _ in range(min(self.batch_size, len(self._queue)))]
+            self._busy = True
+            return batch, self._closed and not self._queue
+
+    def _post(self, text):
+        if self.webhook is not None:
+            self.webhook.post({'text': text}).raise_for_status()
+        else:
+            self.chat.post_message(self.channel, text)
+
+    def _send(self, text):
+        wait = self._last_sent + self.min_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            self._post(text)
+        except requests.HTTPError as e:
+            response = e.response
+            if response is None or \
+                    response.status_code != requests.codes.too_many:
+                raise
+            time.sleep(int(response.headers.get('retry-after',
+                                                DEFAULT_WAIT)))
+            self._post(text)
+        finally:
+            self._last_sent = time.time()
+
+    def _run(self):
+        while True:
+            batch, final = self._take_batch()
+            text = None
+            try:
+                # records longer than max_length together are split across
+                # several posts rather than cut off
+                for text in self._split(self._dedup(batch, time.time(),
+                                                    final)):
+                    self._send(text)
+            except Exception:
+                # the logging machinery reports it on stderr
+                self.handleError(logging.makeLogRecord({'msg': text}))
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+            if final:
+                return
@@ -0,0 +1,246 @@
+import calendar
+import datetime
+import json
+import sqlite3
+import threading
+
+from slacker import Response
+from slacker.utilities import iter_items, iter_pages, string_types
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    time REAL NOT NULL,
+    user TEXT,
+    thread_ts TEXT,
+    text TEXT,
+    raw TEXT NOT NULL,
+    UNIQUE (channel, ts)
+);
+CREATE INDEX IF NOT EXISTS messages_time ON messages (time);
+CREATE INDEX IF NOT EXISTS messages_user ON messages (user, time);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text)
+    VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text)
+    VALUES ('delete', old.id, old.text);
+    INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TABLE IF NOT EXISTS channels (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    latest TEXT
+);
+CREATE TABLE IF NOT EXISTS threads (
+    channel TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    latest_reply TEXT,
+    PRIMARY KEY (channel, ts)
+);
+"""
+
+_UPSERT = """
+INSERT INTO messages (channel, ts, time, user, thread_ts, text, raw)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel, ts) DO UPDATE SET
+    user = excluded.user, thread_ts = excluded.thread_ts,
+    text = excluded.text, raw = excluded.raw
+"""
+
+
+def _epoch(day):
+    if isinstance(day, string_types):
+        day = datetime.datetime.strptime(day, '%Y-%m-%d').date()
+    return calendar.timegm(day.timetuple())
+
+
+def _fts_query(words):
+    # quote every word so punctuation is never read as FTS5 syntax
+    return ' '.join('"{}"'.format(w.replace('"', '""')) for w in words)
+
+
+class SearchIndex(object):
+    """
+    Local full-text index of channel history backed by SQLite FTS5.
+
+    Feed it with :meth:`add_messages`, or let :meth:`sync` fetch whatever
+    was posted since the last sync (including new thread replies), then
+    query it with :meth:`messages`, which accepts the same arguments as
+    ``Search.messages`` and returns a response of the same shape. The
+    ``from:``, ``in:``, ``after:`` and ``before:`` query modifiers are
+    supported, with user and channel IDs.
+
+    :param path: SQLite database path, in memory by default
+    :type path: str
+    """
+
+    def __init__(self, path=':memory:'):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    def add_messages(self, channel, messages, channel_name=None):
+        rows = [
+            (channel, m['ts'], float(m['ts']), m.get('user'),
+             m.get('thread_ts'), m.get('text') or '', json.dumps(m))
+            for m in messages
+        ]
+        with self._lock:
+            with self._db:
+                self._db.executemany(_UPSERT, rows)
+                if channel_name is not None:
+                    self._db.execute(
+                        'INSERT INTO channels (id, name) VALUES (?, ?) '
+                        'ON CONFLICT (id) DO UPDATE SET name = excluded.name',
+                        (channel, channel_name)
+                    )
+        return len(rows)
+
+    def _state(self, sql, args):
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()
+
+    def sync(self, conversations, channel, channel_name=None, replies=True,
+             lookback=0):
+        """
+        Indexes messages posted to ``channel`` since the previous sync.
+        Threads whose ``latest_reply`` changed are refetched when
+        ``replies`` is true.
+
+        History only reports new replies through their parent message, so
+        parents older than the previous sync are only seen again if they
+        were posted less than ``lookback`` seconds before it.
+
+        :param conversations: :class:`slacker.Conversations` instance
+        :returns: Number of messages indexed
+        :rtype: int
+        """
+        state = self._state('SELECT latest FROM channels WHERE id = ?',
+                            (channel,))
+        latest = state[0] if state else None
+        added = 0
+        newest = latest
+        oldest = latest
+        if latest and lookback:
+            oldest = '{:.6f}'.format(float(latest) - lookback)
+
+        for response in iter_pages(conversations.history, channel,
+                                   oldest=oldest, limit=200):
+            messages = response.body['messages']
+            added += self.add_messages(channel, messages, channel_name)
+            for message in messages:
+                if newest is None or float(message['ts']) > float(newest):
+                    newest = message['ts']
+
+        if replies:
+            added += self._sync_threads(conversations, channel)
+
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT INTO channels (id, name, latest) VALUES (?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET latest = excluded.latest, '
+                    'name = COALESCE(excluded.name, name)',
+                    (channel, channel_name, newest)
+                )
+        return added
+
+    def _sync_threads(self, conversations, channel):
+        with self._lock:
+            parents = self._db.execute(
+                "SELECT m.ts, json_extract(m.raw, '$.latest_reply') "
+                'FROM messages m LEFT JOIN threads t '
+                'ON t.channel = m.channel AND t.ts = m.ts '
+                "WHERE m.channel = ? AND m.ts = m.thread_ts "
+                "AND json_extract(m.raw, '$.latest_reply') IS NOT "
+                't.latest_reply', (channel,)
+            ).fetchall()
+
+        added = 0
+        for ts, latest_reply in parents:
+            added += self.add_messages(channel, [
+                m for m in iter_items(conversations.replies, 'messages',
+                                      channel, ts, limit=200)
+                if m['ts'] != ts
+            ])
+            with self._lock:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO threads VALUES (?, ?, ?)',
+                        (channel, ts, latest_reply)
+                    )
+        return added
+
+    def messages(self, query, sort=None, sort_dir=None, highlight=None,
+                 count=20, page=1):
+        """
+        Searches the index like ``Search.messages``. Only ``timestamp``
+        sorting is supported; ``highlight`` is ignored.
+
+        :rtype: slacker.Response
+        """
+        words, where, args = [], [], []
+        for term in query.split():
+            modifier, _, value = term.partition(':')
+            if value and modifier == 'from':
+                where.append('m.user = ?')
+                args.append(value.lstrip('@<').rstrip('>'))
+            elif value and modifier == 'in':
+                where.append('(m.channel = ? OR c.name = ?)')
+                args.extend([value.lstrip('#<').rstrip('>')] * 2)
+            elif value and modifier == 'after':
+                where.append('m.time >= ?')
+                args.append(_epoch(value) + 86400)
+            elif value and modifier == 'before':
+                where.append('m.time < ?')
+                args.append(_epoch(value))
+            else:
+                words.append(term)
+        if words:
+            where.append('m.id IN (SELECT rowid FROM messages_fts '
+                         'WHERE messages_fts MATCH ?)')
+            args.append(_fts_query(words))
+
+        sql = ('FROM messages m LEFT JOIN channels c ON c.id = m.channel ' +
+               ('WHERE ' + ' AND '.join(where) if where else ''))
+        order = 'ASC' if sort_dir == 'asc' else 'DESC'
+        count, page = int(count or 20), int(page or 1)
+        with self._lock:
+            total = self._db.execute('SELECT COUNT(*) ' + sql,
+                                     args).fetchone()[0]
+            rows = self._db.execute(
+                'SELECT m.raw, m.channel, c.name ' + sql +
+                ' ORDER BY m.time {} LIMIT ? OFFSET ?'.format(order),
+                args + [count, (page - 1) * count]
+            ).fetchall()
+
+        matches = []
+        for raw, channel, name in rows:
+            match = json.loads(raw)
+            match['channel'] = {'id': channel, 'name': name}
+            matches.append(match)
+
+        return Response(json.dumps({
+            'ok': True,
+            'query': query,
+            'messages': {
+                'matches': matches,
+                'total': total,
+                'paging': {'count': count, 'total': total, 'page': page,
+                           'pages': max(1, -(-total // count))},
+            },
+        }))
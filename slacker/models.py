@@ -0,0 +1,195 @@
+import sys
+
+from slacker.utilities import string_types
+
+
+try:
+    intern = sys.intern
+except AttributeError:  # Python 2
+    _strings = {}
+
+    def intern(value):
+        # the builtin only takes byte strings, JSON gives unicode ones
+        return _strings.setdefault(value, value)
+
+
+class Model(object):
+    """
+    Compact, read-only view of a Slack API object.
+
+    Scalar fields listed in ``_fields`` are copied into slots; strings listed
+    in ``_interned`` (IDs that repeat across many objects) are interned so
+    that every object shares a single copy. Fields listed in ``_nested`` are
+    kept as the raw value and converted into their model class on first
+    access. Anything else found in the source dict is dropped unless
+    ``keep_extra`` is true.
+    """
+
+    __slots__ = ('_extra',)
+
+    _fields = ()
+    _interned = ()
+    _nested = {}
+
+    def __init__(self, data, keep_extra=False):
+        for name in self._fields:
+            value = data.get(name)
+            if name in self._interned and isinstance(value, string_types):
+                value = intern(value)
+            setattr(self, name, value)
+
+        for name in self._nested:
+            setattr(self, '_' + name, data.get(name))
+
+        if keep_extra:
+            known = set(self._fields).union(self._nested)
+            self._extra = dict(
+                (k, v) for k, v in data.items() if k not in known
+            ) or None
+        else:
+            self._extra = None
+
+    @classmethod
+    def from_list(cls, items, keep_extra=False):
+        return [cls(item, keep_extra=keep_extra) for item in items]
+
+    def get(self, name, default=None):
+        if name in self._fields or name in self._nested:
+            value = getattr(self, name)
+        elif self._extra:
+            value = self._extra.get(name)
+        else:
+            value = None
+        return default if value is None else value
+
+    def to_dict(self):
+        data = dict(self._extra or {})
+        for name in self._fields:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        for name in self._nested:
+            value = getattr(self, '_' + name)
+            if isinstance(value, Model):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = [v.to_dict() if isinstance(v, Model) else v
+                         for v in value]
+            if value is not None:
+                data[name] = value
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, type(self)):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        key = self._fields[0] if self._fields else None
+        return '<{} {}={!r}>'.format(
+            type(self).__name__, key, getattr(self, key, None)
+        )
+
+
+def _nested_property(name, model, many=False):
+    """
+    Returns a property which materializes the raw value stored in
+    ``_<name>`` into ``model`` instances on first access.
+    """
+    attr = '_' + name
+
+    def getter(self):
+        value = getattr(self, attr)
+        if value is None:
+            return None
+        if many:
+            if value and isinstance(value[0], dict):
+                value = model.from_list(value)
+                setattr(self, attr, value)
+        elif isinstance(value, dict):
+            value = model(value)
+            setattr(self, attr, value)
+        return value
+
+    return property(getter)
+
+
+def _make_model(name, fields, interned=(), nested=None):
+    """
+    Builds a Model subclass with one slot per field, so that instances
+    carry no per-object ``__dict__``.
+    """
+    nested = nested or {}
+    namespace = {
+        '__slots__': tuple(fields) + tuple('_' + n for n in nested),
+        '_fields': tuple(fields),
+        '_interned': frozenset(interned),
+        '_nested': dict((n, spec[0]) for n, spec in nested.items()),
+    }
+    for field, (model, many) in nested.items():
+        namespace[field] = _nested_property(field, model, many)
+    return type(name, (Model,), namespace)
+
+
+Reaction = _make_model(
+    'Reaction', ('name', 'count', 'users'), interned=('name',)
+)
+
+UserProfile = _make_model(
+    'UserProfile',
+    ('real_name', 'display_name', 'email', 'title', 'phone', 'status_text',
+     'status_emoji', 'image_48', 'team'),
+    interned=('team',)
+)
+
+User = _make_model(
+    'User',
+    ('id', 'team_id', 'name', 'real_name', 'deleted', 'is_bot', 'is_admin',
+     'is_owner', 'tz', 'updated'),
+    interned=('id', 'team_id', 'tz'),
+    nested={'profile': (UserProfile, False)}
+)
+
+File = _make_model(
+    'File',
+    ('id', 'created', 'timestamp', 'name', 'title', 'mimetype', 'filetype',
+     'user', 'size', 'url_private', 'permalink', 'channels', 'groups', 'ims'),
+    interned=('id', 'user', 'filetype', 'mimetype')
+)
+
+Message = _make_model(
+    'Message',
+    ('ts', 'type', 'subtype', 'user', 'bot_id', 'text', 'thread_ts',
+     'reply_count', 'latest_reply', 'team', 'channel'),
+    interned=('type', 'subtype', 'user', 'bot_id', 'team', 'channel'),
+    nested={'reactions': (Reaction, True), 'files': (File, True)}
+)
+
+Conversation = _make_model(
+    'Conversation',
+    ('id', 'name', 'created', 'creator', 'is_channel', 'is_group', 'is_im',
+     'is_mpim', 'is_private', 'is_archived', 'is_general', 'is_member',
+     'num_members', 'user', 'updated'),
+    interned=('id', 'creator', 'user')
+)
+
+# top-level keys of API responses and the models used to view them
+RESPONSE_MODELS = {
+    'messages': Message,
+    'message': Message,
+    'members': User,
+    'user': User,
+    'channels': Conversation,
+    'channel': Conversation,
+    'groups': Conversation,
+    'group': Conversation,
+    'ims': Conversation,
+    'files': File,
+    'file': File,
+}
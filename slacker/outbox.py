@@ -0,0 +1,324 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+
+from slacker import CircuitOpen, DeadlineExceeded, Error
+from slacker.utilities import DEFAULT_WORKERS, iter_items, string_types
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# metadata carried by posted messages so that they can be found after a crash
+METADATA_EVENT = 'slacker_outbox'
+MARKER_KEY = 'slacker_outbox_id'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    action TEXT NOT NULL,
+    target INTEGER,
+    kwargs TEXT NOT NULL,
+    state TEXT NOT NULL,
+    ts TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_channel_state ON outbox (channel, state);
+"""
+
+
+def _marker(row_id, created):
+    """
+    Identifies an outbox row across databases sharing a channel.
+    """
+    return '{}:{:.6f}'.format(row_id, created)
+
+
+def _with_marker(metadata, marker):
+    if isinstance(metadata, string_types):
+        metadata = json.loads(metadata)
+    metadata = dict(metadata or {'event_type': METADATA_EVENT})
+    payload = dict(metadata.get('event_payload') or {})
+    payload[MARKER_KEY] = marker
+    metadata['event_payload'] = payload
+    return metadata
+
+
+class Outbox(object):
+    """
+    Durable, SQLite backed queue in front of the ``chat`` API.
+
+    Every :meth:`post_message`, :meth:`update` and :meth:`delete` is first
+    written to the database and then delivered by background workers, in
+    order within a channel and concurrently across channels. The ``ts`` of
+    delivered messages is stored so that later updates and deletes can
+    refer to messages by their outbox ID before they are even sent.
+
+    Messages interrupted by a crash while being sent are reconciled on
+    startup: every message is posted with metadata carrying a marker of its
+    outbox row, and if the channel history since the message was queued
+    already contains that marker, its ``ts`` is recorded instead of posting
+    it a second time. Metadata passed to :meth:`post_message` is kept, with
+    the marker added to its ``event_payload``.
+
+    Slack errors (``channel_not_found``...) and unexpected exceptions, such
+    as invalid arguments, fail a message permanently; network errors, HTTP
+    errors, open circuits and exceeded deadlines are retried after
+    ``retry_interval`` seconds without breaking the order of the channel.
+
+    :param slack: :class:`slacker.Slacker` instance
+    :param path: SQLite database path
+    :type path: str
+    """
+
+    def __init__(self, slack, path, max_workers=DEFAULT_WORKERS,
+                 poll_interval=.5, retry_interval=5.):
+        self.slack = slack
+        self.path = path
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._active = set()
+        self._retry_at = {}
+        self._threads = []
+        self._stopped = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            with self._db:
+                return self._db.execute(sql, args).fetchall()
+
+    def _enqueue(self, channel, action, kwargs, target=None):
+        with self._lock:
+            with self._db:
+                cursor = self._db.execute(
+                    'INSERT INTO outbox (channel, action, target, kwargs, '
+                    'state, created) VALUES (?, ?, ?, ?, ?, ?)',
+                    (channel, action, target, json.dumps(kwargs), PENDING,
+                     time.time())
+                )
+            self._wakeup.notify_all()
+            return cursor.lastrowid
+
+    def post_message(self, channel, text=None, **kwargs):
+        """
+        Queues ``chat.post_message``. Accepts the same arguments.
+
+        :returns: Outbox ID of the message
+        :rtype: int
+        """
+        kwargs['text'] = text
+        return self._enqueue(channel, 'post_message', kwargs)
+
+    def update(self, message_id, text, **kwargs):
+        """
+        Queues ``chat.update`` of a message queued with :meth:`post_message`.
+        """
+        kwargs['text'] = text
+        return self._enqueue(self._channel(message_id), 'update', kwargs,
+                             message_id)
+
+    def delete(self, message_id, **kwargs):
+        """
+        Queues ``chat.delete`` of a message queued with :meth:`post_message`.
+        """
+        return self._enqueue(self._channel(message_id), 'delete', kwargs,
+                             message_id)
+
+    def _channel(self, message_id):
+        rows = self._execute(
+            "SELECT channel FROM outbox WHERE id = ? AND "
+            "action = 'post_message'", (message_id,)
+        )
+        if not rows:
+            raise KeyError(message_id)
+        return rows[0][0]
+
+    def status(self, outbox_id):
+        """
+        :returns: Dict with the ``state``, ``ts``, ``error`` and
+            ``attempts`` of a queued item
+        """
+        rows = self._execute(
+            'SELECT state, ts, error, attempts FROM outbox WHERE id = ?',
+            (outbox_id,)
+        )
+        if not rows:
+            raise KeyError(outbox_id)
+        return dict(zip(('state', 'ts', 'error', 'attempts'), rows[0]))
+
+    def pending(self):
+        return self._execute(
+            'SELECT COUNT(*) FROM outbox WHERE state IN (?, ?)',
+            (PENDING, SENDING)
+        )[0][0]
+
+    def start(self):
+        self._recover()
+        for _ in range(self.max_workers):
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def drain(self, timeout=None):
+        """
+        Blocks until nothing is left to deliver.
+
+        :returns: False if ``timeout`` elapsed first
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self.pending():
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining)
+        return True
+
+    def _recover(self):
+        for row_id, channel, action, created in self._execute(
+                'SELECT id, channel, action, created FROM outbox '
+                'WHERE state = ?', (SENDING,)):
+            ts = None
+            if action == 'post_message':
+                ts = self._find_posted(channel, _marker(row_id, created),
+                                       created)
+            if ts:
+                self._mark(row_id, SENT, ts=ts)
+            else:
+                self._mark(row_id, PENDING)
+
+    def _find_posted(self, channel, marker, created):
+        for message in iter_items(
+                self.slack.conversations.history, 'messages', channel,
+                oldest='{:.6f}'.format(created), limit=200,
+                include_all_metadata=True):
+            metadata = message.get('metadata') or {}
+            if (metadata.get('event_payload') or {}).get(MARKER_KEY) == \
+                    marker:
+                return message['ts']
+
+    def _mark(self, row_id, state, ts=None, error=None, attempt=False):
+        self._execute(
+            'UPDATE outbox SET state = ?, ts = COALESCE(?, ts), error = ?, '
+            'attempts = attempts + ?, updated = ? WHERE id = ?',
+            (state, ts, error, int(attempt), time.time(), row_id)
+        )
+
+    def _claim_channel(self):
+        now = time.time()
+        rows = self._execute(
+            'SELECT DISTINCT channel FROM outbox WHERE state = ?', (PENDING,)
+        )
+        for (channel,) in rows:
+            if channel not in self._active and \
+                    self._retry_at.get(channel, 0) <= now:
+                self._active.add(channel)
+                return channel
+
+    def _run(self):
+        while True:
+            with self._lock:
+                channel = None
+                while not self._stopped:
+                    channel = self._claim_channel()
+                    if channel:
+                        break
+                    self._wakeup.wait(self.poll_interval)
+                if channel is None:
+                    return
+            try:
+                self._deliver_channel(channel)
+            finally:
+                with self._lock:
+                    self._active.discard(channel)
+                    self._wakeup.notify_all()
+
+    def _deliver_channel(self, channel):
+        while not self._stopped:
+            rows = self._execute(
+                'SELECT id, action, target, kwargs, created FROM outbox '
+                'WHERE channel = ? AND state = ? ORDER BY id LIMIT 1',
+                (channel, PENDING)
+            )
+            if not rows:
+                return
+            row_id, action, target, kwargs, created = rows[0]
+            self._mark(row_id, SENDING, attempt=True)
+            try:
+                ts = self._deliver(channel, action, target,
+                                   json.loads(kwargs),
+                                   _marker(row_id, created))
+            except (CircuitOpen, DeadlineExceeded,
+                    requests.RequestException) as e:
+                logger.warning('Delivery to %s failed, retrying: %s',
+                               channel, e)
+                self._mark(row_id, PENDING, error=str(e))
+                with self._lock:
+                    self._retry_at[channel] = time.time() + \
+                        self.retry_interval
+                return
+            except Error as e:
+                self._mark(row_id, FAILED, error=str(e))
+            except Exception as e:
+                # e.g. a bad argument: fail the message, not the worker
+                logger.exception('Delivery to %s failed', channel)
+                self._mark(row_id, FAILED, error=str(e) or type(e).__name__)
+            else:
+                self._mark(row_id, SENT, ts=ts)
+
+    def _deliver(self, channel, action, target, kwargs, marker):
+        if action == 'post_message':
+            kwargs['metadata'] = _with_marker(kwargs.get('metadata'), marker)
+            return self.slack.chat.post_message(channel, **kwargs).body['ts']
+
+        state, ts = self._execute(
+            'SELECT state, ts FROM outbox WHERE id = ?', (target,)
+        )[0]
+        if state != SENT:
+            raise Error('target_not_sent')
+        if action == 'update':
+            self.slack.chat.update(channel, ts, **kwargs)
+            return ts
+        try:
+            self.slack.chat.delete(channel, ts, **kwargs)
+        except Error as e:
+            # already gone, e.g. when replaying a delete after a crash
+            if str(e) != 'message_not_found':
+                raise
+        return ts
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+
+from slacker.utilities import chunks
+
+
+logger = logging.getLogger(__name__)
+
+DND_BATCH_SIZE = 50
+
+
+class PresenceTracker(object):
+    """
+    Polls the presence and Do Not Disturb status of many users, reporting
+    only what changed.
+
+    Each poll only covers the users that are due. Presence is fetched
+    concurrently with ``users.getPresence``. DND status is fetched with one
+    ``dnd.teamInfo`` call per ``dnd_batch_size`` users, instead of one
+    ``dnd.info`` call per user. A user is polled every ``interval`` seconds
+    after a change. Each unchanged poll doubles that, up to
+    ``max_interval``. Away users wait at least ``away_interval``.
+
+    Changes are reported as events shaped like the Events API ones::
+
+        {'type': 'presence_change', 'user': 'U1', 'presence': 'away',
+         'previous': 'active'}
+        {'type': 'dnd_change', 'user': 'U1', 'dnd_enabled': True,
+         'previous': False}
+
+    :meth:`poll` returns them. :meth:`start` polls from a background thread
+    and passes each event to ``on_change``. The first poll of a user only
+    records its state, see :meth:`state`.
+
+    :param slack: :class:`slacker.Slacker` instance
+    :param users: User IDs to track
+    :type users: list
+    """
+
+    def __init__(self, slack, users, interval=60., max_interval=600.,
+                 away_interval=300., dnd_batch_size=DND_BATCH_SIZE,
+                 max_workers=None, on_change=None):
+        self.slack = slack
+        self.interval = interval
+        self.max_interval = max_interval
+        self.away_interval = away_interval
+        self.dnd_batch_size = dnd_batch_size
+        self.max_workers = max_workers
+        self.on_change = on_change
+        self._states = {}
+        self._intervals = {}
+        self._due = {}
+        self._lock = threading.Lock()
+        self._stop = None
+        self.add(users)
+
+    def add(self, users):
+        with self._lock:
+            for user in users:
+                self._due.setdefault(user, 0)
+
+    def remove(self, users):
+        with self._lock:
+            for user in users:
+                for values in (self._due, self._states, self._intervals):
+                    values.pop(user, None)
+
+    def state(self, user):
+        """
+        :returns: Last known ``presence`` and ``dnd_enabled`` of ``user``
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._states.get(user) or {})
+
+    def _fetch(self, users):
+        presence = {}
+        dnd = {}
+
+        def get_presence(user):
+            presence[user] = \
+                self.slack.users.get_presence(user).body['presence']
+
+        def get_dnd(batch):
+            for user, status in self.slack.dnd.team_info(
+                    list(batch)).body['users'].items():
+                dnd[user] = status.get('dnd_enabled', False)
+
+        errors = self.slack.users._bulk('users.getPresence', get_presence,
+                                        users, self.max_workers)
+        errors.update(self.slack.dnd._bulk(
+            'dnd.teamInfo', get_dnd,
+            [tuple(b) for b in chunks(users, self.dnd_batch_size)],
+            self.max_workers
+        ))
+        for item, error in errors.items():
+            if error is not None:
+                logger.warning('Polling %s failed: %s', item, error)
+        return presence, dnd
+
+    def poll(self, now=None):
+        """
+        Polls the users that are due.
+
+        :returns: List of change events
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            users = sorted(u for u, due in self._due.items() if due <= now)
+        if not users:
+            return []
+        presence, dnd = self._fetch(users)
+
+        events = []
+        with self._lock:
+            for user in users:
+                if user not in self._due:
+                    # removed while polling
+                    continue
+                previous = self._states.get(user)
+                current = dict(previous or {})
+                if user in presence:
+                    current['presence'] = presence[user]
+                if user in dnd:
+                    current['dnd_enabled'] = dnd[user]
+                self._states[user] = current
+
+                changed = False
+                for field, event_type in (('presence', 'presence_change'),
+                                          ('dnd_enabled', 'dnd_change')):
+                    if previous and field in previous and \
+                            field in current and \
+                            previous[field] != current[field]:
+                        changed = True
+                        events.append({'type': event_type, 'user': user,
+                                       field: current[field],
+                                       'previous': previous[field]})
+
+                interval = self.interval if changed or previous is None \
+                    else min(self.max_interval,
+                             self._intervals.get(user, self.interval) * 2)
+                self._intervals[user] = interval
+                if current.get('presence') == 'away':
+                    interval = max(interval, self.away_interval)
+                self._due[user] = now + interval
+        return events
+
+    def next_poll(self):
+        """
+        :returns: Time at which the next user is due, or None
+        """
+        with self._lock:
+            return min(self._due.values()) if self._due else None
+
+    def start(self):
+        self.stop()
+        stop = self._stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                try:
+                    for event in self.poll():
+                        if self.on_change:
+                            self.on_change(event)
+                except Exception as e:
+                    logger.warning('Polling presence failed: %s', e)
+                due = self.next_poll()
+                wait = self.interval if due is None else due - time.time()
+                if stop.wait(max(0, wait)):
+                    return
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
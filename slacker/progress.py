@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressUpdater(object):
+    """
+    Keeps a message up to date with ``chat.update`` without flooding Slack.
+
+    :meth:`update` never blocks: it replaces the pending content and a
+    worker thread sends only the latest one, at most ``rate`` times per
+    second. :meth:`close` waits until the final content has been sent::
+
+        with ProgressUpdater(slack.chat, channel, ts) as progress:
+            for i, item in enumerate(items):
+                process(item)
+                progress.update('{}/{} done'.format(i + 1, len(items)))
+            progress.update('All done')
+
+    Failed updates are logged and the last error is kept in ``error``; the
+    next content is still sent.
+
+    :param chat: :class:`slacker.Chat` instance
+    :param rate: Maximum updates per second
+    :type rate: float
+    """
+
+    def __init__(self, chat, channel, ts, rate=1., **defaults):
+        self.chat = chat
+        self.channel = channel
+        self.ts = ts
+        self.interval = 1. / rate
+        self.defaults = defaults
+        self.sent = 0
+        self.error = None
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._last_sent = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, text=None, **kwargs):
+        """
+        Replaces the pending content. Accepts the arguments of
+        ``Chat.update`` besides ``channel`` and ``ts``.
+        """
+        kwargs['text'] = text
+        with self._cond:
+            if self._closed:
+                raise ValueError('ProgressUpdater is closed')
+            self._pending = kwargs
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Blocks until the pending content has been sent.
+
+        :returns: False if ``timeout`` elapsed first
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending is not None or self._busy:
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Sends the final content, if still pending, and stops the worker.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _take(self):
+        with self._cond:
+            while self._pending is None and not self._closed:
+                self._cond.wait()
+            # wait for the next slot, letting newer content replace this one
+            while self._pending is not None:
+                wait = self._last_sent + self.interval - time.time()
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+            pending, self._pending = self._pending, None
+            self._busy = pending is not None
+            return pending
+
+    def _run(self):
+        while True:
+            pending = self._take()
+            if pending is None:
+                return
+            kwargs = dict(self.defaults, **pending)
+            try:
+                self.chat.update(self.channel, self.ts, **kwargs)
+                self.sent += 1
+            except Exception as e:
+                logger.warning('Updating %s in %s failed: %s', self.ts,
+                               self.channel, e)
+                self.error = e
+            finally:
+                with self._cond:
+                    self._last_sent = time.time()
+                    self._busy = False
+                    self._cond.notify_all()
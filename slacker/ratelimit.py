@@ -0,0 +1,498 @@
+import collections
+import contextlib
+import json
+import os
+import socket
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+
+# requests per minute allowed by each of Slack's rate limit tiers, see
+# https://api.slack.com/docs/rate-limits
+TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# special-tier methods are listed with the tier closest to their limit
+METHOD_TIERS = {
+    'auth.test': 4,
+    'chat.delete': 3,
+    'chat.postEphemeral': 4,
+    'chat.postMessage': 4,
+    'chat.update': 3,
+    'conversations.history': 3,
+    'conversations.info': 3,
+    'conversations.invite': 3,
+    'conversations.kick': 3,
+    'conversations.list': 2,
+    'conversations.members': 4,
+    'conversations.open': 3,
+    'conversations.replies': 3,
+    'dialog.open': 4,
+    'dnd.info': 3,
+    'dnd.teamInfo': 3,
+    'files.delete': 3,
+    'files.list': 3,
+    'groups.invite': 3,
+    'search.messages': 2,
+    'usergroups.list': 2,
+    'usergroups.users.list': 2,
+    'usergroups.users.update': 2,
+    'users.getPresence': 3,
+    'users.info': 4,
+    'users.list': 2,
+}
+
+DEFAULT_TIER = 3
+
+# priority classes of rate limited calls, most urgent first
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+# methods answering users, INTERACTIVE unless a priority is given
+INTERACTIVE_METHODS = frozenset([
+    'chat.postEphemeral',
+    'chat.postMessage',
+    'dialog.open',
+])
+
+# seconds between checks of calls waiting behind more urgent ones
+PRIORITY_POLL = .05
+
+# seconds of latency variation ignored by ConcurrencyLimiter
+LATENCY_JITTER = .01
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled at ``rate`` tokens per second up to ``capacity``.
+    Not thread-safe on its own; :class:`RateLimiter` serializes access.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'paused_until')
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.time() if now is None else now
+        self.paused_until = 0
+
+    def take(self, now, reserve=0.):
+        """
+        Takes one token and returns 0, or returns the number of seconds to
+        wait before a token is available.
+
+        :param reserve: Fraction of the capacity that must be left in the
+            bucket after taking the token, as far as the capacity allows
+        :type reserve: float
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = 1 + min(reserve * self.capacity, self.capacity - 1)
+        if self.tokens >= needed:
+            self.tokens -= 1
+            return 0
+        return (needed - self.tokens) / self.rate
+
+    def pause(self, until):
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 0
+
+
+class RateLimiter(object):
+    """
+    Client-side rate limiter keeping one token bucket per API method, sized
+    from Slack's published tiers.
+
+    Pass it as ``rate_limiter`` to :class:`slacker.Slacker` or any API class
+    and calls block in :meth:`acquire` instead of triggering HTTP 429s. A 429
+    answered with ``Retry-After`` pauses the method for every thread sharing
+    the limiter.
+
+    Calls have a priority: ``INTERACTIVE`` for ``INTERACTIVE_METHODS``,
+    ``NORMAL`` for the others, unless set with ``slacker.call_options``
+    (batch operations run at ``BACKGROUND``). Waiting calls are served most
+    urgent first, and only interactive calls may use the last ``reserve``
+    fraction of a bucket, so that replies to users are not starved by bulk
+    jobs sharing the token.
+
+    :param tiers: Overrides for ``METHOD_TIERS``
+    :type tiers: dict
+    :param burst: Seconds worth of calls that may be made back to back
+    :type burst: float
+    :param reserve: Fraction of every bucket reserved to interactive calls
+    :type reserve: float
+    """
+
+    def __init__(self, tiers=None, default_tier=DEFAULT_TIER, burst=6,
+                 reserve=.2, interactive_methods=INTERACTIVE_METHODS):
+        self.tiers = dict(METHOD_TIERS, **(tiers or {}))
+        self.default_tier = default_tier
+        self.burst = burst
+        self.reserve = reserve
+        self.interactive_methods = interactive_methods
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._waiting = collections.defaultdict(collections.Counter)
+        self._waiting_lock = threading.Lock()
+
+    def _bucket(self, method, now, buckets=None):
+        buckets = self._buckets if buckets is None else buckets
+        bucket = buckets.get(method)
+        if bucket is None:
+            rate = TIER_LIMITS[self.tiers.get(method, self.default_tier)] / 60.
+            bucket = TokenBucket(rate, max(1., rate * self.burst), now)
+            buckets[method] = bucket
+        return bucket
+
+    def _take(self, method, reserve=0.):
+        """
+        Takes a token for ``method`` and returns 0, or returns the number of
+        seconds to wait. Overridden by limiters sharing their buckets.
+        """
+        with self._lock:
+            now = time.time()
+            return self._bucket(method, now).take(now, reserve)
+
+    def _pause(self, method, seconds):
+        with self._lock:
+            now = time.time()
+            self._bucket(method, now).pause(now + seconds)
+
+    def _wait_turn(self, method, priority, delta):
+        with self._waiting_lock:
+            waiting = self._waiting[method]
+            waiting[priority] += delta
+            return any(n for p, n in waiting.items() if p < priority)
+
+    def acquire(self, method, deadline=None, priority=None, cancel=None):
+        """
+        Blocks until a call to ``method`` may be made.
+
+        :param deadline: Time after which to give up waiting
+        :type deadline: float
+        :param priority: ``INTERACTIVE``, ``NORMAL`` or ``BACKGROUND``
+        :type priority: int
+        :param cancel: :class:`slacker.CancelToken` interrupting the wait
+            with :class:`slacker.Cancelled`
+
+        :returns: False if no call could be made before ``deadline``
+        :rtype: bool
+        """
+        if priority is None:
+            priority = INTERACTIVE if method in self.interactive_methods \
+                else NORMAL
+        reserve = 0. if priority == INTERACTIVE else self.reserve
+
+        outranked = self._wait_turn(method, priority, 1)
+        try:
+            while True:
+                if outranked:
+                    wait = PRIORITY_POLL
+                else:
+                    wait = self._take(method, reserve)
+                    if wait <= 0:
+                        return True
+                if deadline is not None and time.time() + wait > deadline:
+                    return False
+                if cancel:
+                    cancel.sleep(wait)
+                else:
+                    time.sleep(wait)
+                outranked = self._wait_turn(method, priority, 0)
+        finally:
+            self._wait_turn(method, priority, -1)
+
+    def pause(self, method, seconds):
+        self._pause(method, seconds)
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Rate limiter whose buckets are stored in a file, so that processes on
+    the same host using the same ``path`` share Slack's limits, as well as
+    the pauses requested by ``Retry-After``. Access is serialized with
+    ``flock``, which is only available on Unix.
+
+    :param path: State file, created if missing
+    :type path: str
+    """
+
+    def __init__(self, path, tiers=None, default_tier=DEFAULT_TIER, burst=6,
+                 reserve=.2, interactive_methods=INTERACTIVE_METHODS):
+        if fcntl is None:
+            raise ImportError('FileRateLimiter requires fcntl')
+        super(FileRateLimiter, self).__init__(tiers, default_tier, burst,
+                                              reserve, interactive_methods)
+        self.path = path
+
+    @contextlib.contextmanager
+    def _shared_buckets(self):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                content = b''
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    content += chunk
+                buckets = {}
+                for method, state in json.loads(
+                        content.decode() or '{}').items():
+                    bucket = TokenBucket(state[0], state[1], state[3])
+                    bucket.tokens, bucket.paused_until = state[2], state[4]
+                    buckets[method] = bucket
+
+                yield buckets
+
+                content = json.dumps(dict(
+                    (method, [b.rate, b.capacity, b.tokens, b.updated,
+                              b.paused_until])
+                    for method, b in buckets.items()
+                )).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, content)
+            finally:
+                os.close(fd)
+
+    def _take(self, method, reserve=0.):
+        with self._shared_buckets() as buckets:
+            now = time.time()
+            return self._bucket(method, now, buckets).take(now, reserve)
+
+    def _pause(self, method, seconds):
+        with self._shared_buckets() as buckets:
+            now = time.time()
+            self._bucket(method, now, buckets).pause(now + seconds)
+
+
+class _CoordinatorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        limiter = self.server.limiter
+        for line in self.rfile:
+            command, method, argument = \
+                (line.decode().split() + [None])[:3]
+            if command == 'take':
+                self.wfile.write('{!r}\n'.format(
+                    limiter._take(method, float(argument or 0))).encode())
+            elif command == 'pause':
+                limiter._pause(method, float(argument))
+                self.wfile.write(b'ok\n')
+            else:
+                return
+
+
+class RateLimitCoordinator(object):
+    """
+    Serves a :class:`RateLimiter` over a Unix socket, for processes using
+    :class:`RemoteRateLimiter` with the same ``path``. Buckets live in the
+    coordinator's memory, which is cheaper than :class:`FileRateLimiter`
+    when calls are frequent.
+
+    :param path: Unix socket path, replaced if it exists
+    :type path: str
+    :param limiter: Limiter to serve, sized from Slack's tiers by default
+    :type limiter: RateLimiter
+    """
+
+    def __init__(self, path, limiter=None):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.path = path
+        self._server = socketserver.ThreadingUnixStreamServer(
+            path, _CoordinatorHandler
+        )
+        self._server.daemon_threads = True
+        self._server.limiter = limiter or RateLimiter()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        os.unlink(self.path)
+
+
+class RemoteRateLimiter(RateLimiter):
+    """
+    Rate limiter delegating to a :class:`RateLimitCoordinator` listening on
+    the Unix socket ``path``.
+    """
+
+    def __init__(self, path, timeout=5., reserve=.2,
+                 interactive_methods=INTERACTIVE_METHODS):
+        super(RemoteRateLimiter, self).__init__(
+            reserve=reserve, interactive_methods=interactive_methods
+        )
+        self.path = path
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+
+    def _call(self, line):
+        with self._lock:
+            # reconnect once if the coordinator was restarted
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._socket = socket.socket(socket.AF_UNIX,
+                                                     socket.SOCK_STREAM)
+                        self._socket.settimeout(self.timeout)
+                        self._socket.connect(self.path)
+                        self._file = self._socket.makefile('rb')
+                    self._socket.sendall(line.encode() + b'\n')
+                    reply = self._file.readline()
+                    if not reply:
+                        raise socket.error('coordinator closed connection')
+                    return reply.decode().strip()
+                except socket.error:
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = self._file = None
+
+    def _take(self, method, reserve=0.):
+        return float(self._call('take {} {!r}'.format(method,
+                                                      float(reserve))))
+
+    def _pause(self, method, seconds):
+        self._call('pause {} {!r}'.format(method, float(seconds)))
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class _MethodConcurrency(object):
+    __slots__ = ('limit', 'in_flight', 'min_latency', 'latency',
+                 'decreased_at')
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.min_latency = None
+        self.latency = None
+        self.decreased_at = 0
+
+
+class ConcurrencyLimiter(object):
+    """
+    Adaptive limit on the number of calls in flight per API method, using
+    additive increase, multiplicative decrease (AIMD).
+
+    Every successful call raises the limit of its method by about one per
+    round trip's worth of calls, until the method's smoothed latency grows
+    beyond ``latency_tolerance`` times the fastest call seen (give or take
+    ``LATENCY_JITTER``). An HTTP 429 multiplies it by ``decrease``, once per
+    burst of throttled calls.
+
+    Pass it as ``concurrency`` to :class:`slacker.Slacker` or any API
+    class; batch operations then size their thread pools to ``maximum`` and
+    let the limiter decide how many calls actually run at once.
+
+    :param initial: Starting limit of every method
+    :type initial: int
+    :param maximum: Highest limit, also the size of batch thread pools
+    :type maximum: int
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, decrease=.5,
+                 latency_tolerance=2.):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._methods = {}
+        self._cond = threading.Condition()
+
+    def _state(self, method):
+        state = self._methods.get(method)
+        if state is None:
+            state = self._methods[method] = _MethodConcurrency(self.initial)
+        return state
+
+    def limit(self, method):
+        with self._cond:
+            return int(self._state(method).limit)
+
+    def acquire(self, method, deadline=None):
+        """
+        Blocks until a call to ``method`` may start.
+
+        :returns: Start time to pass to :meth:`release`, or None if
+            ``deadline`` passed first
+        """
+        with self._cond:
+            state = self._state(method)
+            while state.in_flight >= int(state.limit):
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            state.in_flight += 1
+            return time.time()
+
+    def release(self, method, started, throttled=False, failed=False):
+        """
+        Ends a call started at ``started`` and adapts the limit of
+        ``method`` to its outcome.
+
+        :param throttled: Slack answered with HTTP 429
+        :type throttled: bool
+        :param failed: The call got no answer or an HTTP 5xx, its latency
+            says nothing about load and leaves the limit alone
+        :type failed: bool
+        """
+        now = time.time()
+        latency = now - started
+        with self._cond:
+            state = self._state(method)
+            state.in_flight -= 1
+            if throttled:
+                # calls started before the last decrease were sent at the
+                # old limit and must not cut it again
+                if started >= state.decreased_at:
+                    state.limit = max(self.minimum,
+                                      state.limit * self.decrease)
+                    state.decreased_at = now
+            elif not failed:
+                if state.min_latency is None or latency < state.min_latency:
+                    state.min_latency = latency
+                state.latency = latency if state.latency is None else \
+                    .8 * state.latency + .2 * latency
+                if state.latency <= state.min_latency * \
+                        self.latency_tolerance + LATENCY_JITTER:
+                    state.limit = min(self.maximum,
+                                      state.limit + 1. / int(state.limit))
+            self._cond.notify_all()
@@ -0,0 +1,194 @@
+import json
+import os
+import time
+
+from slacker import Cancelled, CircuitOpen, DeadlineExceeded, Error
+from slacker.utilities import dump_json_atomic, iter_items
+
+
+PAGE_SIZE = 200
+
+
+class RetentionPolicy(object):
+    """
+    Which messages and files a :class:`RetentionEngine` deletes.
+
+    :param max_age: Seconds after which messages and files are deleted
+    :type max_age: float
+    :param channels: Only these channel IDs, every channel by default
+    :type channels: list
+    :param exclude_channels: Channel IDs to leave alone
+    :type exclude_channels: list
+    :param users: Only messages and files of these user IDs
+    :type users: list
+    :param file_types: Only files of these ``filetype`` (``pdf``, ``png``...)
+    :type file_types: list
+    :param messages: Delete messages
+    :type messages: bool
+    :param files: Delete files
+    :type files: bool
+    """
+
+    def __init__(self, max_age, channels=None, exclude_channels=None,
+                 users=None, file_types=None, messages=True, files=True):
+        self.max_age = max_age
+        self.channels = channels and set(channels)
+        self.exclude_channels = set(exclude_channels or ())
+        self.users = users and set(users)
+        self.file_types = file_types and set(file_types)
+        self.messages = messages
+        self.files = files
+
+    def cutoff(self, now=None):
+        return (time.time() if now is None else now) - self.max_age
+
+    def includes_channel(self, channel):
+        return channel not in self.exclude_channels and \
+            (not self.channels or channel in self.channels)
+
+    def matches_message(self, message, cutoff):
+        return float(message['ts']) < cutoff and \
+            (not self.users or message.get('user') in self.users)
+
+    def matches_file(self, file_, cutoff):
+        return file_['created'] < cutoff and \
+            (not self.users or file_.get('user') in self.users) and \
+            (not self.file_types or
+             file_.get('filetype') in self.file_types) and \
+            (not self.channels and not self.exclude_channels or
+             any(self.includes_channel(c)
+                 for c in file_.get('channels') or ()))
+
+
+class RetentionEngine(object):
+    """
+    Deletes the messages and files matching a :class:`RetentionPolicy`.
+
+    Listings are streamed page by page, from the cutoff backwards, and the
+    matches of each page are deleted concurrently through the API's bulk
+    helper, so deletions stay within the rate limits of ``chat.delete`` and
+    ``files.delete``. Progress is saved to ``checkpoint`` after every page;
+    running again with the same file resumes where an interrupted run
+    stopped, and the file is reset once a run completes. With ``dry_run``,
+    matches are counted but nothing is deleted or checkpointed.
+
+    Thread replies are only seen through ``conversations.history`` when
+    they were also sent to the channel.
+
+    :param slack: :class:`slacker.Slacker` instance
+    :param checkpoint: JSON file recording progress
+    :type checkpoint: str
+    """
+
+    def __init__(self, slack, policy, checkpoint=None, dry_run=False,
+                 max_workers=None, page_size=PAGE_SIZE):
+        self.slack = slack
+        self.page_size = page_size
+        self.policy = policy
+        self.checkpoint = checkpoint
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+        self._state = {'channels': {}, 'files': {}}
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                self._state = json.load(f)
+
+    def _save(self):
+        if self.checkpoint and not self.dry_run:
+            dump_json_atomic(self._state, self.checkpoint)
+
+    def _channels(self):
+        if self.policy.channels:
+            return sorted(self.policy.channels - self.policy.exclude_channels)
+        return [c['id'] for c in iter_items(
+            self.slack.conversations.list, 'channels',
+            types='public_channel,private_channel', limit=self.page_size
+        ) if self.policy.includes_channel(c['id'])]
+
+    def _delete(self, api, method, func, items, report, kind):
+        if self.dry_run:
+            report[kind] += len(items)
+            return
+        results = api._bulk(method, func, items, self.max_workers, True)
+        for item, result in results.items():
+            if result is True:
+                report[kind] += 1
+            else:
+                report['errors'][item] = result
+
+    def run(self):
+        """
+        :returns: Dict with the number of ``messages`` and ``files``
+            deleted (matched on a dry run) and the ``errors`` of failed
+            deletions, keyed by ``channel/ts`` or file ID, and of channels
+            whose history could not be read, keyed by channel ID
+        """
+        report = {'messages': 0, 'files': 0, 'errors': {}}
+        cutoff = self.policy.cutoff()
+        if self.policy.messages:
+            for channel in self._channels():
+                try:
+                    self._clean_channel(channel, cutoff, report)
+                except (Cancelled, DeadlineExceeded, CircuitOpen):
+                    raise
+                except Error as e:
+                    # e.g. not_in_channel for channels listed but not joined
+                    report['errors'][channel] = str(e)
+        if self.policy.files:
+            self._clean_files(cutoff, report)
+        self._state = {'channels': {}, 'files': {}}
+        self._save()
+        return report
+
+    def _clean_channel(self, channel, cutoff, report):
+        state = self._state['channels'].setdefault(channel, {})
+        if state.get('done'):
+            return
+        chat = self.slack.chat
+        # page with ``latest`` rather than cursors, which deletions would
+        # invalidate, and which cannot be resumed after a restart
+        latest = state.get('latest') or '{:.6f}'.format(cutoff)
+        while True:
+            body = self.slack.conversations.history(
+                channel, latest=latest, limit=self.page_size
+            ).body
+            messages = body.get('messages') or []
+            matches = ['{}/{}'.format(channel, m['ts']) for m in messages
+                       if self.policy.matches_message(m, cutoff)]
+            self._delete(chat, 'chat.delete',
+                         lambda key: chat.delete(*key.split('/')),
+                         matches, report, 'messages')
+            if not messages or not body.get('has_more', True):
+                break
+            latest = state['latest'] = min((m['ts'] for m in messages),
+                                           key=float)
+            self._save()
+        state['done'] = True
+        self._save()
+
+    def _clean_files(self, cutoff, report):
+        state = self._state['files']
+        if state.get('done'):
+            return
+        files = self.slack.files
+        # ts_to is inclusive: files sharing the oldest timestamp of a page
+        # come again on the next one
+        ts_to = state.get('ts_to') or int(cutoff)
+        users = self.policy.users
+        user = next(iter(users)) if users and len(users) == 1 else None
+        seen = set()
+        while True:
+            page = files.list(ts_to=ts_to, count=self.page_size, user=user)
+            new = [f for f in page.body.get('files') or ()
+                   if f['id'] not in seen]
+            if not new:
+                break
+            seen.update(f['id'] for f in new)
+            self._delete(files, 'files.delete', files.delete,
+                         [f['id'] for f in new
+                          if self.policy.matches_file(f, cutoff)],
+                         report, 'files')
+            ts_to = state['ts_to'] = min(int(f['created']) for f in new)
+            self._save()
+        state['done'] = True
+        self._save()
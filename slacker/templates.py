@@ -0,0 +1,131 @@
+import json
+import re
+
+from slacker.utilities import JSONString, string_types
+
+
+_PLACEHOLDER = re.compile(r'\{\{|\}\}|\{(\w+)\}')
+
+
+def _compile(source):
+    """
+    Splits ``source`` into a list alternating literal text and placeholder
+    names, starting and ending with literal text.
+    """
+    parts = []
+    literal = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(source):
+        literal.append(source[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            # escaped brace
+            literal.append(match.group(0)[0])
+        else:
+            parts.append(''.join(literal))
+            parts.append(match.group(1))
+            literal = []
+    literal.append(source[position:])
+    parts.append(''.join(literal))
+    return parts
+
+
+def _escape_json(value):
+    return json.dumps(u'{}'.format(value))[1:-1]
+
+
+# JSON encoding of the marker standing in for templated strings
+_MARKER = re.compile(r'\\u0000(\d+)\\u0000')
+
+
+def _compile_document(document):
+    """
+    Serializes ``document`` and compiles it into the same alternating list
+    as :func:`_compile`, with placeholders only recognized inside strings.
+    """
+    strings = []
+
+    def mark(node):
+        if isinstance(node, dict):
+            return dict((k, mark(v)) for k, v in node.items())
+        if isinstance(node, (list, tuple)):
+            return [mark(v) for v in node]
+        if isinstance(node, string_types) and ('{' in node or '}' in node):
+            strings.append(_compile(node))
+            return '\x00{}\x00'.format(len(strings) - 1)
+        return node
+
+    serialized = json.dumps(mark(document), separators=(',', ':'))
+    parts = ['']
+    position = 0
+    for match in _MARKER.finditer(serialized):
+        parts[-1] += serialized[position:match.start()]
+        position = match.end()
+        for i, part in enumerate(strings[int(match.group(1))]):
+            if i % 2:
+                parts.extend([part, ''])
+            else:
+                parts[-1] += _escape_json(part)
+    parts[-1] += serialized[position:]
+    return parts
+
+
+def _render(parts, values, escape=None):
+    chunks = list(parts)
+    for i in range(1, len(chunks), 2):
+        value = values[chunks[i]]
+        chunks[i] = escape(value) if escape else u'{}'.format(value)
+    return ''.join(chunks)
+
+
+class MessageTemplate(object):
+    """
+    Message whose ``text``, ``blocks`` and ``attachments`` are serialized
+    once; rendering only splices values into the precomputed JSON.
+
+    String values may contain ``{name}`` placeholders, ``{{`` and ``}}``
+    stand for literal braces. In ``blocks`` and ``attachments`` placeholders
+    are only recognized inside strings, and inserted values are JSON
+    escaped::
+
+        alert = MessageTemplate(
+            text='{host} is down',
+            blocks=[{'type': 'section',
+                     'text': {'type': 'mrkdwn', 'text': '*{host}*: {error}'}}]
+        )
+        slack.chat.post_message('#ops', template=alert.render(
+            host='db1', error='connection refused'
+        ))
+
+    :meth:`render` returns a dict of ``text``, ``blocks`` and
+    ``attachments`` which can be passed as ``template`` to
+    ``Chat.post_message``, ``Chat.update`` and ``Chat.post_ephemeral``, or
+    unpacked as keyword arguments.
+    """
+
+    def __init__(self, text=None, blocks=None, attachments=None):
+        self._text = None if text is None else _compile(text)
+        self._documents = {}
+        for field, value in (('blocks', blocks),
+                             ('attachments', attachments)):
+            if value is not None:
+                self._documents[field] = _compile_document(value)
+
+        names = set()
+        for parts in [self._text or []] + list(self._documents.values()):
+            names.update(parts[1::2])
+        self.fields = frozenset(names)
+
+    def render(self, **values):
+        missing = self.fields.difference(values)
+        if missing:
+            raise KeyError('Missing template values: {}'.format(
+                ', '.join(sorted(missing))
+            ))
+
+        rendered = {}
+        if self._text is not None:
+            rendered['text'] = _render(self._text, values)
+        for field, parts in self._documents.items():
+            rendered[field] = JSONString(_render(parts, values, _escape_json))
+        return rendered
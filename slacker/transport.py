@@ -0,0 +1,292 @@
+import json
+import threading
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from slacker.utilities import string_types
+
+
+class TransportResponse(object):
+    """
+    Minimal HTTP response returned by transports that are not backed by
+    ``requests``.
+    """
+
+    __slots__ = ('status_code', 'headers', 'text', 'url')
+
+    def __init__(self, status_code, headers, text, url=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.url = url
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                '{} Error for url: {}'.format(self.status_code, self.url),
+                response=self
+            )
+
+
+class Transport(object):
+    """
+    Sends HTTP requests on behalf of :class:`slacker.BaseAPI`.
+
+    ``send`` returns an object with ``status_code``, ``headers`` (a case
+    insensitive mapping), ``text`` and ``raise_for_status()``. Network
+    failures are raised as ``requests.ConnectionError`` and timeouts as
+    ``requests.Timeout``, whatever the HTTP library, so that retries,
+    deadlines and circuit breakers see them the same way.
+    """
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        raise NotImplementedError
+
+    def warmup(self, url, connections=1, timeout=None, proxies=None):
+        """
+        Opens up to ``connections`` pooled connections by sending that many
+        concurrent ``GET`` requests to ``url``, so that later calls skip DNS
+        resolution and the TCP and TLS handshakes.
+        """
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            for response in executor.map(
+                    lambda _: self.send('GET', url, timeout=timeout,
+                                        proxies=proxies),
+                    range(connections)):
+                response.raise_for_status()
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Default transport using ``requests``, optionally through a
+    ``requests.Session`` for connection pooling.
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        kwargs = {'timeout': timeout, 'proxies': proxies}
+        if params is not None:
+            kwargs['params'] = params
+        if data is not None:
+            kwargs['data'] = data
+        if files is not None:
+            kwargs['files'] = files
+
+        if self.session is not None:
+            return self.session.request(method=method.lower(), url=url,
+                                        **kwargs)
+        if method == 'GET':
+            return requests.get(url, **kwargs)
+        return requests.post(url, **kwargs)
+
+    def warmup(self, url, connections=1, timeout=None, proxies=None):
+        # without a session connections are not reused
+        if self.session is not None:
+            super(RequestsTransport, self).warmup(url, connections, timeout,
+                                                  proxies)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+def _drop_none(values):
+    if isinstance(values, dict):
+        return dict((k, v) for k, v in values.items() if v is not None)
+    return values
+
+
+class HTTP2Transport(Transport):
+    """
+    Transport multiplexing concurrent calls over a small number of HTTP/2
+    connections, backed by ``httpx`` (install ``httpx[http2]``).
+
+    Requests are driven by an ``httpx.AsyncClient`` on an event loop running
+    in a background thread, so any number of threads can share the
+    transport while their calls are interleaved as HTTP/2 streams. Proxies
+    are configured once on the client; per-call ``proxies`` are ignored.
+    """
+
+    def __init__(self, client=None, max_connections=4, http1=True,
+                 proxy=None, verify=True):
+        if client is None:
+            if httpx is None:
+                raise ImportError('httpx is required for HTTP2Transport')
+            client = httpx.AsyncClient(
+                http1=http1, http2=True, proxy=proxy, verify=verify,
+                limits=httpx.Limits(max_connections=max_connections)
+            )
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        future = asyncio.run_coroutine_threadsafe(self.client.request(
+            method, url, params=_drop_none(params), data=_drop_none(data),
+            files=files, timeout=timeout
+        ), self._loop)
+        try:
+            response = future.result()
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e)
+        return TransportResponse(response.status_code, response.headers,
+                                 response.text, url=url)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.aclose(),
+                                         self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+# request arguments and response fields holding credentials, never recorded
+SECRET_FIELDS = frozenset([
+    'token', 'client_secret', 'code', 'access_token', 'refresh_token',
+    'bot_access_token',
+])
+REDACTED = '[redacted]'
+
+
+def _normalize(values):
+    """
+    Returns request parameters in a form suitable for matching recorded
+    interactions: no secrets, no None values, every value as text.
+    """
+    return dict(
+        (k, v if isinstance(v, string_types) else json.dumps(v))
+        for k, v in (values or {}).items()
+        if v is not None and k not in SECRET_FIELDS
+    )
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return dict((k, REDACTED if k in SECRET_FIELDS and v else _redact(v))
+                    for k, v in value.items())
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def _redact_body(text):
+    """
+    Replaces the credentials of a JSON response body, such as the tokens
+    returned by ``oauth.v2.access``.
+    """
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return text
+    redacted = _redact(body)
+    return text if redacted == body else json.dumps(redacted)
+
+
+def _api_method(url):
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+class RecordingTransport(Transport):
+    """
+    Wraps another transport and records every interaction so it can be
+    saved and later served by :class:`ReplayTransport`. Tokens, client
+    secrets and OAuth codes are left out of recorded requests, and replaced
+    with ``[redacted]`` in recorded responses (see ``SECRET_FIELDS``).
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport or RequestsTransport()
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        response = self.transport.send(method, url, params=params, data=data,
+                                       files=files, timeout=timeout,
+                                       proxies=proxies)
+        with self._lock:
+            self.interactions.append({
+                'method': method,
+                'api': _api_method(url),
+                'params': _normalize(params),
+                'data': _normalize(data),
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'body': _redact_body(response.text),
+            })
+        return response
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.interactions, f, indent=1, sort_keys=True)
+
+
+class ReplayTransport(Transport):
+    """
+    Serves responses previously captured by :class:`RecordingTransport`
+    without touching the network.
+
+    Interactions are matched on HTTP method, API method and parameters;
+    identical requests are answered in the order they were recorded.
+    """
+
+    def __init__(self, interactions):
+        if isinstance(interactions, string_types):
+            with open(interactions) as f:
+                interactions = json.load(f)
+
+        self._queues = {}
+        self._lock = threading.Lock()
+        for interaction in interactions:
+            self._queues.setdefault(
+                self._key(interaction['method'], interaction['api'],
+                          interaction['params'], interaction['data']), []
+            ).append(interaction)
+
+    @staticmethod
+    def _key(method, api, params, data):
+        return (method, api, json.dumps(params, sort_keys=True),
+                json.dumps(data, sort_keys=True))
+
+    def send(self, method, url, params=None, data=None, files=None,
+             timeout=None, proxies=None):
+        key = self._key(method, _api_method(url), _normalize(params),
+                        _normalize(data))
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise LookupError('No recorded response for {} {}'.format(
+                    method, key[1]
+                ))
+            interaction = queue.pop(0)
+        return TransportResponse(
+            interaction['status'],
+            requests.structures.CaseInsensitiveDict(interaction['headers']),
+            interaction['body'], url=url
+        )
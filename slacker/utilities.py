@@ -1,3 +1,23 @@
+import json
+import os
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    string_types = basestring  # noqa: F821
+except NameError:  # Python 3
+    string_types = str
+
+
+DEFAULT_WORKERS = 8
+
+# arguments Slack expects as JSON documents rather than comma separated lists
+JSON_FIELDS = frozenset([
+    'attachments', 'blocks', 'dialog', 'profile', 'unfurls', 'view',
+])
+
+
 def get_api_url(method):
     """
     Returns API URL for the given method.
@@ -11,7 +31,150 @@ def get_api_url(method):
     return 'https://slack.com/api/{}'.format(method)
 
 
+class JSONString(str):
+    """
+    Already serialized JSON document, sent as is by :func:`encode_payload`.
+    """
+
+
+def freeze_json(value):
+    """
+    Serializes ``value`` once so that it can be reused across many calls,
+    e.g. the same attachments posted to hundreds of channels.
+
+    :param value: JSON serializable object
+    :returns: Serialized document
+    :rtype: JSONString
+    """
+    return JSONString(json.dumps(value, separators=(',', ':')))
+
+
+def encode_payload(values):
+    """
+    Prepares API arguments for sending: drops None values, turns booleans
+    into 1/0, serializes JSON arguments (see ``JSON_FIELDS``) and dicts, and
+    joins other lists and tuples with commas.
+
+    :param values: API arguments
+    :type values: dict
+
+    :returns: Encoded arguments
+    :rtype: dict
+    """
+    encoded = {}
+    for key, value in values.items():
+        if value is None or isinstance(value, string_types):
+            if value is not None:
+                encoded[key] = value
+        elif isinstance(value, bool):
+            encoded[key] = int(value)
+        elif isinstance(value, (list, tuple)):
+            if key in JSON_FIELDS:
+                encoded[key] = json.dumps(value, separators=(',', ':'))
+            else:
+                encoded[key] = ','.join(value)
+        elif isinstance(value, dict):
+            encoded[key] = json.dumps(value, separators=(',', ':'))
+        else:
+            encoded[key] = value
+    return encoded
+
+
 def get_item_id_by_name(list_dict, key_name):
     for d in list_dict:
         if d['name'] == key_name:
             return d['id']
+
+
+def get_next_cursor(body):
+    """
+    Returns the cursor for the next page of a cursor-paginated response, or
+    None when there are no more pages.
+
+    :param body: Response body
+    :type body: dict
+    """
+    return (body.get('response_metadata') or {}).get('next_cursor') or None
+
+
+def iter_pages(method, *args, **kwargs):
+    """
+    Calls a cursor-paginated API method repeatedly, yielding one response per
+    page until Slack stops returning a ``next_cursor``.
+
+    :param method: Bound API method accepting a ``cursor`` argument, e.g.
+        ``slack.conversations.history``
+    :type method: callable
+    :param cancel: Token stopping the iteration before the next page once
+        cancelled
+    :type cancel: slacker.CancelToken
+
+    :returns: Response generator
+    """
+    cursor = kwargs.pop('cursor', None)
+    cancel = kwargs.pop('cancel', None)
+    while True:
+        if cancel:
+            cancel.check()
+        response = method(*args, cursor=cursor, **kwargs)
+        yield response
+        cursor = get_next_cursor(response.body)
+        if not cursor:
+            break
+
+
+def iter_items(method, key, *args, **kwargs):
+    """
+    Like :func:`iter_pages`, but yields the items stored under ``key`` in
+    each page instead of the responses.
+    """
+    for response in iter_pages(method, *args, **kwargs):
+        for item in response.body.get(key) or ():
+            yield item
+
+
+def chunks(items, size):
+    """
+    Splits a sequence into lists of at most ``size`` items.
+    """
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_concurrently(func, items, max_workers=DEFAULT_WORKERS, cancel=None):
+    """
+    Calls ``func`` for every item from a pool of threads and yields
+    ``(item, result, error)`` tuples in input order. Exceptions raised by
+    ``func`` are returned as ``error`` instead of being raised.
+
+    :param func: Callable taking a single item
+    :type func: callable
+    :param max_workers: Number of threads
+    :type max_workers: int
+    :param cancel: Token skipping the remaining items once cancelled, their
+        error is then ``slacker.Cancelled``
+    :type cancel: slacker.CancelToken
+    """
+    def call(item):
+        try:
+            if cancel:
+                cancel.check()
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for outcome in executor.map(call, items):
+            yield outcome
+
+
+def dump_json_atomic(value, path):
+    """
+    Writes ``value`` as JSON to ``path`` through a temporary file, so that
+    readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(value, f)
+    os.rename(temp, path)
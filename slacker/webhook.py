@@ -0,0 +1,196 @@
+import collections
+import logging
+import threading
+import time
+
+import requests
+
+from slacker import DEFAULT_TIMEOUT, IncomingWebhook
+
+
+logger = logging.getLogger(__name__)
+
+# limits of a single message, see https://api.slack.com/reference/messaging
+MAX_TEXT_LENGTH = 40000
+MAX_ATTACHMENTS = 100
+MAX_BLOCKS = 50
+
+_CONTENT_KEYS = ('text', 'attachments', 'blocks')
+
+
+def _routing_key(message):
+    """
+    Messages may only be merged when everything except their content
+    (username, icon, channel override...) is identical.
+    """
+    return (
+        'blocks' in message,
+        tuple(sorted((k, repr(v)) for k, v in message.items()
+                     if k not in _CONTENT_KEYS))
+    )
+
+
+def merge_messages(messages):
+    """
+    Merges consecutive webhook payloads into as few payloads as Slack's
+    message limits allow. Texts are joined with newlines, attachments and
+    blocks are concatenated.
+
+    :param messages: Webhook payloads
+    :type messages: list
+
+    :returns: Merged payloads
+    :rtype: list
+    """
+    merged = []
+    current = None
+    current_key = None
+    for message in messages:
+        key = _routing_key(message)
+        text = message.get('text') or ''
+        attachments = message.get('attachments') or []
+        blocks = message.get('blocks') or []
+
+        if current is not None and key == current_key and \
+                len(current.get('text', '')) + len(text) + 1 <= \
+                MAX_TEXT_LENGTH and \
+                len(current.get('attachments', ())) + len(attachments) <= \
+                MAX_ATTACHMENTS and \
+                len(current.get('blocks', ())) + len(blocks) <= MAX_BLOCKS:
+            if text:
+                current['text'] = '\n'.join(
+                    t for t in (current.get('text'), text) if t
+                )
+            if attachments:
+                current.setdefault('attachments', []).extend(attachments)
+            if blocks:
+                current.setdefault('blocks', []).extend(blocks)
+            continue
+
+        current = dict(message)
+        for k in ('attachments', 'blocks'):
+            if k in current:
+                current[k] = list(current[k])
+        current_key = key
+        merged.append(current)
+    return merged
+
+
+class BufferedIncomingWebhook(IncomingWebhook):
+    """
+    Incoming webhook which queues messages and posts them from a background
+    thread, merging bursts into fewer requests.
+
+    The queue is flushed once ``max_batch`` messages are waiting or
+    ``flush_interval`` seconds after the first queued message, whichever
+    comes first. Requests go through a keep-alive session and back off on
+    HTTP 429 as indicated by ``Retry-After``. When more than ``max_queue``
+    messages are waiting the oldest ones are dropped.
+
+    Call :meth:`close` (or use the object as a context manager) to flush
+    pending messages before exiting.
+    """
+
+    def __init__(self, url=None, timeout=DEFAULT_TIMEOUT, proxies=None,
+                 session=None, rate_limit_retries=3, max_batch=20,
+                 flush_interval=1., max_queue=10000):
+        super(BufferedIncomingWebhook, self).__init__(
+            url=url, timeout=timeout, proxies=proxies,
+            session=session or requests.Session(),
+            rate_limit_retries=rate_limit_retries
+        )
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = collections.deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._flushing = 0
+        self._closed = False
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def post(self, data):
+        """
+        Queues a message for delivery and returns immediately.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('webhook is closed')
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+                self._pending -= 1
+            self._queue.append(data)
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued message has been sent.
+
+        :returns: False if ``timeout`` elapsed first
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending:
+                    remaining = None if deadline is None else \
+                        deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            deadline = time.time() + self.flush_interval
+            while len(self._queue) < self.max_batch and not self._closed \
+                    and not self._flushing:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = list(self._queue)
+            self._queue.clear()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            for payload in merge_messages(batch):
+                try:
+                    response = super(BufferedIncomingWebhook, self).post(
+                        payload
+                    )
+                    response.raise_for_status()
+                except Exception:
+                    logger.exception('Failed to post to incoming webhook')
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
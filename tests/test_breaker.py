@@ -0,0 +1,74 @@
+import time
+import unittest
+
+import requests
+
+from slacker import CircuitOpen, Slacker
+from slacker.breaker import CLOSED, OPEN, CircuitBreaker
+from slacker.fake import FakeSlack
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=.1)
+        self.slack = Slacker('xoxb-fake', transport=self.fake,
+                             circuit_breaker=self.breaker)
+        self.user = self.fake.add_user('a')
+
+    def break_users_info(self):
+        self.fake.inject('users.info', status=503, times=3)
+        for _ in range(3):
+            self.assertRaises(requests.HTTPError, self.slack.users.info,
+                              self.user)
+
+    def calls(self, api):
+        return len([c for c in self.fake.calls if c[0] == api])
+
+    def test_open_circuit_fails_fast(self):
+        self.break_users_info()
+
+        self.assertRaises(CircuitOpen, self.slack.users.info, self.user)
+        self.assertEqual(self.calls('users.info'), 3)
+        self.assertTrue(self.slack.auth.test().successful)
+
+        status = self.breaker.status()
+        self.assertEqual(status['users.info']['state'], OPEN)
+        self.assertEqual(status['users.info']['rejected'], 1)
+        self.assertEqual(status['auth.test']['state'], CLOSED)
+
+    def test_successful_probe_closes_circuit(self):
+        self.break_users_info()
+        time.sleep(.1)
+
+        self.assertTrue(self.slack.users.info(self.user).successful)
+        self.assertEqual(self.breaker.status()['users.info']['state'],
+                         CLOSED)
+
+    def test_failed_probe_reopens_circuit(self):
+        self.break_users_info()
+        time.sleep(.1)
+        self.fake.inject('users.info', status=500)
+
+        self.assertRaises(requests.HTTPError, self.slack.users.info,
+                          self.user)
+        self.assertRaises(CircuitOpen, self.slack.users.info, self.user)
+
+    def test_rate_limiting_is_not_a_failure(self):
+        self.fake.inject('users.info', status=429, times=5)
+        for _ in range(5):
+            self.assertRaises(requests.HTTPError, self.slack.users.info,
+                              self.user)
+        self.assertTrue(self.slack.users.info(self.user).successful)
+
+    def test_half_open_admits_limited_probes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.failure('files.upload')
+        self.assertTrue(breaker.allow('files.upload'))
+        self.assertFalse(breaker.allow('files.upload'))
+        breaker.release('files.upload')
+        self.assertTrue(breaker.allow('files.upload'))
+
+
+if __name__ == '__main__':
+    unittest.main()
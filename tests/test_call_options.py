@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from slacker import (
+    CancelToken, Cancelled, DeadlineExceeded, Slacker, call_options
+)
+from slacker.fake import FakeSlack
+from slacker.ratelimit import RateLimiter
+from slacker.utilities import iter_pages
+
+
+class TestCallOptions(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.slack = Slacker('xoxb-fake', transport=self.fake,
+                             rate_limit_retries=3)
+
+    def test_deadline_stops_429_retries(self):
+        self.fake.inject('auth.test', headers={'Retry-After': '30'})
+
+        started = time.time()
+        with call_options(deadline=1):
+            self.assertRaises(DeadlineExceeded, self.slack.auth.test)
+        self.assertLess(time.time() - started, 1)
+
+    def test_deadline_with_rate_limiter(self):
+        slack = Slacker('xoxb-fake', transport=self.fake,
+                        rate_limiter=RateLimiter(tiers={'auth.test': 1},
+                                                 burst=0))
+        slack.auth.test()
+
+        with call_options(deadline=.5):
+            self.assertRaises(DeadlineExceeded, slack.auth.test)
+        self.assertEqual(len(self.fake.calls), 1)
+
+    def test_timeout_is_capped_by_deadline(self):
+        timeouts = []
+        send = self.fake.send
+
+        def record(*args, **kwargs):
+            timeouts.append(kwargs['timeout'])
+            return send(*args, **kwargs)
+
+        self.fake.send = record
+        with call_options(timeout=60):
+            with call_options(deadline=5):
+                self.slack.auth.test()
+        self.slack.auth.test()
+
+        self.assertLessEqual(timeouts[0], 5)
+        self.assertEqual(timeouts[1], self.slack.auth.timeout)
+
+    def test_cancel_interrupts_backoff(self):
+        self.fake.inject('auth.test', headers={'Retry-After': '30'})
+        cancel = CancelToken()
+        threading.Timer(.1, cancel.cancel).start()
+
+        started = time.time()
+        with call_options(cancel=cancel):
+            self.assertRaises(Cancelled, self.slack.auth.test)
+        self.assertLess(time.time() - started, 5)
+
+    def test_cancel_interrupts_rate_limiter_pause(self):
+        slack = Slacker('xoxb-fake', transport=self.fake,
+                        rate_limit_retries=3, rate_limiter=RateLimiter())
+        self.fake.inject('auth.test', headers={'Retry-After': '30'})
+        cancel = CancelToken()
+        threading.Timer(.1, cancel.cancel).start()
+
+        started = time.time()
+        with call_options(cancel=cancel):
+            self.assertRaises(Cancelled, slack.auth.test)
+        self.assertLess(time.time() - started, 5)
+
+    def test_cancel_stops_pagination(self):
+        self.fake.page_size = 1
+        for name in 'abc':
+            self.fake.add_user(name)
+        cancel = CancelToken()
+
+        iterator = iter_pages(self.slack.users.list, cancel=cancel)
+        next(iterator)
+        cancel.cancel()
+        self.assertRaises(Cancelled, next, iterator)
+
+    def test_cancel_applies_to_batch_workers(self):
+        channel = self.fake.add_conversation('general')
+        users = [self.fake.add_user(name) for name in 'abc']
+        cancel = CancelToken()
+        cancel.cancel()
+
+        results = self.slack.conversations.kick_many(channel, users,
+                                                     cancel=cancel)
+
+        self.assertEqual(set(results.values()), {'cancelled'})
+        self.assertNotIn('conversations.kick',
+                         [api for api, _ in self.fake.calls])
+
+
+if __name__ == '__main__':
+    unittest.main()
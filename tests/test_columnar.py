@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+
+from slacker import Conversations
+from slacker.columnar import (
+    HistoryCollector, numpy, pyarrow, pyarrow_ipc, pyarrow_parquet
+)
+from slacker.utilities import get_api_url
+
+
+class TestHistoryCollector(unittest.TestCase):
+    def setUp(self):
+        url = get_api_url('conversations.history')
+        responses.add(responses.GET, url, status=200, json={
+            'ok': True,
+            'messages': [
+                {'ts': '2.0', 'user': 'U1', 'text': 'b',
+                 'reactions': [{'name': 'x', 'count': 2},
+                               {'name': 'y', 'count': 1}]},
+            ],
+            'response_metadata': {'next_cursor': 'abc'},
+        })
+        responses.add(responses.GET, url, status=200, json={
+            'ok': True,
+            'messages': [{'ts': '1.0', 'user': 'U2', 'text': 'a',
+                          'thread_ts': '1.0', 'reply_count': 3}],
+            'response_metadata': {'next_cursor': ''},
+        })
+
+    @responses.activate
+    def test_collect_follows_cursor(self):
+        collector = HistoryCollector().collect(
+            Conversations(token='aaa').history, 'C1'
+        )
+        columns = collector.to_columns()
+        self.assertEqual(len(collector), 2)
+        self.assertEqual(columns['ts'], ['2.0', '1.0'])
+        self.assertEqual(columns['reaction_count'], [3, 0])
+        self.assertEqual(columns['reply_count'], [None, 3])
+        self.assertIn('cursor=abc', responses.calls[1].request.url)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    @responses.activate
+    def test_to_numpy(self):
+        collector = HistoryCollector().collect(
+            Conversations(token='aaa').history, 'C1'
+        )
+        array = collector.to_numpy()
+        self.assertEqual(list(array.reply_count), [0, 3])
+        self.assertEqual(list(array.user), ['U1', 'U2'])
+
+    def collect(self):
+        return HistoryCollector().collect(
+            Conversations(token='aaa').history, 'C1'
+        )
+
+    def tempfile(self, name):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return os.path.join(directory, name)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    @responses.activate
+    def test_to_arrow(self):
+        table = self.collect().to_arrow()
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(str(table.schema.field('reply_count').type),
+                         'int64')
+        self.assertEqual(table.column('reply_count').to_pylist(), [None, 3])
+
+    @unittest.skipIf(pyarrow_parquet is None, 'pyarrow.parquet is missing')
+    @responses.activate
+    def test_write_parquet_round_trip(self):
+        collector = self.collect()
+        path = self.tempfile('history.parquet')
+        collector.write_parquet(path)
+        table = pyarrow_parquet.read_table(path)
+        self.assertEqual(table.to_pydict(), collector.to_columns())
+
+    @unittest.skipIf(pyarrow_ipc is None, 'pyarrow is not installed')
+    @responses.activate
+    def test_write_ipc_round_trip(self):
+        collector = self.collect()
+        path = self.tempfile('history.arrow')
+        collector.write_ipc(path)
+        with pyarrow.memory_map(path) as source:
+            table = pyarrow_ipc.open_file(source).read_all()
+        self.assertEqual(table.to_pydict(), collector.to_columns())
+
+    @responses.activate
+    def test_missing_pyarrow_raises_import_error(self):
+        collector = self.collect()
+        path = self.tempfile('history')
+        with mock.patch('slacker.columnar.pyarrow', None), \
+                mock.patch('slacker.columnar.pyarrow_ipc', None), \
+                mock.patch('slacker.columnar.pyarrow_parquet', None):
+            self.assertRaises(ImportError, collector.to_arrow)
+            self.assertRaises(ImportError, collector.write_parquet, path)
+            self.assertRaises(ImportError, collector.write_ipc, path)
@@ -0,0 +1,99 @@
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+
+
+class TestSyncMembers(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack(page_size=2)
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.users = [self.fake.add_user(name) for name in 'abcde']
+
+    def test_only_differences_are_applied(self):
+        a, b, c, d, e = self.users
+        channel = self.fake.add_conversation('general', members=[a, b, c])
+
+        results = self.slack.conversations.sync_members(
+            channel, [b, c, d, e], batch_size=1
+        )
+
+        self.assertEqual(results, {b: 'unchanged', c: 'unchanged',
+                                   d: 'invited', e: 'invited',
+                                   a: 'kicked'})
+        self.assertEqual(sorted(self.fake.conversations[channel]['members']),
+                         sorted([b, c, d, e]))
+        apis = [api for api, _ in self.fake.calls]
+        self.assertEqual(apis.count('conversations.invite'), 2)
+
+    def test_rejected_batch_reports_per_user_errors(self):
+        channel = self.fake.add_conversation('general')
+
+        results = self.slack.conversations.invite_many(
+            channel, [self.users[0], 'U404']
+        )
+
+        self.assertEqual(results, {self.users[0]: 'invited',
+                                   'U404': 'user_not_found'})
+
+    def test_usergroup_sync(self):
+        a, b, c = self.users[:3]
+        self.fake.usergroups['S1'] = [a, b]
+
+        results = self.slack.usergroups.users.sync('S1', [b, c])
+
+        self.assertEqual(results, {a: 'removed', b: 'unchanged', c: 'added'})
+        self.assertEqual(sorted(self.fake.usergroups['S1']), [b, c])
+
+    def test_usergroup_sync_rejects_no_users(self):
+        self.fake.usergroups['S1'] = [self.users[0]]
+        self.assertRaises(ValueError, self.slack.usergroups.users.sync,
+                          'S1', [])
+        self.assertEqual(self.fake.usergroups['S1'], [self.users[0]])
+        self.assertEqual([c for c in self.fake.calls
+                          if c[0].startswith('usergroups')], [])
+
+
+class TestHistoryWithReplies(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack(page_size=2)
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.channel = self.fake.add_conversation('general')
+        self.first = self.fake.add_message(self.channel, 'first')
+        for i in range(3):
+            self.fake.add_message(self.channel, 'reply {}'.format(i),
+                                  thread_ts=self.first)
+        self.fake.add_message(self.channel, 'second')
+        self.third = self.fake.add_message(self.channel, 'third')
+        self.fake.add_message(self.channel, 'reply', thread_ts=self.third)
+
+    def history(self, **kwargs):
+        return list(self.slack.conversations.history_with_replies(
+            self.channel, max_workers=2, **kwargs
+        ))
+
+    def test_replies_are_attached_in_order(self):
+        messages = self.history()
+        self.assertEqual([m['text'] for m in messages],
+                         ['third', 'second', 'first'])
+        self.assertEqual([r['text'] for r in messages[2]['replies']],
+                         ['reply 0', 'reply 1', 'reply 2'])
+        self.assertEqual(len(messages[0]['replies']), 1)
+        self.assertNotIn('replies', messages[1])
+
+    def test_unchanged_threads_are_skipped(self):
+        known_threads = {}
+        self.history(known_threads=known_threads)
+        self.assertEqual(sorted(known_threads), [self.first, self.third])
+
+        self.fake.add_message(self.channel, 'late reply',
+                              thread_ts=self.first)
+        self.fake.calls = []
+        messages = self.history(known_threads=known_threads)
+
+        self.assertNotIn('replies', messages[0])
+        self.assertEqual(messages[2]['replies'][-1]['text'], 'late reply')
+        self.assertEqual(
+            [args['ts'] for api, args in self.fake.calls
+             if api == 'conversations.replies'], [self.first]
+        )
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from slacker import Slacker
+from slacker.directory import DirectorySnapshot
+from slacker.fake import FakeSlack
+
+
+class TestDirectorySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack(page_size=2)
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'directory.db')
+        self.snapshot = DirectorySnapshot(self.path)
+        self.addCleanup(self.snapshot.close)
+
+        self.alice = self.fake.add_user('alice')
+        self.bob = self.fake.add_user('bob')
+        self.general = self.fake.add_conversation('general')
+        self.fake.usergroups['S0000001'] = [self.alice]
+
+    def test_snapshot_survives_restarts(self):
+        changes = self.snapshot.refresh(self.slack)
+        self.assertEqual(changes, {'users': 3, 'channels': 1,
+                                   'usergroups': 1})
+
+        snapshot = DirectorySnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        self.assertEqual(snapshot.user_by_name('bob')['id'], self.bob)
+        self.assertEqual(snapshot.channel_by_name('#general')['id'],
+                         self.general)
+        self.assertEqual(snapshot.usergroup('S0000001')['users'],
+                         [self.alice])
+        self.assertEqual(len(snapshot.users()), 3)
+        self.assertIsNotNone(snapshot.refreshed('users'))
+
+    def test_refresh_only_writes_changes(self):
+        self.snapshot.refresh(self.slack)
+        self.fake.users[self.bob].update(real_name='Bob', updated=1600000000)
+        self.fake.users[self.alice]['real_name'] = 'stale'
+        del self.fake.conversations[self.general]
+        self.fake.usergroups['S0000001'].append(self.bob)
+
+        changes = self.snapshot.refresh(self.slack)
+
+        self.assertEqual(changes, {'users': 1, 'channels': 1,
+                                   'usergroups': 1})
+        self.assertEqual(self.snapshot.user(self.bob)['real_name'], 'Bob')
+        self.assertNotIn('real_name', self.snapshot.user(self.alice))
+        self.assertIsNone(self.snapshot.channel(self.general))
+
+    def test_apply_event(self):
+        self.snapshot.refresh(self.slack)
+        user = dict(self.fake.users[self.bob], name='robert')
+
+        self.assertTrue(self.snapshot.apply_event({'type': 'user_change',
+                                                   'user': user}))
+        self.snapshot.apply_event({'type': 'channel_rename', 'channel': {
+            'id': self.general, 'name': 'lobby', 'created': 1500000000
+        }})
+        self.snapshot.apply_event({'type': 'channel_archive',
+                                   'channel': self.general})
+        self.snapshot.apply_event({'type': 'subteam_members_changed',
+                                   'subteam_id': 'S0000001',
+                                   'added_users': [self.bob],
+                                   'removed_users': [self.alice]})
+        self.assertFalse(self.snapshot.apply_event({'type': 'message'}))
+
+        self.assertEqual(self.snapshot.user_by_name('robert')['id'],
+                         self.bob)
+        channel = self.snapshot.channel_by_name('lobby')
+        self.assertTrue(channel['is_archived'])
+        self.assertEqual(self.snapshot.usergroup('S0000001')['users'],
+                         [self.bob])
+
+    def test_background_refresh(self):
+        self.snapshot.start(self.slack, interval=60)
+        deadline = time.time() + 5
+        while self.snapshot.refreshed('usergroups') is None and \
+                time.time() < deadline:
+            time.sleep(.01)
+        self.snapshot.stop()
+
+        self.assertEqual(len(self.snapshot.users()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from slacker import Slacker
+from slacker.dm import DMCache
+from slacker.fake import FakeSlack
+
+
+class TestDMCache(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'dms.json')
+        self.slack = Slacker('xoxb-fake', transport=self.fake,
+                             dm_cache_path=self.path)
+        self.users = [self.fake.add_user(name) for name in 'abc']
+
+    def opens(self):
+        return len([c for c in self.fake.calls
+                    if c[0] == 'conversations.open'])
+
+    def test_post_message_to_users(self):
+        a, b, c = self.users
+        for _ in range(3):
+            self.slack.chat.post_message(a, 'hi')
+        self.slack.chat.post_message([c, b], 'hi both')
+        self.slack.chat.post_message([b, c], 'hi again')
+
+        self.assertEqual(self.opens(), 2)
+        dm = self.slack.dms.get(a)
+        self.assertEqual(len(self.fake.messages[dm]), 3)
+        group = self.slack.dms.get([b, c])
+        self.assertEqual(len(self.fake.messages[group]), 2)
+
+    def test_resolution_is_opt_in(self):
+        a = self.users[0]
+        slack = Slacker('xoxb-fake', transport=self.fake)
+        self.assertIsNone(slack.chat.dm_cache)
+        slack.chat.post_message(a, 'hi')
+        self.assertEqual(self.opens(), 0)
+        self.assertEqual(self.fake.calls[-1][1]['channel'], a)
+
+        slack = Slacker('xoxb-fake', transport=self.fake, dm_cache=True)
+        slack.chat.post_message(a, 'hi')
+        self.assertEqual(self.opens(), 1)
+
+    def test_cache_is_persisted(self):
+        a = self.users[0]
+        channel = self.slack.dms.get(a)
+
+        cache = DMCache(self.slack.conversations, self.path)
+        self.assertEqual(cache.get(a), channel)
+        self.assertEqual(self.opens(), 1)
+
+    def test_open_many(self):
+        a, b, c = self.users
+        self.slack.dms.get(a)
+
+        results = self.slack.dms.open_many([a, b, [a, c], 'U404'])
+
+        self.assertEqual(self.opens(), 4)
+        self.assertEqual(results['U404'], 'user_not_found')
+        self.assertEqual(results[a], self.slack.dms.get(a))
+        self.assertEqual(results[(a, c)], self.slack.dms.get([c, a]))
+        self.assertEqual(len(self.slack.dms), 3)
+        self.assertEqual(self.opens(), 4)
+
+    def test_invalidate(self):
+        a = self.users[0]
+        self.slack.dms.get(a)
+        self.slack.dms.invalidate(a)
+        self.assertNotIn(a, self.slack.dms)
+        self.assertNotIn(a, DMCache(self.slack.conversations, self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import hashlib
+import hmac
+import io
+import json
+import sys
+import threading
+import time
+import unittest
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+import responses
+
+from slacker.events import EventReceiver, verify_signature
+
+SECRET = '8f742231b10e8888abcd99yyyzzz85a5'
+
+
+def sign(body, timestamp=None, secret=SECRET):
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    digest = hmac.new(secret.encode(), b'v0:' + timestamp.encode() + b':' +
+                      body, hashlib.sha256).hexdigest()
+    return timestamp, 'v0=' + digest
+
+
+def call_wsgi(app, body, content_type='application/json', headers=None):
+    timestamp, signature = sign(body)
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_X_SLACK_REQUEST_TIMESTAMP': timestamp,
+        'HTTP_X_SLACK_SIGNATURE': signature,
+        'wsgi.input': io.BytesIO(body),
+    }
+    environ.update(headers or {})
+    started = []
+    content = b''.join(app(environ, lambda s, h: started.append(s)))
+    return started[0], content
+
+
+def event(event_id, type='app_mention', text='hi'):
+    return json.dumps({
+        'type': 'event_callback',
+        'event_id': event_id,
+        'event': {'type': type, 'text': text},
+    }).encode()
+
+
+class TestVerifySignature(unittest.TestCase):
+    def test_signature(self):
+        # example from Slack's documentation
+        body = (b'token=xyzz0WbapA4vBCDEFasx0q6G&team_id=T1DC2JH3J&'
+                b'team_domain=testteamnow&channel_id=G8PSS9T3V&'
+                b'channel_name=foobar&user_id=U2CERLKJA&user_name=roadrunner&'
+                b'command=%2Fwebhook-collect&text=&response_url=https%3A%2F%2F'
+                b'hooks.slack.com%2Fcommands%2FT1DC2JH3J%2F397700885554%2F'
+                b'96rGlfmibIGlgcZRskXaIFfN&trigger_id=398738663015.'
+                b'47445629121.803a0bc887a14d10d2c447fce8b6703c')
+        signature = ('v0=a2114d57b48eac39b9ad189dd8316235a7b4a8d21a10bd27519'
+                     '666489c69b503')
+        self.assertTrue(verify_signature(SECRET, '1531420618', body,
+                                         signature, now=1531420618))
+        self.assertFalse(verify_signature(SECRET, '1531420618', body + b'x',
+                                          signature, now=1531420618))
+        self.assertFalse(verify_signature(SECRET, '1531420618', body,
+                                          signature, now=1531420618 + 301))
+
+
+class TestEventReceiver(unittest.TestCase):
+    def setUp(self):
+        self.receiver = EventReceiver(SECRET, max_workers=2)
+        self.addCleanup(self.receiver.close)
+        self.received = []
+        self.receiver.on('*', self.received.append)
+
+    def test_url_verification(self):
+        status, content = call_wsgi(self.receiver, json.dumps({
+            'type': 'url_verification', 'challenge': 'abc'
+        }).encode())
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(json.loads(content.decode()), {'challenge': 'abc'})
+
+    def test_bad_signature_is_rejected(self):
+        status, _ = call_wsgi(self.receiver, event('Ev1'), headers={
+            'HTTP_X_SLACK_SIGNATURE': 'v0=bad'
+        })
+        self.assertEqual(status, '401 Unauthorized')
+        self.receiver.close()
+        self.assertEqual(self.received, [])
+
+    def test_ack_does_not_wait_for_handlers(self):
+        release = threading.Event()
+        handled = []
+
+        @self.receiver.on('app_mention')
+        def slow(event):
+            release.wait(5)
+            handled.append(event['text'])
+
+        started = time.time()
+        status, _ = call_wsgi(self.receiver, event('Ev1'))
+        self.assertEqual(status, '200 OK')
+        self.assertLess(time.time() - started, 1)
+
+        release.set()
+        self.receiver.close()
+        self.assertEqual(handled, ['hi'])
+        self.assertEqual(self.received, [])
+
+    def test_retries_are_deduplicated(self):
+        for _ in range(3):
+            status, _ = call_wsgi(self.receiver, event('Ev1'), headers={
+                'HTTP_X_SLACK_RETRY_NUM': '1'
+            })
+            self.assertEqual(status, '200 OK')
+        call_wsgi(self.receiver, event('Ev2', text='again'))
+
+        self.receiver.close()
+        self.assertEqual([e['text'] for e in self.received], ['hi', 'again'])
+
+    def test_full_queue_is_rejected_and_retried(self):
+        receiver = EventReceiver(SECRET, max_workers=1, max_queue=0)
+        release = threading.Event()
+        handled = []
+        receiver.on('app_mention', lambda e: (release.wait(5),
+                                              handled.append(e['text'])))
+
+        self.assertEqual(call_wsgi(receiver, event('Ev1', text='a'))[0],
+                         '200 OK')
+        self.assertEqual(call_wsgi(receiver, event('Ev2', text='b'))[0],
+                         '503 Service Unavailable')
+        release.set()
+        receiver.close()
+
+        self.assertEqual(handled, ['a'])
+
+    def test_interactive_payloads_and_commands(self):
+        call_wsgi(self.receiver, urlencode({'payload': json.dumps({
+            'type': 'block_actions', 'actions': []
+        })}).encode(), 'application/x-www-form-urlencoded')
+        call_wsgi(self.receiver, urlencode({
+            'command': '/deploy', 'text': 'api'
+        }).encode(), 'application/x-www-form-urlencoded')
+
+        self.receiver.close()
+        self.assertEqual(
+            sorted(p.get('type') or p.get('command') for p in self.received),
+            ['/deploy', 'block_actions']
+        )
+
+    @responses.activate
+    def test_respond(self):
+        url = 'https://hooks.slack.com/commands/T1/1/x'
+        responses.add(responses.POST, url, status=200)
+
+        self.receiver.respond(url, 'done', response_type='in_channel')
+
+        self.assertEqual(json.loads(responses.calls[0].request.body),
+                         {'text': 'done', 'response_type': 'in_channel'})
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'ASGI requires Python 3.5+')
+class TestASGI(unittest.TestCase):
+    def test_request(self):
+        import asyncio
+        from slacker.asgi import asgi_app
+
+        receiver = EventReceiver(SECRET)
+        self.addCleanup(receiver.close)
+        body = json.dumps({'type': 'url_verification',
+                           'challenge': 'abc'}).encode()
+        timestamp, signature = sign(body)
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'x-slack-request-timestamp', timestamp.encode()),
+                (b'x-slack-signature', signature.encode()),
+            ],
+        }
+        messages = [{'type': 'http.request', 'body': body[:10],
+                     'more_body': True},
+                    {'type': 'http.request', 'body': body[10:]}]
+        sent = []
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        loop.run_until_complete(asgi_app(receiver)(
+            scope,
+            lambda: asyncio.sleep(0, result=messages.pop(0)),
+            lambda message: asyncio.sleep(0, result=sent.append(message))
+        ))
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(json.loads(sent[1]['body'].decode()),
+                         {'challenge': 'abc'})
+
+
+if __name__ == '__main__':
+    unittest.main()
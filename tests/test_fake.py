@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from slacker import Error, OAuth, Slacker
+from slacker.fake import FakeSlack
+from slacker.transport import RecordingTransport, ReplayTransport
+
+
+class TestFakeSlack(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack(page_size=2)
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+
+    def test_messages_and_threads(self):
+        channel = self.slack.conversations.create('general').body[
+            'channel']['id']
+        ts = self.slack.chat.post_message(channel, 'parent').body['ts']
+        self.slack.chat.post_message(channel, 'reply', thread_ts=ts)
+        self.slack.chat.post_message(channel, 'newest')
+
+        history = self.slack.conversations.history(channel).body
+        self.assertEqual([m['text'] for m in history['messages']],
+                         ['newest', 'parent'])
+        self.assertEqual(history['messages'][1]['reply_count'], 1)
+
+        replies = self.slack.conversations.replies(channel, ts).body
+        self.assertEqual([m['text'] for m in replies['messages']],
+                         ['parent', 'reply'])
+
+    def test_members_are_paginated(self):
+        users = [self.fake.add_user(name) for name in 'abc']
+        channel = self.fake.add_conversation('general')
+        self.slack.conversations.invite(channel, users)
+
+        page = self.slack.conversations.members(channel).body
+        self.assertEqual(page['members'], users[:2])
+        cursor = page['response_metadata']['next_cursor']
+        page = self.slack.conversations.members(channel, cursor=cursor).body
+        self.assertEqual(page['members'], users[2:])
+
+    def test_errors_and_injected_failures(self):
+        with self.assertRaises(Error) as cm:
+            self.slack.conversations.info('C404')
+        self.assertEqual(str(cm.exception), 'channel_not_found')
+
+        self.fake.inject('api.test', status=503)
+        with self.assertRaises(Exception):
+            self.slack.api.test()
+        self.assertTrue(self.slack.api.test().successful)
+
+
+class TestRecordReplay(unittest.TestCase):
+    def test_replay_serves_recorded_responses_in_order(self):
+        fake = FakeSlack()
+        channel = fake.add_conversation('general')
+        recorder = RecordingTransport(fake)
+        slack = Slacker('xoxb-secret', transport=recorder)
+        slack.chat.post_message(channel, 'one')
+        slack.chat.post_message(channel, 'one')
+        self.assertNotIn('xoxb-secret', str(recorder.interactions))
+
+        replay = Slacker('xoxb-other',
+                         transport=ReplayTransport(recorder.interactions))
+        first = replay.chat.post_message(channel, 'one').body['ts']
+        second = replay.chat.post_message(channel, 'one').body['ts']
+        self.assertLess(first, second)
+        with self.assertRaises(LookupError):
+            replay.chat.post_message(channel, 'one')
+
+    def test_oauth_secrets_are_not_recorded(self):
+        class OAuthFake(FakeSlack):
+            def api_oauth_access(self, args):
+                return {'access_token': 'xoxb-issued',
+                        'refresh_token': 'xoxe-refresh',
+                        'authed_user': {'id': 'U1',
+                                        'access_token': 'xoxp-issued'}}
+
+        recorder = RecordingTransport(OAuthFake())
+        oauth = OAuth(transport=recorder)
+        oauth.access('123', 'shh', 'c0de')
+        recorded = json.dumps(recorder.interactions)
+        for secret in ('shh', 'c0de', 'xoxb-issued', 'xoxe-refresh',
+                       'xoxp-issued'):
+            self.assertNotIn(secret, recorded)
+
+        replay = OAuth(transport=ReplayTransport(recorder.interactions))
+        body = replay.access('123', 'other', 'other').body
+        self.assertEqual(body['access_token'], '[redacted]')
+        self.assertEqual(body['authed_user']['id'], 'U1')
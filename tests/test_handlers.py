@@ -0,0 +1,87 @@
+import logging
+import time
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.handlers import SlackHandler
+
+
+class TestSlackHandler(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.channel = self.fake.add_conversation('alerts')
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.logger = logging.getLogger('tests.slack_handler')
+        self.logger.propagate = False
+
+    def attach(self, handler):
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return handler
+
+    def texts(self):
+        return [m['text'] for m in self.fake.messages[self.channel]]
+
+    def test_records_are_batched_and_deduplicated(self):
+        handler = self.attach(SlackHandler(
+            self.slack.chat, self.channel, flush_interval=.05, min_interval=0
+        ))
+        self.logger.error('disk full')
+        self.logger.error('disk full')
+        self.logger.error('db down')
+        handler.flush()
+
+        self.assertEqual(self.texts(), ['disk full\ndb down'])
+
+    def test_long_batches_are_split(self):
+        handler = self.attach(SlackHandler(
+            self.slack.chat, self.channel, flush_interval=.05,
+            min_interval=0, max_length=50
+        ))
+        records = ['record {} '.format(i) * 2 for i in range(6)]
+        for record in records:
+            self.logger.error(record)
+        handler.flush()
+
+        texts = self.texts()
+        self.assertTrue(len(texts) > 1)
+        self.assertTrue(all(len(text) <= 50 for text in texts))
+        self.assertEqual('\n'.join(texts).split('\n'), records)
+
+    def test_repeats_are_reported_without_further_records(self):
+        self.attach(SlackHandler(
+            self.slack.chat, self.channel, flush_interval=.01,
+            min_interval=0, dedup_window=.1
+        ))
+        for _ in range(3):
+            self.logger.error('disk full')
+        deadline = time.time() + 5
+        while len(self.texts()) < 2 and time.time() < deadline:
+            time.sleep(.01)
+
+        self.assertEqual(self.texts(),
+                         ['disk full', 'disk full (repeated 2 more times)'])
+
+    def test_repeats_are_reported_on_close(self):
+        handler = SlackHandler(self.slack.chat, self.channel,
+                               flush_interval=.01, min_interval=0)
+        self.logger.addHandler(handler)
+        self.logger.error('db down')
+        self.logger.error('db down')
+        self.logger.removeHandler(handler)
+        handler.close()
+
+        self.assertEqual(self.texts(),
+                         ['db down\ndb down (repeated 1 more times)'])
+
+    def test_bounded_queue_drops_newest(self):
+        handler = SlackHandler(self.slack.chat, self.channel, max_queue=2,
+                               drop='newest', flush_interval=60)
+        self.addCleanup(handler.close)
+        with handler._cond:
+            for i in range(4):
+                handler.emit(logging.makeLogRecord({'msg': str(i)}))
+        self.assertEqual(list(handler._queue), ['0', '1'])
+        self.assertEqual(handler.dropped, 2)
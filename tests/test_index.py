@@ -0,0 +1,56 @@
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.index import SearchIndex
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack(page_size=2)
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.alice = self.fake.add_user('alice')
+        self.channel = self.fake.add_conversation('ops')
+        self.index = SearchIndex()
+        self.addCleanup(self.index.close)
+
+    def search(self, query, **kwargs):
+        body = self.index.messages(query, **kwargs).body['messages']
+        return [m['text'] for m in body['matches']]
+
+    def test_sync_is_incremental_and_follows_threads(self):
+        parent = self.fake.add_message(self.channel, 'deploy started',
+                                       user=self.alice)
+        self.fake.add_message(self.channel, 'deploy failed: disk',
+                              thread_ts=parent)
+        self.assertEqual(
+            self.index.sync(self.slack.conversations, self.channel, 'ops'), 2
+        )
+
+        self.fake.add_message(self.channel, 'rollback done')
+        self.fake.add_message(self.channel, 'deploy retried',
+                              thread_ts=parent)
+        self.assertEqual(self.index.sync(self.slack.conversations,
+                                         self.channel, lookback=3600), 4)
+        self.assertEqual(self.index.sync(self.slack.conversations,
+                                         self.channel), 0)
+
+        self.assertEqual(self.search('deploy', sort_dir='asc'),
+                         ['deploy started', 'deploy failed: disk',
+                          'deploy retried'])
+        self.assertEqual(self.search('failed: from:{}'.format(self.alice)),
+                         [])
+        self.assertEqual(self.search('deploy from:{} in:#ops'.format(
+            self.alice)), ['deploy started'])
+        self.assertEqual(self.search('after:2017-07-14'), [])
+
+    def test_result_shape_matches_search(self):
+        for i in range(3):
+            self.fake.add_message(self.channel, 'alert {}'.format(i))
+        self.index.sync(self.slack.conversations, self.channel, 'ops')
+
+        body = self.index.messages('alert', count=2, page=2).body
+        self.assertEqual(body['messages']['paging'],
+                         {'count': 2, 'total': 3, 'page': 2, 'pages': 2})
+        self.assertEqual(body['messages']['matches'][0]['channel'],
+                         {'id': self.channel, 'name': 'ops'})
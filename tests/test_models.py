@@ -0,0 +1,39 @@
+import json
+import unittest
+
+from slacker import Response
+from slacker.models import Message, User
+
+
+class TestModels(unittest.TestCase):
+    def test_message_fields_and_lazy_reactions(self):
+        message = Message({
+            'ts': '1.000100', 'user': 'U111', 'text': 'hi',
+            'reactions': [{'name': 'tada', 'count': 2, 'users': ['U1']}],
+            'blocks': [{'type': 'section'}],
+        })
+        self.assertEqual(message.user, 'U111')
+        self.assertFalse(hasattr(message, '__dict__'))
+        self.assertIsInstance(message._reactions[0], dict)
+        self.assertEqual(message.reactions[0].count, 2)
+        self.assertIsNone(message.get('blocks'))
+
+    def test_keep_extra_round_trips(self):
+        data = {'id': 'U1', 'name': 'bob', 'profile': {'email': 'b@x.io'},
+                'color': 'fff'}
+        user = User(data, keep_extra=True)
+        self.assertEqual(user.profile.email, 'b@x.io')
+        self.assertEqual(user.to_dict(), data)
+
+    def test_interned_ids_are_shared(self):
+        first = Message({'user': ''.join(['U', '222'])})
+        second = Message({'user': ''.join(['U', '222'])})
+        self.assertIs(first.user, second.user)
+
+    def test_response_models(self):
+        response = Response(json.dumps({
+            'ok': True,
+            'members': [{'id': 'U1', 'name': 'a'}, {'id': 'U2', 'name': 'b'}],
+        }))
+        users = response.models('members')
+        self.assertEqual([u.name for u in users], ['a', 'b'])
@@ -0,0 +1,151 @@
+import itertools
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from slacker import Slacker
+from slacker.breaker import CircuitBreaker
+from slacker.fake import FakeSlack
+from slacker.outbox import (
+    FAILED, MARKER_KEY, PENDING, SENDING, SENT, Outbox, _marker, _with_marker
+)
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.channel = self.fake.add_conversation('general')
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'outbox.db')
+        self.clock = itertools.count(1)
+
+    def texts(self):
+        return [m['text'] for m in self.fake.messages[self.channel]]
+
+    def test_delivers_in_order_and_tracks_ts(self):
+        with Outbox(self.slack, self.path, poll_interval=.01) as outbox:
+            first = outbox.post_message(self.channel, 'one')
+            second = outbox.post_message(self.channel, 'two')
+            outbox.update(first, 'one, edited')
+            outbox.delete(second)
+            missing = outbox.post_message('C404', 'lost')
+            self.assertTrue(outbox.drain(timeout=5))
+
+            self.assertEqual(self.texts(), ['one, edited'])
+            self.assertEqual(outbox.status(first)['state'], SENT)
+            self.assertEqual(outbox.status(first)['ts'],
+                             self.fake.messages[self.channel][0]['ts'])
+            self.assertEqual(outbox.status(missing)['state'], FAILED)
+
+    def test_unexpected_error_fails_only_the_message(self):
+        with Outbox(self.slack, self.path, max_workers=1,
+                    poll_interval=.01) as outbox:
+            bad = outbox.post_message(self.channel, 'a', bogus=1)
+            good = outbox.post_message(self.channel, 'b')
+            self.assertTrue(outbox.drain(timeout=5))
+
+            self.assertEqual(outbox.status(bad)['state'], FAILED)
+            self.assertEqual(outbox.status(good)['state'], SENT)
+        self.assertEqual(self.texts(), ['b'])
+
+    def test_open_circuit_is_retried(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.failure('chat.postMessage')
+        self.slack.chat.circuit_breaker = breaker
+        with Outbox(self.slack, self.path, poll_interval=.01,
+                    retry_interval=.3) as outbox:
+            message = outbox.post_message(self.channel, 'later')
+            self.assertFalse(outbox.drain(timeout=.1))
+            self.assertEqual(outbox.status(message)['state'], PENDING)
+
+            breaker.reset()
+            self.assertTrue(outbox.drain(timeout=5))
+            self.assertEqual(outbox.status(message)['state'], SENT)
+        self.assertEqual(self.texts(), ['later'])
+
+    def crash_after_posting(self, outbox, row_id, text, **fields):
+        """
+        Leaves a message posted but not recorded, as a crash between
+        chat.postMessage and recording its ts would.
+        """
+        created = outbox._execute('SELECT created FROM outbox WHERE id = ?',
+                                  (row_id,))[0][0]
+        outbox._mark(row_id, SENDING)
+        return self.fake.add_message(
+            self.channel, text, ts=self.ts(),
+            metadata=_with_marker(None, _marker(row_id, created)), **fields
+        )
+
+    def ts(self):
+        return '{:.6f}'.format(time.time() + next(self.clock) * 1e-3)
+
+    def test_interrupted_send_is_not_duplicated(self):
+        outbox = Outbox(self.slack, self.path)
+        posted = outbox.post_message(self.channel, 'posted before crash')
+        unsent = outbox.post_message(self.channel, 'never posted')
+        self.crash_after_posting(outbox, posted, 'posted before crash')
+        outbox._mark(unsent, SENDING)
+
+        with Outbox(self.slack, self.path, poll_interval=.01) as recovered:
+            self.assertTrue(recovered.drain(timeout=5))
+            self.assertEqual(recovered.status(posted)['state'], SENT)
+            self.assertEqual(recovered.status(unsent)['attempts'], 1)
+
+        self.assertEqual(self.texts(),
+                         ['posted before crash', 'never posted'])
+
+    def test_recovery_ignores_identical_messages(self):
+        outbox = Outbox(self.slack, self.path)
+        first = outbox.post_message(self.channel, 'build ok')
+        ts = self.crash_after_posting(outbox, first, 'build ok')
+        outbox._mark(first, SENT, ts=ts)
+        second = outbox.post_message(self.channel, 'build ok')
+        # crash before the second one was posted
+        outbox._mark(second, SENDING)
+
+        with Outbox(self.slack, self.path, poll_interval=.01) as recovered:
+            self.assertTrue(recovered.drain(timeout=5))
+            self.assertEqual(recovered.status(second)['state'], SENT)
+            self.assertNotEqual(recovered.status(second)['ts'], ts)
+
+        self.assertEqual(self.texts(), ['build ok', 'build ok'])
+
+    def test_recovery_pages_through_history(self):
+        outbox = Outbox(self.slack, self.path)
+        posted = outbox.post_message(self.channel, 'hello')
+        self.crash_after_posting(outbox, posted, 'hello')
+        for i in range(250):
+            self.fake.add_message(self.channel, str(i), ts=self.ts())
+
+        with Outbox(self.slack, self.path, poll_interval=.01) as recovered:
+            self.assertTrue(recovered.drain(timeout=5))
+            self.assertEqual(recovered.status(posted)['state'], SENT)
+
+        self.assertEqual(self.texts().count('hello'), 1)
+
+    def test_recovery_of_blocks_only_message(self):
+        blocks = [{'type': 'divider'}]
+        outbox = Outbox(self.slack, self.path)
+        posted = outbox.post_message(self.channel, blocks=blocks)
+        self.crash_after_posting(outbox, posted, '', blocks=blocks)
+
+        with Outbox(self.slack, self.path, poll_interval=.01) as recovered:
+            self.assertTrue(recovered.drain(timeout=5))
+            self.assertEqual(recovered.status(posted)['state'], SENT)
+
+        self.assertEqual(len(self.fake.messages[self.channel]), 1)
+
+    def test_posted_messages_carry_marker_and_metadata(self):
+        metadata = {'event_type': 'deploy', 'event_payload': {'id': 7}}
+        with Outbox(self.slack, self.path, poll_interval=.01) as outbox:
+            outbox.post_message(self.channel, 'hi', metadata=metadata)
+            self.assertTrue(outbox.drain(timeout=5))
+
+        stored = self.fake.messages[self.channel][0]['metadata']
+        self.assertEqual(stored['event_type'], 'deploy')
+        self.assertEqual(stored['event_payload']['id'], 7)
+        self.assertIn(MARKER_KEY, stored['event_payload'])
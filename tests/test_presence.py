@@ -0,0 +1,83 @@
+import threading
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.presence import PresenceTracker
+from slacker.ratelimit import RateLimiter
+
+
+class TestPresenceTracker(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.slack = Slacker('xoxb-fake', transport=self.fake,
+                             rate_limiter=RateLimiter(burst=60))
+        self.users = [self.fake.add_user(str(i)) for i in range(5)]
+        self.tracker = PresenceTracker(self.slack, self.users, interval=10,
+                                       max_interval=40, away_interval=30,
+                                       dnd_batch_size=2)
+
+    def calls(self, api):
+        return len([c for c in self.fake.calls if c[0] == api])
+
+    def test_only_changes_are_reported(self):
+        self.assertEqual(self.tracker.poll(now=0), [])
+        self.assertEqual(self.calls('users.getPresence'), 5)
+        self.assertEqual(self.calls('dnd.teamInfo'), 3)
+        self.assertEqual(self.tracker.state(self.users[0]),
+                         {'presence': 'active', 'dnd_enabled': False})
+
+        self.fake.users[self.users[0]]['presence'] = 'away'
+        self.fake.users[self.users[1]]['dnd_enabled'] = True
+        events = self.tracker.poll(now=10)
+
+        self.assertEqual(sorted(events, key=lambda e: e['type']), [
+            {'type': 'dnd_change', 'user': self.users[1],
+             'dnd_enabled': True, 'previous': False},
+            {'type': 'presence_change', 'user': self.users[0],
+             'presence': 'away', 'previous': 'active'},
+        ])
+
+    def test_intervals_adapt(self):
+        self.tracker.poll(now=0)
+        self.assertEqual(self.tracker.poll(now=5), [])
+        self.assertEqual(self.calls('users.getPresence'), 5)
+
+        self.fake.users[self.users[0]]['dnd_enabled'] = True
+        self.fake.users[self.users[1]]['presence'] = 'away'
+        self.tracker.poll(now=10)
+        # changed users are due again after interval, away ones after
+        # away_interval, unchanged ones back off
+        self.assertEqual(self.tracker._due, {
+            self.users[0]: 20, self.users[1]: 40, self.users[2]: 30,
+            self.users[3]: 30, self.users[4]: 30,
+        })
+
+        self.tracker.poll(now=20)
+        self.assertEqual(self.calls('users.getPresence'), 11)
+        self.tracker.poll(now=30)
+        self.assertEqual(self.tracker._due[self.users[2]], 70)
+
+    def test_background_polling(self):
+        events = []
+        changed = threading.Event()
+
+        def on_change(event):
+            events.append(event)
+            changed.set()
+
+        tracker = PresenceTracker(self.slack, self.users[:1], interval=.05,
+                                  on_change=on_change)
+        tracker.start()
+        self.addCleanup(tracker.stop)
+        while not self.calls('users.getPresence'):
+            changed.wait(.01)
+        self.fake.users[self.users[0]]['presence'] = 'away'
+
+        self.assertTrue(changed.wait(5))
+        tracker.stop()
+        self.assertEqual(events[0]['presence'], 'away')
+
+
+if __name__ == '__main__':
+    unittest.main()
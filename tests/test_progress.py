@@ -0,0 +1,61 @@
+import time
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.progress import ProgressUpdater
+
+
+class TestProgressUpdater(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        self.channel = self.fake.add_conversation('jobs')
+        self.ts = self.fake.add_message(self.channel, 'starting')
+
+    def updates(self):
+        return [args['text'] for api, args in self.fake.calls
+                if api == 'chat.update']
+
+    def test_updates_are_coalesced(self):
+        started = time.time()
+        with ProgressUpdater(self.slack.chat, self.channel, self.ts,
+                             rate=5) as progress:
+            for i in range(100):
+                progress.update('{}%'.format(i + 1))
+            self.assertLess(time.time() - started, .1)
+
+        updates = self.updates()
+        self.assertLessEqual(len(updates), 3)
+        self.assertEqual(updates[-1], '100%')
+        self.assertEqual(self.fake.messages[self.channel][0]['text'], '100%')
+
+    def test_updates_are_spaced(self):
+        progress = ProgressUpdater(self.slack.chat, self.channel, self.ts,
+                                   rate=10)
+        progress.update('a')
+        progress.flush()
+        started = time.time()
+        progress.update('b')
+        progress.flush()
+        self.assertGreaterEqual(time.time() - started, .05)
+        progress.close()
+
+        self.assertEqual(self.updates(), ['a', 'b'])
+        self.assertEqual(progress.sent, 2)
+        self.assertRaises(ValueError, progress.update, 'c')
+
+    def test_failures_do_not_stop_updates(self):
+        self.fake.inject('chat.update', status=500)
+        with ProgressUpdater(self.slack.chat, self.channel, self.ts,
+                             rate=50) as progress:
+            progress.update('a')
+            progress.flush()
+            progress.update('b')
+
+        self.assertIsNotNone(progress.error)
+        self.assertEqual(self.fake.messages[self.channel][0]['text'], 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from slacker import Slacker, call_options
+from slacker.fake import FakeSlack
+from slacker.ratelimit import (
+    BACKGROUND, INTERACTIVE, ConcurrencyLimiter, FileRateLimiter,
+    RateLimitCoordinator, RateLimiter, RemoteRateLimiter, TokenBucket, fcntl
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_take_waits_for_refill(self):
+        bucket = TokenBucket(rate=2., capacity=2., now=0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertAlmostEqual(bucket.take(0), .5)
+        self.assertEqual(bucket.take(.5), 0)
+
+    def test_pause_blocks_until_deadline(self):
+        bucket = TokenBucket(rate=10., capacity=10., now=0)
+        bucket.pause(30)
+        self.assertEqual(bucket.take(10), 20)
+        self.assertEqual(bucket.take(31), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_buckets_follow_method_tiers(self):
+        limiter = RateLimiter(tiers={'api.test': 1})
+        limiter.acquire('api.test')
+        limiter.acquire('users.info')
+        self.assertEqual(limiter._buckets['api.test'].rate, 1 / 60.)
+        self.assertEqual(limiter._buckets['users.info'].rate, 100 / 60.)
+
+
+class SharedLimiterTests(object):
+    def make_limiters(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_buckets_are_shared(self):
+        first, second = self.make_limiters()
+        self.assertEqual(first._take('api.test'), 0)
+        self.assertGreater(second._take('api.test'), 0)
+
+    def test_pauses_are_shared(self):
+        first, second = self.make_limiters()
+        first.pause('users.info', 30)
+        self.assertGreater(second._take('users.info'), 29)
+        self.assertFalse(second.acquire('users.info', deadline=0))
+
+
+@unittest.skipIf(fcntl is None, 'flock is not available')
+class TestFileRateLimiter(SharedLimiterTests, unittest.TestCase):
+    def make_limiters(self):
+        path = os.path.join(self.dir, 'limits.json')
+        return [FileRateLimiter(path, tiers={'api.test': 1}, burst=0)
+                for _ in range(2)]
+
+
+class TestRateLimitCoordinator(SharedLimiterTests, unittest.TestCase):
+    def make_limiters(self):
+        coordinator = RateLimitCoordinator(
+            os.path.join(self.dir, 'limits.sock'),
+            RateLimiter(tiers={'api.test': 1}, burst=0)
+        ).start()
+        self.addCleanup(coordinator.close)
+        limiters = [RemoteRateLimiter(coordinator.path) for _ in range(2)]
+        for limiter in limiters:
+            self.addCleanup(limiter.close)
+        return limiters
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_limit_grows_by_one_per_round(self):
+        limiter = ConcurrencyLimiter(initial=2, maximum=3)
+        for _ in range(2):
+            limiter.release('users.info', limiter.acquire('users.info'))
+        self.assertEqual(limiter.limit('users.info'), 3)
+        for _ in range(10):
+            limiter.release('users.info', limiter.acquire('users.info'))
+        self.assertEqual(limiter.limit('users.info'), 3)
+
+    def test_throttled_burst_decreases_once(self):
+        limiter = ConcurrencyLimiter(initial=8)
+        started = [limiter.acquire('users.info') for _ in range(4)]
+        for start in started:
+            limiter.release('users.info', start, throttled=True)
+        self.assertEqual(limiter.limit('users.info'), 4)
+
+        limiter.release('users.info', limiter.acquire('users.info'),
+                        throttled=True)
+        self.assertEqual(limiter.limit('users.info'), 2)
+
+    def test_failures_do_not_skew_latency(self):
+        class FlakyFake(FakeSlack):
+            failures = 1
+
+            def send(self, *args, **kwargs):
+                if self.failures:
+                    self.failures -= 1
+                    raise requests.ConnectionError('reset')
+                time.sleep(.03)
+                return super(FlakyFake, self).send(*args, **kwargs)
+
+        concurrency = ConcurrencyLimiter(initial=4)
+        slack = Slacker('xoxb-fake', transport=FlakyFake(),
+                        concurrency=concurrency)
+        self.assertRaises(requests.ConnectionError, slack.auth.test)
+        for _ in range(12):
+            slack.auth.test()
+        self.assertGreater(concurrency.limit('auth.test'), 5)
+
+    def test_acquire_respects_limit_and_deadline(self):
+        limiter = ConcurrencyLimiter(initial=1)
+        started = limiter.acquire('users.info')
+        self.assertIsNone(limiter.acquire('users.info', deadline=0))
+        limiter.release('users.info', started)
+        self.assertIsNotNone(limiter.acquire('users.info', deadline=0))
+
+    def test_fed_by_requests(self):
+        fake = FakeSlack()
+        concurrency = ConcurrencyLimiter(initial=4, maximum=16)
+        slack = Slacker('xoxb-fake', transport=fake, rate_limit_retries=2,
+                        concurrency=concurrency,
+                        rate_limiter=RateLimiter(burst=60))
+        channel = fake.add_conversation('general')
+        users = [fake.add_user(str(i)) for i in range(20)]
+
+        fake.inject('chat.postMessage', headers={'Retry-After': '0'})
+        slack.chat.post_message(channel, 'hi')
+        self.assertEqual(concurrency.limit('chat.postMessage'), 2)
+
+        results = slack.conversations.kick_many(channel, users)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(
+            concurrency._methods['conversations.kick'].in_flight, 0
+        )
+
+
+class TestPriorities(unittest.TestCase):
+    def test_reserve_is_left_to_interactive_calls(self):
+        limiter = RateLimiter(tiers={'chat.postMessage': 1}, burst=300,
+                              reserve=.4)
+        # capacity of 5 tokens, 2 of them reserved
+        for _ in range(3):
+            self.assertTrue(limiter.acquire('chat.postMessage',
+                                            priority=BACKGROUND, deadline=0))
+        self.assertFalse(limiter.acquire('chat.postMessage',
+                                         priority=BACKGROUND, deadline=0))
+        self.assertTrue(limiter.acquire('chat.postMessage', deadline=0))
+        self.assertTrue(limiter.acquire('chat.postMessage', deadline=0))
+        self.assertFalse(limiter.acquire('chat.postMessage', deadline=0))
+
+    def test_urgent_calls_go_first(self):
+        limiter = RateLimiter(tiers={'users.info': 4}, burst=0)
+        limiter.acquire('users.info')
+        order = []
+
+        def call(priority, name):
+            limiter.acquire('users.info', priority=priority)
+            order.append(name)
+
+        background = threading.Thread(target=call,
+                                      args=(BACKGROUND, 'background'))
+        background.start()
+        time.sleep(.1)
+        interactive = threading.Thread(target=call,
+                                       args=(INTERACTIVE, 'interactive'))
+        interactive.start()
+        background.join()
+        interactive.join()
+
+        self.assertEqual(order, ['interactive', 'background'])
+
+    def test_batch_operations_run_in_background(self):
+        fake = FakeSlack()
+        limiter = RateLimiter()
+        priorities = []
+        acquire = limiter.acquire
+
+        def record(method, deadline=None, priority=None, cancel=None):
+            priorities.append((method, priority))
+            return acquire(method, deadline, priority, cancel)
+
+        limiter.acquire = record
+        slack = Slacker('xoxb-fake', transport=fake, rate_limiter=limiter)
+        channel = fake.add_conversation('general')
+        user = fake.add_user('a')
+
+        slack.chat.post_message(channel, 'hi')
+        slack.conversations.kick_many(channel, [user])
+        with call_options(priority=BACKGROUND):
+            slack.chat.post_message(channel, 'digest')
+
+        self.assertEqual(priorities, [
+            ('chat.postMessage', None),
+            ('conversations.kick', BACKGROUND),
+            ('chat.postMessage', BACKGROUND),
+        ])
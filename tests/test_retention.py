@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.ratelimit import RateLimiter
+from slacker.retention import RetentionEngine, RetentionPolicy
+
+DAY = 86400
+
+
+class TestRetentionEngine(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.slack = Slacker('xoxb-fake', transport=self.fake,
+                             rate_limiter=RateLimiter(burst=60))
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.checkpoint = os.path.join(self.dir, 'retention.json')
+
+        now = time.time()
+        self.alice = self.fake.add_user('alice')
+        self.general = self.fake.add_conversation('general')
+        self.random = self.fake.add_conversation('random')
+        self.fake.add_message(self.general, 'mine', ts='{:.6f}'.format(
+            now - 50 * DAY))
+        for channel in (self.general, self.random):
+            for days in (40, 35, 31, 1):
+                self.fake.add_message(channel, 'old' if days > 30 else 'new',
+                                      user=self.alice,
+                                      ts='{:.6f}'.format(now - days * DAY))
+        self.fake.add_file('old.pdf', user=self.alice, filetype='pdf',
+                           channels=[self.general], created=now - 40 * DAY)
+        self.fake.add_file('old.png', user=self.alice, filetype='png',
+                           channels=[self.general], created=now - 40 * DAY)
+        self.fake.add_file('new.pdf', user=self.alice, filetype='pdf',
+                           channels=[self.general], created=now - DAY)
+
+    def texts(self, channel):
+        return [m['text'] for m in self.fake.messages[channel]]
+
+    def test_policy_is_applied(self):
+        policy = RetentionPolicy(30 * DAY, exclude_channels=[self.random],
+                                 users=[self.alice], file_types=['pdf'])
+
+        report = RetentionEngine(self.slack, policy).run()
+
+        self.assertEqual(report, {'messages': 3, 'files': 1, 'errors': {}})
+        self.assertEqual(self.texts(self.general), ['mine', 'new'])
+        self.assertEqual(self.texts(self.random), ['old'] * 3 + ['new'])
+        self.assertEqual(sorted(f['name'] for f in self.fake.files.values()),
+                         ['new.pdf', 'old.png'])
+
+    def test_unreadable_channel_is_reported(self):
+        policy = RetentionPolicy(30 * DAY, channels=['C404', self.general],
+                                 files=False)
+
+        report = RetentionEngine(self.slack, policy).run()
+
+        self.assertEqual(report['errors'], {'C404': 'channel_not_found'})
+        self.assertEqual(report['messages'], 4)
+        self.assertEqual(self.texts(self.general), ['new'])
+
+    def test_dry_run_deletes_nothing(self):
+        report = RetentionEngine(self.slack, RetentionPolicy(30 * DAY),
+                                 checkpoint=self.checkpoint,
+                                 dry_run=True).run()
+
+        self.assertEqual(report, {'messages': 7, 'files': 2, 'errors': {}})
+        self.assertEqual(len(self.fake.files), 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        apis = set(api for api, _ in self.fake.calls)
+        self.assertFalse(apis & {'chat.delete', 'files.delete'})
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        policy = RetentionPolicy(30 * DAY, channels=[self.general],
+                                 files=False)
+        engine = RetentionEngine(self.slack, policy,
+                                 checkpoint=self.checkpoint, page_size=2)
+        history = self.slack.conversations.history
+        pages = []
+
+        def interrupt(*args, **kwargs):
+            pages.append(kwargs['latest'])
+            if len(pages) == 2:
+                raise KeyboardInterrupt
+            return history(*args, **kwargs)
+
+        self.slack.conversations.history = interrupt
+        self.assertRaises(KeyboardInterrupt, engine.run)
+        with open(self.checkpoint) as f:
+            latest = json.load(f)['channels'][self.general]['latest']
+        self.assertEqual(pages[1], latest)
+
+        self.slack.conversations.history = history
+        report = RetentionEngine(self.slack, policy,
+                                 checkpoint=self.checkpoint,
+                                 page_size=2).run()
+
+        self.assertEqual(report['messages'], 2)
+        self.assertEqual(self.texts(self.general), ['new'])
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f), {'channels': {}, 'files': {}})
+
+    def test_failures_are_reported(self):
+        self.fake.inject('files.delete', status=500)
+        policy = RetentionPolicy(30 * DAY, messages=False)
+
+        report = RetentionEngine(self.slack, policy).run()
+
+        self.assertEqual(report['files'], 1)
+        self.assertEqual(len(report['errors']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
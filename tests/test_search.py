@@ -0,0 +1,73 @@
+import datetime
+import logging
+import unittest
+
+from slacker import Error, Slacker
+from slacker.fake import FakeSlack
+
+DAY = 86400
+EPOCH = datetime.date(1970, 1, 1)
+
+
+class TestScanMessages(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSlack()
+        self.slack = Slacker('xoxb-fake', transport=self.fake)
+        general = self.fake.add_conversation('general')
+        random = self.fake.add_conversation('random')
+        self.start = datetime.date(2020, 1, 1)
+        base = (self.start - EPOCH).days * DAY
+        self.expected = []
+        for i in range(12):
+            channel = general if i % 2 else random
+            ts = '{}.000100'.format(base + i * DAY // 2 + 60)
+            self.fake.add_message(channel, 'deploy {}'.format(i), ts=ts)
+            self.fake.add_message(channel, 'unrelated', ts=ts + '1')
+            self.expected.append('deploy {}'.format(i))
+
+    def scan(self, **kwargs):
+        return [m['text'] for m in self.slack.search.scan_messages(
+            'deploy', self.start, self.start + datetime.timedelta(days=6),
+            **kwargs
+        )]
+
+    def test_windows_are_merged_in_order(self):
+        self.assertEqual(self.scan(window=2, count=3), self.expected)
+        self.assertEqual(self.scan(window=4, sort_dir='desc'),
+                         self.expected[::-1])
+
+    def test_deep_windows_are_split(self):
+        self.assertEqual(self.scan(window=6, count=2, max_pages=1),
+                         self.expected)
+        queries = [args['query'] for api, args in self.fake.calls
+                   if api == 'search.messages']
+        self.assertIn('deploy after:2019-12-31 before:2020-01-07', queries)
+        self.assertIn('deploy after:2020-01-04 before:2020-01-06', queries)
+
+    def test_truncated_days_are_reported(self):
+        records = []
+        handler = logging.Handler(logging.WARNING)
+        handler.emit = records.append
+        logger = logging.getLogger('slacker')
+        logger.addHandler(handler)
+        try:
+            texts = self.scan(window=1, count=1, max_pages=1)
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(len(texts), 6)
+        self.assertEqual(len(records), 6)
+        self.assertIn('only the first 1 are scanned',
+                      records[0].getMessage())
+        self.assertRaises(Error, self.scan, window=1, count=1, max_pages=1,
+                          strict=True)
+
+    def test_windows_are_searched_as_consumed(self):
+        matches = self.slack.search.scan_messages(
+            'deploy', self.start, self.start + datetime.timedelta(days=6),
+            window=1, max_workers=1
+        )
+        next(matches)
+        matches.close()
+        queries = [api for api, args in self.fake.calls
+                   if api == 'search.messages']
+        self.assertEqual(len(queries), 1)
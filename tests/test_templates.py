@@ -0,0 +1,41 @@
+import json
+import unittest
+
+from slacker import Slacker
+from slacker.fake import FakeSlack
+from slacker.templates import MessageTemplate
+
+
+class TestMessageTemplate(unittest.TestCase):
+    def setUp(self):
+        self.template = MessageTemplate(
+            text='{host} is {state} {{ok}}',
+            blocks=[{'type': 'section',
+                     'text': {'type': 'mrkdwn', 'text': '*{host}*: {error}'}}]
+        )
+
+    def test_render_escapes_values(self):
+        rendered = self.template.render(host='db1', state='down',
+                                        error='said "no"\n')
+        self.assertEqual(rendered['text'], 'db1 is down {ok}')
+        self.assertEqual(json.loads(rendered['blocks'])[0]['text']['text'],
+                         '*db1*: said "no"\n')
+
+    def test_missing_values(self):
+        with self.assertRaises(KeyError):
+            self.template.render(host='db1')
+
+    def test_chat_integration(self):
+        fake = FakeSlack()
+        channel = fake.add_conversation('ops')
+        slack = Slacker('xoxb-fake', transport=fake)
+        ts = slack.chat.post_message(channel, template=self.template.render(
+            host='db1', state='down', error='timeout'
+        )).body['ts']
+        slack.chat.update(channel, ts, template=self.template.render(
+            host='db1', state='up', error='none'
+        ))
+
+        message = fake.messages[channel][0]
+        self.assertEqual(message['text'], 'db1 is up {ok}')
+        self.assertIn('*db1*: none', message['blocks'])
@@ -0,0 +1,226 @@
+import json
+import socket
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+
+import requests
+
+from slacker import API, Slacker
+from slacker.breaker import CircuitBreaker
+from slacker.fake import FakeSlack
+from slacker.transport import HTTP2Transport, httpx
+from slacker.utilities import get_api_url
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+
+class H2StandInServer(threading.Thread):
+    """
+    Cleartext HTTP/2 (prior knowledge) server answering every request with
+    ``{"ok": true, "path": <path>}`` and counting TCP connections.
+    """
+
+    def __init__(self):
+        super(H2StandInServer, self).__init__()
+        self.daemon = True
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+        self.connections = 0
+        self.streams = 0
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(conn,)).start()
+
+    def serve(self, conn):
+        h2_conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+        h2_conn.initiate_connection()
+        conn.sendall(h2_conn.data_to_send())
+        while True:
+            data = conn.recv(65535)
+            if not data:
+                break
+            for event in h2_conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    self.streams += 1
+                    headers = dict(event.headers)
+                    body = json.dumps(
+                        {'ok': True, 'path': headers[b':path'].decode()}
+                    ).encode()
+                    h2_conn.send_headers(event.stream_id, [
+                        (':status', '200'),
+                        ('content-type', 'application/json'),
+                        ('content-length', str(len(body))),
+                    ])
+                    h2_conn.send_data(event.stream_id, body, end_stream=True)
+            conn.sendall(h2_conn.data_to_send())
+        conn.close()
+
+
+class KeepAliveServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP/1.1 server answering every request with ``{"ok": true}`` after a
+    short delay and counting TCP connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                server.connections += 1
+
+            def do_GET(self):
+                time.sleep(.1)
+                body = b'{"ok": true}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.base = 'http://127.0.0.1:{}/api/'.format(self.server_port)
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+
+class TestWarmup(unittest.TestCase):
+    def test_connections_are_reused_after_warmup(self):
+        server = KeepAliveServer()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        session = requests.Session()
+        self.addCleanup(session.close)
+        slack = Slacker('aaa', session=session)
+
+        with mock.patch('slacker.get_api_url', lambda m: server.base + m):
+            slack.warmup(connections=3)
+            self.assertEqual(server.connections, 3)
+
+            threads = [threading.Thread(target=slack.api.test)
+                       for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(server.connections, 3)
+
+    def test_validate_and_async(self):
+        fake = FakeSlack()
+        slack = Slacker('aaa', transport=fake)
+
+        response = slack.warmup_async(connections=2, validate=True).result()
+
+        self.assertEqual(response.body['user_id'], fake.user_id)
+        self.assertEqual([api for api, _ in fake.calls],
+                         ['api.test', 'api.test', 'auth.test'])
+
+    def test_connections_are_refreshed(self):
+        fake = FakeSlack()
+        slack = Slacker('aaa', transport=fake)
+        self.addCleanup(slack.stop_refresh)
+
+        slack.warmup(connections=1, refresh_interval=.05)
+        time.sleep(.2)
+        slack.stop_refresh()
+        time.sleep(.1)
+        refreshed = len(fake.calls)
+
+        self.assertGreater(refreshed, 2)
+        time.sleep(.1)
+        self.assertEqual(len(fake.calls), refreshed)
+
+
+class TestRequestsTransport(unittest.TestCase):
+    @responses.activate
+    def test_default_transport_uses_requests(self):
+        responses.add(responses.GET, get_api_url('api.test'),
+                      json={'ok': True}, status=200)
+        self.assertTrue(API(token='aaa').test().successful)
+
+
+@unittest.skipIf(httpx is None or h2 is None, 'httpx[http2] not installed')
+class TestHTTP2Transport(unittest.TestCase):
+    def test_calls_are_multiplexed_over_one_connection(self):
+        server = H2StandInServer()
+        server.start()
+        self.addCleanup(server.sock.close)
+
+        transport = HTTP2Transport(http1=False, max_connections=1)
+        self.addCleanup(transport.close)
+        api = API(token='aaa', transport=transport)
+        base = 'http://127.0.0.1:{}/api/'.format(server.port)
+
+        paths = []
+
+        def call():
+            paths.append(api.test().body['path'])
+
+        with mock.patch('slacker.get_api_url', lambda method: base + method):
+            threads = [threading.Thread(target=call) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(paths, ['/api/api.test?token=aaa'] * 10)
+        self.assertEqual(server.streams, 10)
+        self.assertEqual(server.connections, 1)
+
+    def test_network_errors_are_mapped_to_requests(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        transport = HTTP2Transport()
+        self.addCleanup(transport.close)
+        breaker = CircuitBreaker(failure_threshold=5)
+        api = API(token='aaa', transport=transport, circuit_breaker=breaker)
+        base = 'http://127.0.0.1:{}/api/'.format(port)
+
+        with mock.patch('slacker.get_api_url', lambda method: base + method):
+            for _ in range(3):
+                self.assertRaises(requests.ConnectionError, api.test)
+        self.assertEqual(breaker.status()['api.test']['failures'], 3)
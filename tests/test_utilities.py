@@ -1,6 +1,11 @@
 import unittest
 
-from slacker.utilities import get_item_id_by_name
+from slacker.utilities import (
+    JSONString,
+    encode_payload,
+    freeze_json,
+    get_item_id_by_name,
+)
 
 
 class TestGetItemIDByName(unittest.TestCase):
@@ -9,3 +14,29 @@ class TestGetItemIDByName(unittest.TestCase):
         self.assertEqual(
             '123', get_item_id_by_name(list_dict, 'channel_name')
         )
+
+
+class TestEncodePayload(unittest.TestCase):
+    def test_encode_payload(self):
+        attachments = freeze_json([{'text': 'hi'}])
+        encoded = encode_payload({
+            'channel': 'C1',
+            'thread_ts': None,
+            'as_user': True,
+            'limit': 10,
+            'users': ['U1', 'U2'],
+            'blocks': [{'type': 'divider'}],
+            'profile': {'status_text': 'away'},
+            'attachments': attachments,
+        })
+        self.assertEqual(encoded, {
+            'channel': 'C1',
+            'as_user': 1,
+            'limit': 10,
+            'users': 'U1,U2',
+            'blocks': '[{"type":"divider"}]',
+            'profile': '{"status_text":"away"}',
+            'attachments': '[{"text":"hi"}]',
+        })
+        self.assertIs(encoded['attachments'], attachments)
+        self.assertIsInstance(attachments, JSONString)
@@ -0,0 +1,53 @@
+import json
+import unittest
+
+import responses
+
+from slacker.webhook import BufferedIncomingWebhook, merge_messages
+
+URL = 'https://hooks.slack.com/services/T/B/X'
+
+
+class TestMergeMessages(unittest.TestCase):
+    def test_compatible_messages_are_merged(self):
+        merged = merge_messages([
+            {'text': 'a'},
+            {'text': 'b', 'attachments': [{'text': 'x'}]},
+            {'text': 'c', 'username': 'other'},
+            {'blocks': [{'type': 'divider'}]},
+        ])
+        self.assertEqual(merged, [
+            {'text': 'a\nb', 'attachments': [{'text': 'x'}]},
+            {'text': 'c', 'username': 'other'},
+            {'blocks': [{'type': 'divider'}]},
+        ])
+
+    def test_limits_split_batches(self):
+        merged = merge_messages([{'blocks': [{}] * 30}] * 2)
+        self.assertEqual(len(merged), 2)
+
+
+class TestBufferedIncomingWebhook(unittest.TestCase):
+    @responses.activate
+    def test_burst_is_sent_as_one_post(self):
+        responses.add(responses.POST, URL, status=200)
+        with BufferedIncomingWebhook(URL, flush_interval=60) as webhook:
+            for i in range(5):
+                webhook.post({'text': str(i)})
+            self.assertTrue(webhook.flush(timeout=5))
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(json.loads(responses.calls[0].request.body),
+                         {'text': '0\n1\n2\n3\n4'})
+
+    @responses.activate
+    def test_backs_off_on_429(self):
+        responses.add(responses.POST, URL, status=429,
+                      headers={'Retry-After': '0'})
+        responses.add(responses.POST, URL, status=200)
+        webhook = BufferedIncomingWebhook(URL, max_batch=1)
+        webhook.post({'text': 'hi'})
+        webhook.close()
+
+        self.assertEqual([c.response.status_code for c in responses.calls],
+                         [429, 200])